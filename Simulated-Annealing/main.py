@@ -21,148 +21,26 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
-import itertools, math, random, os, pandas, numpy as np, copy, matplotlib.pyplot as plt
-import functools, operator, sys
 
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from metaheuristic import vrp
+from metaheuristic.loaders import load_instance
+from metaheuristic.sa import swapSA2B
 
-xls = pandas.ExcelFile('VRP101.xlsx')
-sheet_1 = pandas.read_excel(xls, 'Sheet1')
-sheet_2 = pandas.read_excel(xls, 'Sheet2')
-matrix = sheet_1.values
-depot = matrix[len(matrix)-1]
-tables = matrix[:len(matrix)-1]
-vehicles = sheet_2.values
-path = [i for i in range(0, len(tables))]
-
-def distance(x1, x2, y1, y2):
-    return math.sqrt((x1-x2)**2 + (y1-y2)**2)
-
-def total_distance_of_VRP(path):
-    lenght = 0
-    for i in range(1, len(path)):
-        x1 = tables[path[i-1]][0]
-        y1 = tables[path[i-1]][1]
-        x2 = tables[path[i]][0]
-        y2 = tables[path[i]][1]
-        lenght = lenght + distance(x1, y1, x2, y2)
-    x1 = tables[path[len(path) - 1]][0]
-    y1 = tables[path[len(path) - 1]][1]
-    x2 = depot[0]
-    y2 = depot[1]
-    lenght = lenght + distance(x1, y1, x2, y2)
-    x1 = tables[path[0]][0]
-    y1 = tables[path[0]][1]
-    x2 = depot[0]
-    y2 = depot[1]
-    lenght = lenght + distance(x1, y1, x2, y2)
-    return lenght
-
-def average_demand(path, vehicle):
-    total_demand = 0
-    for i in range(len(path)):
-        total_demand = total_demand + tables[i][2]
-    average_demand = total_demand / len(vehicle)
-    return average_demand
-
-def sub_path_slice(path, vehicle):
-    capacity_used = np.zeros(len(vehicle))
-    node = 0
-    stopping = []
-    mass = []
-    for i in range(len(vehicle)):
-        while capacity_used[i] <= vehicle[i][1] and node <= (len(path)-1):
-            capacity_used[i] = capacity_used[i] + tables[path[node]][2]
-            if capacity_used[i] > vehicle[i][1]:
-                capacity_used[i] = capacity_used[i] - tables[path[node]][2]
-                node = node - 1
-                stopping.append(node)
-                node = node + 1
-                break
-            node = node + 1
-        mass.append(capacity_used[i])
-    stopping.append(node - 1)
-    return stopping, mass
-
-def sub_path(slice, path):
-    sub = []
-    sub.append(path[:(slice[0]+1)])
-    for i in range(0, len(slice) - 1):
-        sub.append(path[(slice[i]+1):(slice[i+1]+1)])
-    return sub
-
-def all_vehicle_distance(sub):
-    all_distance = functools.reduce(operator.add, (total_distance_of_VRP(i) for i in sub), 0)
-    return all_distance
-
-def path_to_distance(path, vehicle):
-    Slice = sub_path_slice(path, vehicle)
-    SubPath = sub_path(Slice[0], path)
-    TotalDistance = all_vehicle_distance(SubPath)
-    return TotalDistance
-
-def two_swap(path, a, b):
-    path[a], path[b] = path[b], path[a]
-    return path
-
-def swapSA2A(path, vehicle, max_iteration):
-    for temperature in np.logspace(0, 5, num= max_iteration)[::-1]:
-        current_distance = path_to_distance(path, vehicle)
-        [a, b] = sorted(random.sample(range(len(tables)), 2))
-        new_path = two_swap(path, a, b)
-        new_distance = path_to_distance(new_path, vehicle)
-        if math.exp((current_distance - new_distance) / temperature) > random.random():
-            path = copy.copy(new_path)
-            best_distance = copy.copy(new_distance)
-    best_slice = sub_path_slice(path, vehicle)
-    best_sub_path = sub_path(best_slice[0], path)
-    return best_slice, best_sub_path, best_distance
-
-def swapSA2B(path, vehicle, max_iteration):
-    for temperature in np.logspace(0, 10, num= max_iteration)[::-1]:
-        current_distance = path_to_distance(path, vehicle)
-        [a, b] = sorted(random.sample(range(len(tables)), 2))
-        new_path = two_swap(path, a, b)
-        new_distance = path_to_distance(new_path, vehicle)
-        if math.exp((current_distance - new_distance) / temperature) > random.random():
-            path = copy.copy(new_path)
-            best_distance = copy.copy(new_distance)
-    best_slice = sub_path_slice(path, vehicle)
-    best_sub_path = sub_path(best_slice[0], path)
-    return best_slice, best_sub_path, best_distance
-
-def three_swap(path, a, b, c):
-    path[a], path[b], path[c] = path[c], path[a], path[b]
-    return path
-
-def swapSA3A(path, vehicle, max_iteration):
-    for temperature in np.logspace(0, 5, num= max_iteration)[::-1]:
-        current_distance = path_to_distance(path, vehicle)
-        [a, b, c] = sorted(random.sample(range(len(tables)), 3))
-        new_path = three_swap(path, a, b, c)
-        new_distance = path_to_distance(new_path, vehicle)
-        if math.exp((current_distance - new_distance) / temperature) > random.random():
-            path = copy.copy(new_path)
-            best_distance = copy.copy(new_distance)
-    best_slice = sub_path_slice(path, vehicle)
-    best_sub_path = sub_path(best_slice[0], path)
-    return best_slice, best_sub_path, best_distance
-
-def swapSA3B(path, vehicle, max_iteration):
-    for temperature in np.logspace(0, 10, num= max_iteration)[::-1]:
-        current_distance = path_to_distance(path, vehicle)
-        [a, b, c] = sorted(random.sample(range(len(tables)), 3))
-        new_path = three_swap(path, a, b, c)
-        new_distance = path_to_distance(new_path, vehicle)
-        if math.exp((current_distance - new_distance) / temperature) > random.random():
-            path = copy.copy(new_path)
-            best_distance = copy.copy(new_distance)
-    best_slice = sub_path_slice(path, vehicle)
-    best_sub_path = sub_path(best_slice[0], path)
-    return best_slice, best_sub_path, best_distance
 
+vrp.set_instance(*load_instance('VRP101.xlsx'))  # also run as python -m metaheuristic VRP101.xlsx --algorithm sa
+tables, depot, vehicles = vrp.tables, vrp.depot, vrp.vehicles
+path = [i for i in range(0, len(tables))]
 
 
 # ---------------------------------------------
+##from metaheuristic import SAConfig
+##from metaheuristic.cache import EvaluationCache
+##from metaheuristic.parallel import multi_start
+##from metaheuristic.sa import swapSA2A, swapSA3A, swapSA3B, routeSA, parallel_tempering, logspace_schedule, solve
+##from metaheuristic.vrp import optimal_path_slice
+##
 ##run1 = swapSA2A(path, vehicles, 1000)
 ##print('Total Distance:', run1[2])
 
@@ -186,4 +64,23 @@ print('Total Distance:', run2[2])
 ##
 ##run8 = swapSA3B(path, vehicles, 5000)
 ##print('Total Distance:', run8[2])
+##
+##run10 = routeSA(path, vehicles, 100000, logspace_schedule(3))
+##print('Total Distance:', run10[2])
+##
+##vrp.evaluation_cache = EvaluationCache(len(path))
+##run11 = swapSA2B(path, vehicles, 5000, optimal_path_slice)
+##print('Total Distance:', run11[2], 'cache hits / misses:', vrp.evaluation_cache.hits, vrp.evaluation_cache.misses)
+##
+##run12 = solve(SAConfig(max_iteration=100000, move='routes', high=3))
+##print('Total Distance:', run12[2])
+##
+##run13 = solve(SAConfig(max_iteration=1000000, move='routes', high=3, stall_limit=200000, deadline=60))
+##print('Total Distance:', run13[2])
+##
+##runs, best = multi_start(swapSA2B, (path, vehicles, 1000), 8, seed=2020)
+##print('Total Distance:', [run[2] for run in runs], best[2])
+##
+##run9 = parallel_tempering(path, vehicles, 5000, replicas=8, interval=100, seed=2020)
+##print('Total Distance:', run9[2])
 # ---------------------------------------------
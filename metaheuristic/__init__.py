@@ -0,0 +1,22 @@
+''' Metaheuristic solutions: Artificial Bee Colony Optimization for the
+    Travelling Salesman Problem (tsp) and the Vehicle Routing Problem
+    (cvrp), Simulated Annealing for the Vehicle Routing Problem (sa)
+
+    from metaheuristic import loaders, tsp
+    source = loaders.read_instance('case/low/tsp48.csv')
+    result = tsp.main_type1(source, config=ABCConfig(maximal_of_iteration=50))
+
+    the submodules are imported on first use, so importing the package
+    does not import numpy, scipy, pandas or matplotlib '''
+import importlib
+from .config import ABCConfig, CVRP_ABC, SAConfig
+
+__all__ = ['ABCConfig', 'CVRP_ABC', 'SAConfig', 'batch', 'benchmark', 'cache', 'checkpoint', 'cli',
+           'cvrp', 'instrument', 'loaders', 'parallel', 'plot', 'progress', 'sa', 'service',
+           'termination', 'tsp', 'vrp']
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError('module ' + repr(__name__) + ' has no attribute ' + repr(name))
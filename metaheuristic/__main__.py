@@ -0,0 +1,4 @@
+''' python -m metaheuristic INSTANCE --algorithm abc|cvrp-abc|sa ... '''
+from .cli import main
+
+main()
@@ -0,0 +1,286 @@
+''' Batch runner: every instance of the directories / glob patterns is
+    solved with every combination of the parameter grid on a pool of
+    worker processes, the largest instances first, one record per job
+    (best path, distance, evaluations, time and, for instrument=true,
+    the report of the instruments) is appended to a JSONL (or CSV)
+    store as soon as the job is done
+
+    python -m metaheuristic.batch Modified-Artificial-Bee-Colony/case \\
+        --grid iterations=100,1000 --grid seed=1,2,3 --store results.jsonl
+
+    the grid keys are the options of python -m metaheuristic (true /
+    false for the switches), the keys of the options of other
+    algorithms are dropped from a job (--move of a cvrp-abc job), a
+    key no job takes is an error, a job is keyed by its instance and
+    parameters, the jobs already done in the store are skipped, so an
+    interrupted batch goes on where it stopped when started again,
+    the jobs that failed are run again '''
+import argparse, contextlib, csv, glob, io, itertools, json, multiprocessing, os, random, sys, time
+import numpy as np
+from .cli import ALGORITHMS, TSP_EXTENSIONS
+
+
+VRP_EXTENSIONS = ('.xlsx', '.xls', '.vrp', '.npz')
+# options that start processes of their own or work on files, not for the jobs of a pool
+EXCLUDED = ('runs', 'islands', 'interval', 'plot', 'checkpoint', 'checkpoint-every', 'checkpoint-seconds', 'resume',
+            'profile', 'sample', 'quiet')
+# the options of some of the algorithms only, the others are of every algorithm
+OPTIONS = {'max-evaluations': ('abc', 'cvrp-abc'), 'time-limit': ('abc', 'cvrp-abc'), 'restart': ('abc', 'cvrp-abc'),
+           'population': ('abc', 'cvrp-abc'), 'limit': ('abc', 'cvrp-abc'), 'employee': ('abc', 'cvrp-abc'),
+           'onlooker': ('abc', 'cvrp-abc'), 'scout': ('abc', 'cvrp-abc'), 'sigmoid': ('abc',),
+           'batched': ('abc',), 'neighbours': ('abc',), 'improve': ('abc',),
+           'cache': ('cvrp-abc', 'sa'), 'optimal-split': ('cvrp-abc', 'sa'), 'route-moves': ('cvrp-abc',),
+           'move': ('sa',), 'high': ('sa',), 'low': ('sa',)}
+CSV_FIELDS = ('key', 'instance', 'parameters', 'status', 'distance', 'evaluations', 'seconds', 'path', 'error',
+              'instruments')
+
+
+def find_instances(patterns):
+    ''' Function to list the instance files of the
+        directories (searched recursively, hidden
+        directories such as .cache left out), glob
+        patterns and files, each once '''
+    instances = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files = []
+            for root, directories, names in os.walk(pattern):
+                directories[:] = sorted(i for i in directories if not i.startswith('.'))
+                files.extend(os.path.join(root, i) for i in sorted(names))
+        else:
+            files = sorted(glob.glob(pattern))
+        for i in files:
+            i = os.path.normpath(i)
+            if i.endswith(TSP_EXTENSIONS + VRP_EXTENSIONS) and i not in instances:
+                instances.append(i)
+    return instances
+
+def parse_grid(items):
+    ''' Function to get the parameter grid of KEY=V1,V2
+        items as a dictionary of the values of every key '''
+    grid = {}
+    for item in items:
+        key, sign, values = item.partition('=')
+        key = key.strip().lstrip('-').replace('_', '-')
+        if not sign or not key:
+            raise ValueError('the grid takes KEY=V1,V2 items, not ' + repr(item))
+        if key in EXCLUDED:
+            raise ValueError('--' + key + ' can not be a parameter of the batch jobs')
+        grid[key] = [i.strip() for i in values.split(',')]
+    return grid
+
+def make_jobs(instances, grid):
+    ''' Function to make the jobs (instance, parameters) of
+        every instance and every combination of the grid,
+        the combinations of an algorithm that does not solve
+        the instance (abc for the CVRP case, cvrp-abc and sa
+        for the TSP case) are left out, the keys of OPTIONS
+        not of the algorithm of a job are dropped (the same
+        job is made once), raises ValueError when no job
+        takes a key of the grid '''
+    keys = sorted(grid)
+    jobs, made, used = [], set(), set()
+    for instance in instances:
+        is_tsp = instance.endswith(TSP_EXTENSIONS)
+        for values in itertools.product(*[grid[i] for i in keys]):
+            parameters = dict(zip(keys, values))
+            algorithm = parameters.get('algorithm', 'abc' if is_tsp else 'cvrp-abc')
+            if algorithm in ALGORITHMS and (algorithm == 'abc') != is_tsp:
+                continue
+            parameters = {i: j for i, j in parameters.items() if algorithm in OPTIONS.get(i, ALGORITHMS)}
+            used.update(parameters)
+            if job_key(instance, parameters) not in made:
+                made.add(job_key(instance, parameters))
+                jobs.append((instance, parameters))
+    unused = [i for i in keys if i not in used]
+    if jobs and unused:
+        raise ValueError('no job takes --' + ', --'.join(unused))
+    return jobs
+
+def job_key(instance, parameters):
+    ''' Function to get the key of a job in the store '''
+    return json.dumps([instance, parameters], sort_keys=True)
+
+def job_arguments(instance, parameters):
+    ''' Function to get the command line of a job '''
+    argv = [instance, '--quiet']
+    for key, value in sorted(parameters.items()):
+        if value.lower() == 'true':
+            argv.append('--' + key)
+        elif value.lower() != 'false':
+            argv.extend(['--' + key, value])
+    return argv
+
+def instance_size(instance):
+    ''' Function to get the number of nodes of an instance '''
+    from . import loaders
+    if instance.endswith(TSP_EXTENSIONS):
+        return len(loaders.read_instance(instance))
+    return len(loaders.load_instance(instance)[0])
+
+def largest_first(jobs):
+    ''' Function to order the jobs by the size of their
+        instance and then their iterations, largest first '''
+    sizes = {i: instance_size(i) for i in set(i[0] for i in jobs)}
+    return sorted(jobs, key=lambda i: (sizes[i[0]], float(i[1].get('iterations', 0))), reverse=True)
+
+def start_worker():
+    ''' Function to seed a forked worker from the
+        operating system, so the jobs without a seed
+        do not share the random state of the parent '''
+    random.seed()
+    np.random.seed()
+
+def run_job(job):
+    ''' Function to solve one job in a worker, the
+        errors of the job are recorded, not raised '''
+    instance, parameters = job
+    from . import cli, vrp
+    # the evaluation cache of the last job belongs to its instance
+    vrp.evaluation_cache = None
+    record = {'key': job_key(instance, parameters), 'instance': instance, 'parameters': parameters}
+    start = time.perf_counter()
+    errors = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errors), \
+                contextlib.ExitStack() as stack:
+            parser = cli.make_parser()
+            arguments = parser.parse_args(job_arguments(instance, parameters))
+            if arguments.algorithm is None:
+                arguments.algorithm = 'abc' if instance.endswith(TSP_EXTENSIONS) else 'cvrp-abc'
+            arguments.start = time.time()
+            instruments = cli.measured(arguments, stack)
+            distance, evaluations, path = cli.RUNS[arguments.algorithm](arguments, parser)
+        record.update(status='ok', distance=float(distance), evaluations=int(evaluations),
+                      path=json.loads(json.dumps(path, default=lambda i: i.tolist())))
+        if instruments is not None:
+            record['instruments'] = instruments.report()
+    except SystemExit:
+        # parser.error of the parameters, the message went to stderr
+        record.update(status='error', error=(errors.getvalue().strip().splitlines() or ['exit'])[-1])
+    except Exception as error:
+        record.update(status='error', error=type(error).__name__ + ': ' + ' '.join(str(error).split()))
+    record['seconds'] = time.perf_counter() - start
+    return record
+
+class ResultStore:
+    ''' Class as append-only store of the job records,
+        one JSON object per line, or one CSV row per
+        record when the file name ends with .csv '''
+    def __init__(self, file_name):
+        ''' Method to initialize the store of file_name '''
+        self.file_name = file_name
+        self.csv = file_name.endswith('.csv')
+    def done(self):
+        ''' Method to get the keys of the jobs done, a line
+            cut short by an interruption is left out '''
+        if not os.path.exists(self.file_name):
+            return set()
+        records = []
+        with open(self.file_name, newline='') as f:
+            # no record spans lines, so every line is read on its own
+            for line in f:
+                if self.csv:
+                    row = next(csv.reader([line]), [])
+                    if len(row) == len(CSV_FIELDS):
+                        records.append(dict(zip(CSV_FIELDS, row)))
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return set(i['key'] for i in records if i.get('status') == 'ok')
+    def append(self, record):
+        ''' Method to append a record and flush it to disk,
+            after the line an interruption cut short '''
+        new = not os.path.exists(self.file_name) or os.path.getsize(self.file_name) == 0
+        if not new:
+            with open(self.file_name, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                cut = f.read(1) != b'\n'
+        with open(self.file_name, 'a', newline='') as f:
+            if not new and cut:
+                f.write('\n')
+            if self.csv:
+                writer = csv.DictWriter(f, CSV_FIELDS)
+                if new:
+                    writer.writeheader()
+                row = dict(record, parameters=json.dumps(record['parameters'], sort_keys=True))
+                for i in ('path', 'instruments'):
+                    if i in record:
+                        row[i] = json.dumps(record[i])
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+def run_batch(jobs, store, processes=None, log=sys.stdout):
+    ''' Function to run the jobs not done in the store on a
+        pool of processes workers (every core by default),
+        largest first, every record is appended to the store
+        as soon as its job is done, returns the number of
+        jobs run and of jobs that failed '''
+    done = store.done()
+    jobs = largest_first([i for i in jobs if job_key(*i) not in done])
+    failed = 0
+    if not jobs:
+        return 0, 0
+    context = multiprocessing.get_context('fork')
+    with context.Pool(processes, initializer=start_worker) as pool:
+        for count, record in enumerate(pool.imap_unordered(run_job, jobs, chunksize=1), 1):
+            store.append(record)
+            failed = failed + (record['status'] != 'ok')
+            if log is not None:
+                parameters = ' '.join(i + '=' + j for i, j in sorted(record['parameters'].items()))
+                outcome = ('distance %.3f' % record['distance'] if record['status'] == 'ok'
+                           else 'error ' + record['error'])
+                print('[%d/%d] %s %s %s %.3fs' % (count, len(jobs), record['instance'], parameters,
+                                                  outcome, record['seconds']), file=log, flush=True)
+    return len(jobs), failed
+
+def make_parser():
+    ''' Function to make the argument parser '''
+    parser = argparse.ArgumentParser(prog='python -m metaheuristic.batch',
+                                     description='solve every instance with every combination of a grid')
+    parser.add_argument('instances', nargs='+', help='directories, glob patterns or instance files')
+    parser.add_argument('--grid', action='append', default=[], metavar='KEY=V1,V2',
+                        help='values of an option of python -m metaheuristic (repeat for more options)')
+    parser.add_argument('--processes', type=int, help='workers (default every core)')
+    parser.add_argument('--store', default='results.jsonl', help='.jsonl or .csv (default results.jsonl)')
+    parser.add_argument('--list', action='store_true', help='only list the jobs not done, largest first')
+    return parser
+
+def main(argv=None):
+    ''' Function to run the batch of the arguments,
+        exits with status 1 when a job failed '''
+    parser = make_parser()
+    arguments = parser.parse_intermixed_args(argv)
+    try:
+        grid = parse_grid(arguments.grid)
+    except ValueError as error:
+        parser.error(str(error))
+    instances = find_instances(arguments.instances)
+    if not instances:
+        parser.error('no instances in ' + ' '.join(arguments.instances))
+    try:
+        jobs = make_jobs(instances, grid)
+    except ValueError as error:
+        parser.error(str(error))
+    # every job must parse before any of them runs
+    from .cli import make_parser as solver_parser
+    for instance, parameters in jobs:
+        solver_parser().parse_args(job_arguments(instance, parameters))
+    store = ResultStore(arguments.store)
+    if arguments.list:
+        done = store.done()
+        for instance, parameters in largest_first([i for i in jobs if job_key(*i) not in done]):
+            print(' '.join(job_arguments(instance, parameters)))
+        return 0
+    count, failed = run_batch(jobs, store, arguments.processes)
+    print(count, 'jobs run,', len(jobs) - count, 'done before,', failed, 'failed')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
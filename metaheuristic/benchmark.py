@@ -0,0 +1,222 @@
+''' Benchmark suite: every instance x algorithm runs with fixed seeds
+    and repetitions, the wall time, evaluations per second, memory growth
+    and best / mean distance go to a JSON file, compare flags the
+    throughput and quality regressions against a stored baseline
+
+    python -m metaheuristic.benchmark run --suite low --output bench.json
+    python -m metaheuristic.benchmark compare baseline.json bench.json
+
+    every repetition runs in its own forked process, so no state
+    (evaluation cache, random generators) leaks between runs, the
+    forked process inherits the maximum resident set size of the
+    benchmark process, so a repetition reports how far it went past
+    that mark (rss_growth_kib, 0 when it stayed under the memory the
+    benchmark had already used), not a peak of its own '''
+import argparse, glob, json, multiprocessing, os, platform, random, re, resource, sys, time
+import numpy as np
+from .config import ABCConfig
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TSP_SUITES = ('low', 'medium', 'high')
+VRP_INSTANCES = [os.path.join('Modified-Artificial-Bee-Colony', 'CVRP-case', 'VRP_node_8.xlsx'),
+                 os.path.join('Simulated-Annealing', 'VRP101.xlsx')]
+TSP_ALGORITHMS = {'abc': ABCConfig(verbose=False),
+                  'abc-sigmoid': ABCConfig(verbose=False, sigmoid=True)}
+# the four variants of the Simulated Annealing script and their moves
+SA_ALGORITHMS = {'swapSA2A': 1000, 'swapSA2B': 1000, 'swapSA3A': 5000, 'swapSA3B': 5000}
+
+
+def tsp_instances(suites):
+    ''' Function to list the TSP instances of the suites,
+        the smallest first '''
+    instances = []
+    for suite in suites:
+        files = glob.glob(os.path.join(ROOT, 'Modified-Artificial-Bee-Colony', 'case', suite, '*.csv'))
+        instances.extend(sorted(files, key=lambda i: int(re.sub(r'\D', '', os.path.basename(i)) or 0)))
+    return instances
+
+def measure(run, seed, baseline, connection):
+    ''' Function to run one repetition in a forked process
+        and send its distance, evaluations, wall time and
+        growth of the maximum resident set size (KiB) over
+        baseline, the one of the parent before the fork '''
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    start = time.perf_counter()
+    distance, evaluations = run()
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    connection.send({'seed': seed, 'distance': float(distance), 'evaluations': int(evaluations),
+                     'seconds': seconds, 'rss_growth_kib': max(0, int(peak - baseline))})
+    connection.close()
+
+def repeat(run, seeds):
+    ''' Function to run every seed in its own forked
+        process, one after the other so the timings do
+        not compete for the cores '''
+    context = multiprocessing.get_context('fork')
+    runs = []
+    for seed in seeds:
+        parent, child = context.Pipe(duplex=False)
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        process = context.Process(target=measure, args=(run, seed, baseline, child))
+        process.start()
+        child.close()
+        runs.append(parent.recv())
+        process.join()
+    return runs
+
+def summarize(instance, algorithm, runs):
+    ''' Function to make the record of one instance x algorithm '''
+    distance = [i['distance'] for i in runs]
+    seconds = sum(i['seconds'] for i in runs)
+    return {'instance': os.path.relpath(instance, ROOT), 'algorithm': algorithm, 'runs': runs,
+            'best': min(distance), 'mean': float(np.mean(distance)), 'std': float(np.std(distance)),
+            'seconds': seconds / len(runs),
+            'evaluations_per_second': sum(i['evaluations'] for i in runs) / seconds,
+            'rss_growth_kib': max(i['rss_growth_kib'] for i in runs)}
+
+def benchmark_tsp(instance, algorithms, seeds, iterations=None):
+    ''' Function to benchmark the ABC Algorithm variants
+        on one TSP instance '''
+    from . import loaders, tsp
+    source = loaders.read_instance(instance)
+    table = source.astype(float)
+    if not loaders.is_distance_table(source):
+        table = loaders.make_distance_table(source, loaders.edge_weight_type(instance))
+    records = []
+    for algorithm in algorithms:
+        config = TSP_ALGORITHMS[algorithm]
+        if iterations is not None:
+            config = config.replace(maximal_of_iteration=iterations)
+        runs = repeat(lambda: tsp.main_type1(source, table, config=config)[2:4], seeds)
+        records.append(summarize(instance, algorithm, runs))
+    return records
+
+def benchmark_sa(instance, algorithms, seeds, iterations=None):
+    ''' Function to benchmark the Simulated Annealing
+        variants on one CVRP instance, every move is
+        one evaluation '''
+    from . import loaders, sa, vrp
+    vrp.set_instance(*loaders.load_instance(instance))
+    path = [i for i in range(0, len(vrp.tables))]
+    records = []
+    for algorithm in algorithms:
+        moves = SA_ALGORITHMS[algorithm] if iterations is None else iterations
+        solver = getattr(sa, algorithm)
+        runs = repeat(lambda: solver(path, vrp.vehicles, moves)[2:4], seeds)
+        records.append(summarize(instance, algorithm, runs))
+    return records
+
+def run_suite(suites, algorithms, repetitions=3, seed=2020, iterations=None, log=sys.stdout):
+    ''' Function to benchmark every instance of the suites
+        ('low', 'medium', 'high' for the TSP, 'vrp' for the
+        CVRP instances) with every algorithm of them, the
+        seeds of the repetitions are spawned from seed,
+        returns the report (environment and records) '''
+    seeds = [int(i.generate_state(1, np.uint64)[0]) for i in np.random.SeedSequence(seed).spawn(repetitions)]
+    report = {'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                              'machine': platform.machine(), 'processor': platform.processor(),
+                              'cpus': os.cpu_count(), 'date': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'seed': seed, 'repetitions': repetitions, 'iterations': iterations, 'records': []}
+    work = [(benchmark_tsp, i, [j for j in algorithms if j in TSP_ALGORITHMS])
+            for i in tsp_instances([i for i in suites if i in TSP_SUITES])]
+    if 'vrp' in suites:
+        work += [(benchmark_sa, os.path.join(ROOT, i), [j for j in algorithms if j in SA_ALGORITHMS])
+                 for i in VRP_INSTANCES]
+    for bench, instance, chosen in work:
+        if not chosen:
+            continue
+        for record in bench(instance, chosen, seeds, iterations):
+            report['records'].append(record)
+            if log is not None:
+                print('%-50s %-12s best %12.3f mean %12.3f %9.3fs %12.0f eval/s %8d KiB more'
+                      % (record['instance'], record['algorithm'], record['best'], record['mean'],
+                         record['seconds'], record['evaluations_per_second'], record['rss_growth_kib']),
+                      file=log, flush=True)
+    return report
+
+def save_report(file_name, report):
+    ''' Function to write the report as JSON, through a
+        temporary file so a reader never sees half a file '''
+    tmp_file = file_name + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(report, f, indent=1)
+    os.replace(tmp_file, file_name)
+
+def compare(baseline, current, throughput=0.10, quality=0.01):
+    ''' Function to compare the records of two reports,
+        a record regresses when its evaluations per second
+        fall by more than throughput or its mean distance
+        grows by more than quality (relative), returns the
+        rows (instance, algorithm, throughput change,
+        quality change, flags) of the records in both '''
+    before = {(i['instance'], i['algorithm']): i for i in baseline['records']}
+    rows = []
+    for record in current['records']:
+        old = before.get((record['instance'], record['algorithm']))
+        if old is None:
+            continue
+        speed = record['evaluations_per_second'] / old['evaluations_per_second'] - 1
+        change = record['mean'] / old['mean'] - 1 if old['mean'] else 0.0
+        flags = []
+        if speed < -throughput:
+            flags.append('THROUGHPUT')
+        if change > quality:
+            flags.append('QUALITY')
+        rows.append((record['instance'], record['algorithm'], speed, change, flags))
+    return rows
+
+def make_parser():
+    ''' Function to make the argument parser '''
+    parser = argparse.ArgumentParser(prog='python -m metaheuristic.benchmark',
+                                     description='benchmark suite of the algorithms')
+    command = parser.add_subparsers(dest='command', required=True)
+    run = command.add_parser('run', help='run the suite and write the report')
+    run.add_argument('--suite', default='low,vrp',
+                     help='comma separated low, medium, high, vrp (default low,vrp)')
+    run.add_argument('--algorithms', default=','.join(list(TSP_ALGORITHMS) + list(SA_ALGORITHMS)),
+                     help='comma separated ' + ', '.join(list(TSP_ALGORITHMS) + list(SA_ALGORITHMS)))
+    run.add_argument('--repetitions', type=int, default=3)
+    run.add_argument('--seed', type=int, default=2020)
+    run.add_argument('--iterations', type=int,
+                     help='cycles of abc / moves of sa instead of their defaults')
+    run.add_argument('--output', default='benchmark.json')
+    check = command.add_parser('compare', help='flag the regressions against a baseline')
+    check.add_argument('baseline')
+    check.add_argument('current')
+    check.add_argument('--throughput', type=float, default=0.10,
+                       help='allowed relative drop of evaluations per second (default 0.10)')
+    check.add_argument('--quality', type=float, default=0.01,
+                       help='allowed relative growth of the mean distance (default 0.01)')
+    return parser
+
+def main(argv=None):
+    ''' Function to run the suite or compare two reports,
+        compare exits with status 1 on any regression '''
+    arguments = make_parser().parse_args(argv)
+    if arguments.command == 'run':
+        algorithms = arguments.algorithms.split(',')
+        unknown = [i for i in algorithms if i not in TSP_ALGORITHMS and i not in SA_ALGORITHMS]
+        if unknown:
+            sys.exit('unknown algorithms: ' + ', '.join(unknown))
+        report = run_suite(arguments.suite.split(','), algorithms, arguments.repetitions,
+                           arguments.seed, arguments.iterations)
+        save_report(arguments.output, report)
+        return 0
+    with open(arguments.baseline) as f:
+        baseline = json.load(f)
+    with open(arguments.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, arguments.throughput, arguments.quality)
+    for instance, algorithm, speed, change, flags in rows:
+        print('%-50s %-12s throughput %+7.1f%% distance %+7.2f%% %s'
+              % (instance, algorithm, 100 * speed, 100 * change, ' '.join(flags)))
+    regressions = sum(1 for i in rows if i[4])
+    print(len(rows), 'records compared,', regressions, 'regressions')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
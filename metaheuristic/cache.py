@@ -0,0 +1,47 @@
+''' Evaluation cache of the CVRP solvers with the optimal split '''
+import collections
+import numpy as np
+
+
+class EvaluationCache:
+    ''' Class as bounded LRU cache of the total distance of
+        routes (paths) keyed by the Zobrist hash of the path:
+        the xor of one random 64 bit key per (position, node),
+        moving nodes to other positions changes the hash in
+        O(1) per position, hits and misses are counted '''
+    def __init__(self, length, size=100000, seed=None):
+        ''' Method to initialize the keys of length nodes
+            and the store of at most size paths '''
+        self.keys = np.random.default_rng(seed).integers(
+            0, 2 ** 63, size=(length, length), dtype=np.int64)
+        self.size = size
+        self.store = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    def hash(self, path):
+        ''' Method to calculate the hash of a path '''
+        path = np.asarray(path)
+        return int(np.bitwise_xor.reduce(
+            self.keys[np.arange(len(path)), path]))
+    def moved(self, key, path, positions, nodes):
+        ''' Method to get the hash of path after the
+            nodes at positions are replaced by nodes '''
+        for position, node in zip(positions, nodes):
+            key = (key ^ int(self.keys[position, path[position]])
+                   ^ int(self.keys[position, node]))
+        return key
+    def get(self, key):
+        ''' Method to look up a path, None if not stored '''
+        if key in self.store:
+            self.store.move_to_end(key)
+            self.hits = self.hits + 1
+            return self.store[key]
+        self.misses = self.misses + 1
+        return None
+    def put(self, key, value):
+        ''' Method to store a path, the least recently
+            used path is dropped when the store is full '''
+        self.store[key] = value
+        self.store.move_to_end(key)
+        if len(self.store) > self.size:
+            self.store.popitem(last=False)
@@ -0,0 +1,152 @@
+''' Checkpoints of long runs: the state of a solver (the hive of the ABC
+    Algorithm, the path of the Simulated Annealing), its best path so
+    far and the state of both random generators go to a compressed .npz
+    file every so many cycles (moves) or seconds, a run resumed from it
+    continues as the interrupted run would have, bit for bit
+
+    checkpoint = Checkpointer('run.npz', seconds=60)
+    tsp.main_type1(source, table, config=config, checkpoint=checkpoint)
+    # after an interruption, the same call goes on from the checkpoint
+    tsp.main_type1(source, table, config=config, checkpoint=checkpoint, resume='run.npz')
+
+    the snapshot is copied in the search loop and written by a
+    background thread to a temporary file that then replaces the
+    checkpoint, so a reader never sees half a file, no snapshot is
+    taken while the last one is still being written, the termination
+    and restart policies (see termination) go on counting from the
+    state they had at the checkpoint '''
+import math, os, random, threading, time
+import numpy as np
+
+
+def random_state():
+    ''' Function to get the state of the random
+        module and of numpy.random as arrays '''
+    version, internal, gauss = random.getstate()
+    name, keys, position, has_gauss, cached_gaussian = np.random.get_state()
+    return {'random_version': np.array(version),
+            'random_internal': np.array(internal, dtype=np.uint32),
+            'random_gauss': np.array(math.nan if gauss is None else gauss),
+            'numpy_keys': np.array(keys, dtype=np.uint32),
+            'numpy_position': np.array([position, has_gauss]),
+            'numpy_gauss': np.array(cached_gaussian)}
+
+def set_random_state(state):
+    ''' Function to set both random generators
+        to the state of random_state '''
+    gauss = float(state['random_gauss'])
+    random.setstate((int(state['random_version']), tuple(int(i) for i in state['random_internal']),
+                     None if math.isnan(gauss) else gauss))
+    position, has_gauss = state['numpy_position'].tolist()
+    np.random.set_state(('MT19937', state['numpy_keys'], position, has_gauss, float(state['numpy_gauss'])))
+
+def pack_routes(routes):
+    ''' Function to store a list of routes as one
+        array of nodes and the length of every route '''
+    return (np.array([i for route in routes for i in route], dtype=np.int64),
+            np.array([len(i) for i in routes], dtype=np.int64))
+
+def unpack_routes(nodes, lengths):
+    ''' Function to get the routes of pack_routes back '''
+    ends = np.cumsum(lengths).tolist()
+    nodes = nodes.tolist()
+    return [nodes[end - length:end] for end, length in zip(ends, lengths.tolist())]
+
+def path_state(name, path):
+    ''' Function to store a path, or a list of
+        routes, under name for a checkpoint '''
+    if len(path) > 0 and isinstance(path[0], list):
+        nodes, lengths = pack_routes(path)
+        return {name: nodes, name + '_lengths': lengths}
+    return {name: np.array(path)}
+
+def restore_path(state, name):
+    ''' Function to get the path (or routes)
+        of path_state back '''
+    if name + '_lengths' in state:
+        return unpack_routes(state[name], state[name + '_lengths'])
+    return state[name].tolist()
+
+def policies_state(policies):
+    ''' Function to store the state of the termination
+        policies that keep one (a watcher without a state()
+        method is left out) for a checkpoint '''
+    return {'termination' + str(i): policy.state()
+            for i, policy in enumerate(policies) if hasattr(policy, 'state')}
+
+def restore_policies(policies, state):
+    ''' Function to set the termination policies
+        to the state of policies_state '''
+    for i, policy in enumerate(policies):
+        if 'termination' + str(i) in state:
+            policy.restore(state['termination' + str(i)])
+
+def save_checkpoint(file_name, state):
+    ''' Function to write a checkpoint (a dictionary of
+        arrays) through a temporary file, so a reader
+        never sees half a file '''
+    tmp_file = file_name + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        np.savez_compressed(f, **state)
+    os.replace(tmp_file, file_name)
+
+def load_checkpoint(file_name):
+    ''' Function to read a checkpoint as a dictionary of arrays '''
+    with np.load(file_name) as data:
+        return {i: data[i] for i in data.files}
+
+class Checkpointer:
+    ''' Class as the checkpoints of a run: a snapshot is due
+        every cycles cycles (moves for the Simulated
+        Annealing) and / or every seconds seconds, the random
+        state is added to it and, when history is a list
+        (set by the solvers), the history of the run '''
+    def __init__(self, file_name, cycles=None, seconds=None):
+        ''' Method to initialize the checkpoints '''
+        if cycles is None and seconds is None:
+            raise ValueError('the checkpoints need cycles or seconds')
+        self.file_name = file_name
+        self.cycles = cycles
+        self.seconds = seconds
+        self.history = None
+        self.writer = None
+        self.error = None
+        self.written = 0
+        self.start(0)
+    def start(self, cycle):
+        ''' Method to count the interval from cycle on '''
+        self.last_cycle = cycle
+        self.last_time = time.monotonic()
+    def due(self, cycle):
+        ''' Method to tell if a snapshot is due after
+            cycle, never while the last one is written '''
+        if self.writer is not None and self.writer.is_alive():
+            return False
+        if self.cycles is not None and cycle - self.last_cycle >= self.cycles:
+            return True
+        return self.seconds is not None and time.monotonic() - self.last_time >= self.seconds
+    def save(self, cycle, state):
+        ''' Method to write the snapshot of cycle in the
+            background, state must not change afterwards
+            (copies of the arrays of the solver) '''
+        state = dict(state, **random_state())
+        if isinstance(self.history, list):
+            state['history'] = np.array(self.history, dtype=float)
+        self.start(cycle)
+        self.writer = threading.Thread(target=self.write, args=(state,), daemon=True)
+        self.writer.start()
+    def write(self, state):
+        ''' Method to write a snapshot, the error
+            is raised again by close '''
+        try:
+            save_checkpoint(self.file_name, state)
+            self.written = self.written + 1
+        except Exception as error:
+            self.error = error
+    def close(self):
+        ''' Method to wait for the last snapshot to be written '''
+        if self.writer is not None:
+            self.writer.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
@@ -0,0 +1,321 @@
+''' Command line interface:
+
+    python -m metaheuristic case/low/tsp48.csv --iterations 200 --neighbours 10
+    python -m metaheuristic VRP_node_8.xlsx --algorithm cvrp-abc --route-moves
+    python -m metaheuristic VRP101.xlsx --algorithm sa --move routes --iterations 100000
+
+    the algorithm follows the instance when it is not given: abc for
+    the TSP case (.csv, .tsp), cvrp-abc for the CVRP case (excel, .vrp,
+    .npz), the solver modules are only imported after the arguments
+    are parsed, so --help does not wait for numpy '''
+import argparse, contextlib, functools, os, random, time
+from .config import ABCConfig, CVRP_ABC, SAConfig
+
+
+ALGORITHMS = ('abc', 'cvrp-abc', 'sa')
+TSP_EXTENSIONS = ('.csv', '.tsp')
+
+
+def make_parser():
+    ''' Function to make the argument parser '''
+    parser = argparse.ArgumentParser(
+        prog='python -m metaheuristic',
+        description='Artificial Bee Colony and Simulated Annealing '
+                    'for the TSP and the CVRP case')
+    parser.add_argument('instance', help='.csv / .tsp (TSP case), '
+                        'excel / .vrp / .npz (CVRP case)')
+    parser.add_argument('--algorithm', choices=ALGORITHMS,
+                        help='abc for .csv / .tsp, else cvrp-abc')
+    parser.add_argument('--iterations', type=int,
+                        help='cycles of abc / cvrp-abc, moves of sa')
+    parser.add_argument('--max-evaluations', type=int,
+                        help='stop abc / cvrp-abc after this many evaluations')
+    parser.add_argument('--time-limit', type=float,
+                        help='stop abc / cvrp-abc after this many seconds')
+    parser.add_argument('--runs', type=int, default=1,
+                        help='independent runs on every core (abc, sa)')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--cache', type=int, metavar='SIZE',
+                        help='cvrp-abc / sa with --optimal-split: look up the distance of the last SIZE paths')
+    parser.add_argument('--quiet', action='store_true',
+                        help='only print the summary')
+
+    stop = parser.add_argument_group('termination (cycles of abc / cvrp-abc, moves of sa)')
+    stop.add_argument('--stall', type=int,
+                      help='stop after this many cycles without improvement')
+    stop.add_argument('--window', type=int,
+                      help='stop when the last WINDOW cycles improved less than --epsilon')
+    stop.add_argument('--epsilon', type=float, default=0.001,
+                      help='relative improvement of --window (default 0.001)')
+    stop.add_argument('--deadline', type=float,
+                      help='stop after this many seconds')
+    stop.add_argument('--restart', type=int,
+                      help='abc / cvrp-abc: every employee bee scouts after '
+                           'this many cycles without improvement')
+
+    abc = parser.add_argument_group('abc / cvrp-abc')
+    abc.add_argument('--population', type=int, help='bees in the hive')
+    abc.add_argument('--limit', type=int,
+                     help='cycles without improvement before scouting')
+    abc.add_argument('--employee', type=float, help='share of employee bees')
+    abc.add_argument('--onlooker', type=float, help='share of onlooker bees')
+    abc.add_argument('--scout', type=float, help='share of scout bees')
+    abc.add_argument('--sigmoid', action='store_true',
+                     help='abc: the propose algorithm (Sigmoid ABC)')
+
+    tsp = parser.add_argument_group('abc')
+    tsp.add_argument('--batched', action='store_true',
+                     help='evaluate every phase at once')
+    tsp.add_argument('--neighbours', type=int, metavar='K',
+                     help='swap nodes with their K nearest nodes')
+    tsp.add_argument('--improve', choices=('best', 'employee'),
+                     help='2-opt / Or-opt local search (needs --neighbours), '
+                          'every node it looks at counts as an evaluation')
+    tsp.add_argument('--islands', type=int,
+                     help='island model with this many hives')
+    tsp.add_argument('--interval', type=int, default=50,
+                     help='cycles between migrations of the island model')
+    tsp.add_argument('--plot', action='store_true',
+                     help='plot the history and the best route')
+
+    cvrp = parser.add_argument_group('cvrp-abc / sa')
+    cvrp.add_argument('--optimal-split', action='store_true',
+                      help='split the paths optimally instead of greedily')
+    cvrp.add_argument('--route-moves', action='store_true',
+                      help='cvrp-abc: relocate / exchange / 2-opt / 2-opt* moves')
+    cvrp.add_argument('--move', choices=('two_swap', 'three_swap', 'routes'),
+                      default='two_swap', help='sa: move of the annealing')
+    cvrp.add_argument('--high', type=float, default=10,
+                      help='sa: the temperature falls from 10^HIGH')
+    cvrp.add_argument('--low', type=float, default=0,
+                      help='sa: the temperature falls to 10^LOW')
+
+    save = parser.add_argument_group('checkpoints (one run only, not --runs / --islands)')
+    save.add_argument('--checkpoint', metavar='FILE',
+                      help='save the state of the run to FILE (.npz) every so often')
+    save.add_argument('--checkpoint-every', type=int, metavar='N',
+                      help='checkpoint every N cycles of abc / cvrp-abc, moves of sa')
+    save.add_argument('--checkpoint-seconds', type=float, metavar='S',
+                      help='checkpoint every S seconds (default 60 without --checkpoint-every)')
+    save.add_argument('--resume', action='store_true',
+                      help='go on from the --checkpoint FILE when it exists')
+
+    measure = parser.add_argument_group('instrumentation (this process only, not --runs / --islands)')
+    measure.add_argument('--instrument', action='store_true',
+                         help='print the calls, time and accepted moves of every phase')
+    measure.add_argument('--profile', metavar='FILE',
+                         help='run in cProfile and dump the stats to FILE (python -m pstats FILE)')
+    measure.add_argument('--sample', metavar='FILE',
+                         help='sample the stack every millisecond, collapsed stacks to FILE')
+    return parser
+
+def abc_config(arguments, default, watchers=()):
+    ''' Function to make the ABCConfig of the arguments,
+        the parameters not given keep the default '''
+    changes = {'maximal_of_iteration': arguments.iterations,
+               'population_of_bee': arguments.population,
+               'limit_of_employee': arguments.limit,
+               'percentage_of_employee': arguments.employee,
+               'percentage_of_onlooker': arguments.onlooker,
+               'percentage_of_scout': arguments.scout,
+               'restart_limit': arguments.restart}
+    changes = {i: j for i, j in changes.items() if j is not None}
+    return default.replace(verbose=not arguments.quiet, sigmoid=arguments.sigmoid,
+                           **termination(arguments, watchers), **changes)
+
+def termination(arguments, watchers=()):
+    ''' Function to get the termination parameters
+        of the ABCConfig / SAConfig of the arguments,
+        watchers are the policies of the caller '''
+    return {'stall_limit': arguments.stall,
+            'improvement_window': arguments.window,
+            'improvement_epsilon': arguments.epsilon,
+            'deadline': arguments.deadline,
+            'watchers': tuple(watchers)}
+
+def checkpoints(arguments, parser):
+    ''' Function to get the Checkpointer and the checkpoint
+        file to resume from of the arguments '''
+    if arguments.checkpoint is None:
+        if arguments.resume:
+            parser.error('--resume needs --checkpoint')
+        return None, None
+    if arguments.runs > 1 or arguments.islands is not None:
+        parser.error('--checkpoint is of one run only, not --runs / --islands')
+    from .checkpoint import Checkpointer
+    seconds = arguments.checkpoint_seconds
+    if seconds is None and arguments.checkpoint_every is None:
+        seconds = 60
+    checkpoint = Checkpointer(arguments.checkpoint, arguments.checkpoint_every, seconds)
+    resume = None
+    if arguments.resume and os.path.exists(arguments.checkpoint):
+        resume = arguments.checkpoint
+    return checkpoint, resume
+
+def seed_all(seed):
+    ''' Function to seed both random generators '''
+    if seed is not None:
+        random.seed(seed)
+        import numpy as np
+        np.random.seed(seed % 2 ** 32)
+
+def run_abc(arguments, parser, instance=None, watchers=()):
+    ''' Function to run the ABC Algorithm on the TSP case,
+        instance is the (source, table) already loaded,
+        watchers are more termination policies watching
+        the run (the watchers of the config), returns the
+        best distance, the evaluations and the best path '''
+    if arguments.improve is not None and arguments.neighbours is None:
+        parser.error('--improve needs --neighbours')
+    if arguments.cache is not None:
+        parser.error('--cache is of cvrp-abc / sa with --optimal-split')
+    checkpoint, resume = checkpoints(arguments, parser)
+    from . import loaders, tsp
+    if instance is None:
+        source = loaders.read_instance(arguments.instance)
+    else:
+        source, table = instance
+    coordinate = not loaders.is_distance_table(source)
+    config = abc_config(arguments, ABCConfig(), watchers)
+    if coordinate:
+        if instance is None:
+            table = loaders.load_distance_table(arguments.instance)
+        arguments_of_run = (source, table, arguments.batched, arguments.max_evaluations,
+                            arguments.time_limit, arguments.neighbours, arguments.improve)
+        solver = tsp.main_type1
+    else:
+        if instance is None:
+            table = source.astype(float)
+        arguments_of_run = (source, arguments.batched, arguments.max_evaluations,
+                            arguments.time_limit, arguments.neighbours, arguments.improve)
+        solver = tsp.main_type2
+
+    if arguments.islands is not None:
+        candidates = None
+        if arguments.neighbours is not None:
+            candidates = tsp.make_candidate_lists(
+                table, arguments.neighbours, source if coordinate else None)
+        best = tsp.island_model(source, table, arguments.islands,
+                                arguments.interval, 'ring', arguments.batched,
+                                arguments.seed, candidates, arguments.improve,
+                                config, arguments.max_evaluations,
+                                arguments.time_limit)[1]
+    elif arguments.runs > 1:
+        from .parallel import multi_start
+        best = multi_start(functools.partial(solver, config=config),
+                           arguments_of_run, arguments.runs, arguments.seed)[1]
+    else:
+        seed_all(arguments.seed)
+        best = solver(*arguments_of_run, config=config, checkpoint=checkpoint, resume=resume)
+
+    if arguments.plot:
+        from .plot import history, visualize
+        history(best[1], len(best[1]), len(source), time.time() - arguments.start)
+        if coordinate:
+            visualize(source, best[0], len(source), best[2])
+    return best[2], best[3], best[0]
+
+def check_cache(arguments, parser):
+    ''' Function to check that --cache goes with --optimal-split,
+        the greedy split of a move costs less than the hash of
+        the path, so it never looks paths up '''
+    if arguments.cache is not None and not arguments.optimal_split:
+        parser.error('--cache needs --optimal-split')
+
+def load_vrp(arguments, instance=None):
+    ''' Function to load the CVRP case as the instance of vrp,
+        instance is the (nodes, depot, fleet, distance
+        matrix) already loaded '''
+    from . import loaders, vrp
+    if instance is None:
+        instance = loaders.load_instance(arguments.instance)
+    vrp.set_instance(*instance)
+    if arguments.cache is not None:
+        from .cache import EvaluationCache
+        vrp.evaluation_cache = EvaluationCache(len(vrp.tables), arguments.cache, arguments.seed)
+    return vrp
+
+def run_cvrp(arguments, parser, instance=None, watchers=()):
+    ''' Function to run the ABC Algorithm on the CVRP case
+        (instance as in load_vrp, watchers as in run_abc),
+        returns the best distance, the evaluations and the
+        routes (sub paths) of the best path '''
+    if arguments.runs > 1:
+        parser.error('--runs is not supported by cvrp-abc')
+    check_cache(arguments, parser)
+    checkpoint, resume = checkpoints(arguments, parser)
+    vrp = load_vrp(arguments, instance)
+    from . import cvrp
+    path_slice = vrp.optimal_path_slice if arguments.optimal_split else vrp.sub_path_slice
+    seed_all(arguments.seed)
+    best = cvrp.solve(path_slice, arguments.max_evaluations, arguments.time_limit,
+                      arguments.route_moves, abc_config(arguments, CVRP_ABC, watchers),
+                      checkpoint=checkpoint, resume=resume)
+    return best[1], best[2], best[0]
+
+def run_sa(arguments, parser, instance=None, watchers=()):
+    ''' Function to run the Simulated Annealing on the CVRP
+        case (instance as in load_vrp, watchers as in
+        run_abc), returns the best distance, the evaluations
+        and the routes (sub paths) of the best path '''
+    if arguments.restart is not None:
+        parser.error('--restart is not supported by sa')
+    check_cache(arguments, parser)
+    checkpoint, resume = checkpoints(arguments, parser)
+    config = SAConfig(move=arguments.move, high=arguments.high, low=arguments.low,
+                      path_slice='optimal' if arguments.optimal_split else 'greedy',
+                      **termination(arguments, watchers))
+    if arguments.iterations is not None:
+        config = config.replace(max_iteration=arguments.iterations)
+    load_vrp(arguments, instance)
+    from . import sa
+    best = sa.solve(config, arguments.runs, arguments.seed, checkpoint=checkpoint, resume=resume)
+    if not arguments.quiet:
+        print(best[0][1])
+        print(best[1])
+    return best[2], best[3], best[1]
+
+RUNS = {'abc': run_abc, 'cvrp-abc': run_cvrp, 'sa': run_sa}
+
+def measured(arguments, stack):
+    ''' Function to enter the instrumentation of the
+        arguments (--instrument, --profile, --sample)
+        into the ExitStack stack, returns the Instruments
+        recording the run (None without --instrument),
+        its report() goes with the result of the run '''
+    instruments = None
+    if arguments.instrument or arguments.profile or arguments.sample:
+        from . import instrument
+        if arguments.instrument:
+            instruments = stack.enter_context(instrument.recording(instrument.Instruments()))
+        if arguments.profile:
+            stack.enter_context(instrument.profiled(arguments.profile))
+        if arguments.sample:
+            stack.enter_context(instrument.sampled(arguments.sample))
+    return instruments
+
+def main(argv=None):
+    ''' Function to run the algorithm of the arguments
+        and print the best distance, the evaluations
+        and the computing time '''
+    parser = make_parser()
+    arguments = parser.parse_args(argv)
+    if not os.path.exists(arguments.instance):
+        parser.error('no such instance: ' + arguments.instance)
+    is_tsp = arguments.instance.endswith(TSP_EXTENSIONS)
+    if arguments.algorithm is None:
+        arguments.algorithm = 'abc' if is_tsp else 'cvrp-abc'
+    if (arguments.algorithm == 'abc') != is_tsp:
+        parser.error(arguments.algorithm + ' does not solve ' + arguments.instance)
+
+    arguments.start = time.time()
+    run = RUNS[arguments.algorithm]
+    with contextlib.ExitStack() as stack:
+        instruments = measured(arguments, stack)
+        distance, evaluations = run(arguments, parser)[:2]
+    print('Total Distance:', distance,
+          '\nEvaluations:', evaluations,
+          '\nComputing time:', time.time() - arguments.start, 'second')
+    if instruments is not None:
+        print(instruments)
+    return distance
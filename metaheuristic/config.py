@@ -0,0 +1,90 @@
+''' Parameter setting of the algorithms as explicit config objects,
+    the defaults are the parameter setting of the original scripts '''
+from dataclasses import dataclass, replace
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class ABCConfig:
+    ''' Parameter setting of the ABC Algorithm
+        - limit_of_employee    : cycles without improvement
+                                 before an employee bee scouts
+        - maximal_of_iteration : number of cycles
+        - population_of_bee    : number of bees in the hive
+        - percentage_of_*      : share of every role of bee
+        - verbose              : print the final result
+        - sigmoid              : use the swaps of the propose
+                                 algorithm (Sigmoid ABC)
+        the run stops earlier (see termination) after
+        - stall_limit          : cycles without improvement
+        - improvement_window   : cycles improving the best
+                                 distance by less than
+          improvement_epsilon    (relative)
+        - deadline             : seconds of wall-clock time
+        - restart_limit        : cycles without improvement
+                                 before every employee bee
+                                 scouts (the run goes on)
+        - watchers             : more policies (reset() and
+                                 a call on every record) of
+                                 the caller, the solve service
+                                 watches its jobs with one '''
+    limit_of_employee: int = 10
+    maximal_of_iteration: int = 100
+    population_of_bee: int = 100
+    percentage_of_employee: float = 0.5
+    percentage_of_onlooker: float = 0.5
+    percentage_of_scout: float = 0.01
+    verbose: bool = True
+    sigmoid: bool = False
+    stall_limit: Optional[int] = None
+    improvement_window: Optional[int] = None
+    improvement_epsilon: float = 0.001
+    deadline: Optional[float] = None
+    restart_limit: Optional[int] = None
+    watchers: tuple = ()
+
+    def replace(self, **changes):
+        ''' Method to copy the config with some parameters changed '''
+        return replace(self, **changes)
+
+
+# the parameter setting of the CVRP script
+CVRP_ABC = ABCConfig(limit_of_employee=6, population_of_bee=10)
+
+
+@dataclass(frozen=True)
+class SAConfig:
+    ''' Parameter setting of the Simulated Annealing
+        - max_iteration : number of moves
+        - move          : 'two_swap', 'three_swap' or 'routes'
+                          (relocate / exchange / 2-opt / 2-opt*)
+        - high, low     : the temperature falls from 10^high
+                          to 10^low over the moves
+        - path_slice    : 'greedy' fills the vehicles in order,
+                          'optimal' splits the path optimally
+        the stall_limit, improvement_window (in moves),
+        improvement_epsilon, deadline and watchers of ABCConfig stop
+        the annealing earlier, checked every 256 moves,
+        the best distance seldom improves while the
+        temperature is high, so the limits should reach
+        past the hot part of the schedule '''
+    max_iteration: int = 1000
+    move: str = 'two_swap'
+    high: float = 10
+    low: float = 0
+    path_slice: str = 'greedy'
+    stall_limit: Optional[int] = None
+    improvement_window: Optional[int] = None
+    improvement_epsilon: float = 0.001
+    deadline: Optional[float] = None
+    watchers: tuple = ()
+
+    def __post_init__(self):
+        if self.move not in ('two_swap', 'three_swap', 'routes'):
+            raise ValueError('unknown move: ' + str(self.move))
+        if self.path_slice not in ('greedy', 'optimal'):
+            raise ValueError('unknown path slice: ' + str(self.path_slice))
+
+    def replace(self, **changes):
+        ''' Method to copy the config with some parameters changed '''
+        return replace(self, **changes)
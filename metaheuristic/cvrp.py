@@ -0,0 +1,331 @@
+''' Artificial Bee Colony Optimization ---------------------------------------------------------------------------------
+    For Vehicle Routing Problem on the instance of vrp.set_instance '''
+import math, random, time
+import numpy as np
+from . import vrp
+from .checkpoint import (load_checkpoint, pack_routes, path_state, policies_state, restore_path, restore_policies,
+                         set_random_state, unpack_routes)
+from .config import CVRP_ABC
+from .instrument import recording
+from .progress import Progress, collect_progress
+from .termination import restart_policy, termination_policies, until
+from .vrp import RouteState, SplitEvaluator, routes_to_sub_path, split_routes, sub_path, sub_path_slice
+
+instruments = None  # the Instruments of instrument.recording count the moves of every phase
+
+def path_swap(path, i, j, vehicle):
+    new_swap = path[:i] + path[j:j + 1] + path[i + 1:j] + path[i:i + 1] + path[j + 1:]
+    # sigmoid = 1 / (1 + np.exp(-1 * path_to_distance(new_swap, vehicle)))
+    # if sigmoid > random.random():
+    #     new_path = new_swap
+    # else:
+    #     new_path = path
+    return new_swap
+
+class Hive:
+    # one row / element for every bee, split holds the SplitEvaluator working on each path row (or the
+    # RouteState of the bee with route moves, the path row is then its tour)
+    def __init__(self, population, node_set):
+        self.path = np.tile(np.asarray(node_set, dtype=np.int32), (population, 1))
+        self.distance = np.zeros(population)
+        self.cycle = np.zeros(population, dtype=np.int32)
+        self.role = np.full(population, '', dtype='<U1')
+        self.split = [None] * population
+
+    def __len__(self):
+        return len(self.distance)
+
+    def __str__(self):
+        return '\n'.join('(' + str(self.role[i]) + ', ' + str(self.path[i].tolist()) + ', ' + str(self.distance[i]) + ')'
+                         for i in range(len(self)))
+
+    def state(self):
+        # copy of the bees for a checkpoint, with route moves the length of every route of every bee
+        state = {'path': self.path.copy(), 'distance': self.distance.copy(), 'trial': self.cycle.copy(),
+                 'role': self.role.copy()}
+        routes = [i for i in range(len(self)) if isinstance(self.split[i], RouteState)]
+        if routes:
+            state['bees'] = np.array(routes)
+            state['route_lengths'] = np.array([pack_routes(self.split[i].routes)[1] for i in routes])
+        return state
+
+    def restore(self, state, vehicle, path_slice=sub_path_slice):
+        # bees of a checkpoint, the split of every employee and scout bee is built again on its path (its
+        # routes with route moves), the distance of the checkpoint is kept as the split updates it move by move
+        if state['path'].shape != self.path.shape:
+            raise ValueError('the checkpoint is not of this instance and population')
+        self.path[:] = state['path']
+        self.distance[:] = state['distance']
+        self.cycle[:] = state['trial']
+        self.role[:] = state['role']
+        self.split = [None] * len(self)
+        if 'bees' in state:
+            for bee, lengths in zip(state['bees'].tolist(), state['route_lengths']):
+                self.split[bee] = RouteState(unpack_routes(self.path[bee], lengths), vehicle)
+        else:
+            for bee in np.flatnonzero(np.isin(self.role, ['E', 'S'])):
+                self.split[bee] = SplitEvaluator(self.path[bee], vehicle, path_slice)
+        for bee in range(len(self)):
+            if self.split[bee] is not None:
+                self.split[bee].distance = self.distance[bee]
+
+def initialize_hive(population, data):
+    path = [i for i in range(0, len(data))]
+    hive = Hive(population, path)
+    return hive
+
+def new_split(hive, bee, vehicle, path_slice=sub_path_slice, route_moves=False):
+    if route_moves:
+        hive.split[bee] = RouteState(split_routes(hive.path[bee], vehicle, path_slice), vehicle)
+        hive.path[bee] = hive.split[bee].tour()
+    else:
+        hive.split[bee] = SplitEvaluator(hive.path[bee], vehicle, path_slice)
+    hive.distance[bee] = hive.split[bee].distance
+
+def assign_roles(hive, role_percentage, vehicle, path_slice=sub_path_slice, route_moves=False):
+    population = len(hive)
+    onlooker_count = math.floor(population * role_percentage[0])
+    employee_count = math.floor(population * role_percentage[1])
+    hive.role[:onlooker_count] = 'O'
+    for i in range(onlooker_count, (onlooker_count + employee_count)):
+        hive.role[i] = 'E'
+        new_path = hive.path[i].tolist()
+        random.shuffle(new_path)
+        hive.path[i] = new_path
+        new_split(hive, i, vehicle, path_slice, route_moves)
+    return hive
+
+def employee(hive, bee, data, vehicle, limit):
+    split = hive.split[bee]
+    if isinstance(split, RouteState):
+        # the route move is costed first and only applied when it improves
+        move, new_distance = split.propose()
+        if new_distance < hive.distance[bee]:
+            new_distance = split.apply(move)
+            hive.path[bee] = split.tour()
+    else:
+        [i, j] = sorted(random.sample(range(len(data)), 2))
+        new_distance = split.swap(i, j)
+        if new_distance >= hive.distance[bee]:
+            split.revert()
+    if new_distance < hive.distance[bee]:
+        hive.distance[bee] = new_distance
+        hive.cycle[bee] = 0
+    else:
+        hive.cycle[bee] = hive.cycle[bee] + 1
+    if hive.cycle[bee] >= limit:
+        hive.role[bee] = 'S'
+    return hive.distance[bee]
+
+def scout(hive, bee, vehicle, path_slice=sub_path_slice, route_moves=False):
+    new_path = hive.path[bee].tolist()
+    random.shuffle(new_path)
+    hive.path[bee] = new_path
+    new_split(hive, bee, vehicle, path_slice, route_moves)
+    hive.role[bee] = 'E'
+    hive.cycle[bee] = 0
+
+def waggle(hive, best_distance, data, employee_limit, scout_count, vehicle, path_slice=sub_path_slice,
+           route_moves=False):
+    # with route moves the best path is the list of routes of the best bee
+    best_path = []
+    result = []
+    for i in range(0, len(hive)):
+        if hive.role[i] == 'E':
+            path_distance = employee(hive, i, data, vehicle, employee_limit)
+            if path_distance < best_distance:
+                best_distance = path_distance
+                best_path = hive.split[i].tolist() if route_moves else hive.path[i].tolist()
+            result.append(i)
+        elif hive.role[i] == 'S':
+            scout(hive, i, vehicle, path_slice, route_moves)
+    result = np.array(result, dtype=int)
+    scouts = result[np.argsort(-hive.distance[result], kind='stable')[0:int(scout_count)]]
+    hive.role[scouts] = 'S'
+    if instruments is not None:
+        instruments.employee_phase(hive, result, employee_limit)
+    return best_distance, best_path
+
+def onlooker(hive, best_distance, best_path, data, vehicle, path_slice=sub_path_slice, route_moves=False):
+    onlookers = np.flatnonzero(hive.role == 'O')
+    accepted = 0
+    if route_moves:
+        state = RouteState(best_path, vehicle)
+        for bee in onlookers:
+            move, new_distance = state.propose()
+            if new_distance < best_distance:
+                best_distance = state.apply(move)
+                accepted = accepted + 1
+        best_path = state.tolist()
+    else:
+        split = SplitEvaluator(best_path, vehicle, path_slice)
+        for bee in onlookers:
+            [i, j] = sorted(random.sample(range(len(data)), 2))
+            new_distance = split.swap(i, j)
+            if new_distance < best_distance:
+                best_distance = new_distance
+                accepted = accepted + 1
+            else:
+                split.revert()
+        best_path = split.path.tolist()
+    if instruments is not None:
+        instruments.moves('onlooker', accepted, len(onlookers))
+    return best_distance, best_path
+
+def reseed(hive, vehicle, path_slice=sub_path_slice, route_moves=False):
+    # every employee and scout bee finds a new food source when the search stagnates, returns the best of them
+    employed = np.flatnonzero(np.isin(hive.role, ['E', 'S']))
+    if instruments is not None:
+        instruments.scouts['restart'] += len(employed)
+    for bee in employed:
+        scout(hive, bee, vehicle, path_slice, route_moves)
+    best = employed[np.argmin(hive.distance[employed])]
+    return hive.distance[best], hive.split[best].tolist() if route_moves else hive.path[best].tolist()
+
+def iterate_cycles(hive, waggle_phase, onlooker_phase, max_iteration, max_evaluations=None, time_limit=None,
+                   restart=None, reseed_phase=None, checkpoint=None, state=None, termination=()):
+    # cycle engine of the ABC algorithm, every cycle runs the employee phase and the onlooker phase
+    # exactly once and counts every objective evaluation, it stops after max_iteration cycles,
+    # max_evaluations evaluations or time_limit seconds, whichever is first, a Progress record of the
+    # initial hive (cycle 0) and of every cycle is yielded, closing the generator stops the run, when the restart
+    # policy fires reseed_phase() -> distance, path seeds the hive again and the search goes on from the best of
+    # the new food sources, the records keep the best path of the whole run, checkpoint (a Checkpointer) saves the
+    # state of the run every so many cycles, state (of load_checkpoint) goes on from that checkpoint on the hive
+    # restored from it, without the records of the cycles before, the termination policies (that read the
+    # records) go to the checkpoint and are restored from it too
+    if state is None:
+        employed = np.flatnonzero(hive.role == 'E')
+        evaluations = len(employed)  # evaluated once by assign_roles
+        best = employed[np.argmin(hive.distance[employed])]
+        best_distance = hive.distance[best]
+        best_path = hive.path[best].tolist()
+        if isinstance(hive.split[best], RouteState):
+            best_path = hive.split[best].tolist()  # the onlooker phase works on the routes of the best bee
+        found_distance, found_path = best_distance, best_path  # best of the whole run
+        found_cycle, found_phase = 0, 'E'
+        yield Progress(0, found_distance, 'E', int(evaluations), found_path)
+        if restart is not None:
+            restart.reset()
+        start = time.time()
+        cycle = 1
+    else:
+        evaluations = int(state['evaluations'])
+        best_distance, best_path = float(state['best_distance']), restore_path(state, 'best_path')
+        found_distance, found_path = float(state['found_distance']), restore_path(state, 'found_path')
+        found_cycle, found_phase = int(state['found_cycle']), str(state['found_phase'])
+        if restart is not None:
+            restart.restore(state['restart'])
+        restore_policies(termination, state)
+        start = time.time() - float(state['elapsed'])
+        cycle = int(state['cycle']) + 1
+        set_random_state(state)
+    if checkpoint is not None:
+        checkpoint.start(cycle - 1)
+    while cycle <= max_iteration:
+        if max_evaluations is not None and evaluations >= max_evaluations:
+            break
+        if time_limit is not None and time.time() - start >= time_limit:
+            break
+        phase = ''
+        evaluations = evaluations + np.count_nonzero(np.isin(hive.role, ['E', 'S']))
+        waggle_distance, waggle_path = waggle_phase(best_distance)
+        if waggle_distance < best_distance:
+            best_distance = waggle_distance
+            best_path = list(waggle_path)
+            if best_distance < found_distance:
+                found_distance, found_path = best_distance, best_path
+                phase = 'E'
+                found_cycle, found_phase = cycle, phase
+        evaluations = evaluations + np.count_nonzero(hive.role == 'O')
+        onlooker_distance, onlooker_path = onlooker_phase(best_distance, best_path)
+        if onlooker_distance < best_distance:
+            best_distance = onlooker_distance
+            best_path = list(onlooker_path)
+            if best_distance < found_distance:
+                found_distance, found_path = best_distance, best_path
+                phase = 'O'
+                found_cycle, found_phase = cycle, phase
+        record = Progress(cycle, found_distance, phase, int(evaluations), found_path)
+        yield record
+        if restart is not None and restart(record):
+            evaluations = evaluations + np.count_nonzero(np.isin(hive.role, ['E', 'S']))
+            best_distance, best_path = reseed_phase()
+            restart.reset()
+        if checkpoint is not None and checkpoint.due(cycle):
+            snapshot = dict(hive.state(), **path_state('best_path', best_path), **path_state('found_path', found_path),
+                            cycle=cycle, evaluations=evaluations, best_distance=best_distance,
+                            found_distance=found_distance, found_cycle=found_cycle, found_phase=found_phase,
+                            elapsed=time.time() - start, **policies_state(termination))
+            if restart is not None:
+                snapshot['restart'] = restart.state()
+            checkpoint.save(cycle, snapshot)
+        cycle = cycle + 1
+
+def run_cycles(hive, waggle_phase, onlooker_phase, max_iteration, max_evaluations=None, time_limit=None,
+               history=None):
+    # iterate_cycles run to the end, the best distance of every cycle is appended to history (a list by default)
+    return collect_progress(iterate_cycles(hive, waggle_phase, onlooker_phase, max_iteration, max_evaluations,
+                                           time_limit), history)
+
+def solve(path_slice=sub_path_slice, max_evaluations=None, time_limit=None, route_moves=False, config=CVRP_ABC,
+          history=None, instruments=None, checkpoint=None, resume=None):
+    # route_moves=True searches the routes of the split paths with relocate / exchange / 2-opt / 2-opt*
+    # moves instead of swapping nodes of the paths and splitting them again, config is an ABCConfig, the best
+    # distance of every cycle is appended to history (a RingHistory or DecimatedHistory keeps it bounded), the
+    # termination and restart policies of config apply, an Instruments (see instrument) records the calls, time
+    # and moves of every phase of the run, a Checkpointer (see checkpoint) saves the run every so many cycles and
+    # resume is the checkpoint file to go on from (with the same instance and parameters)
+    role_percentage = [config.percentage_of_onlooker, config.percentage_of_employee]
+    data = vrp.tables
+    vehicles = vrp.vehicles
+    if history is None:
+        history = []
+    state, result, evaluations = None, None, 0
+    if resume is not None:
+        state = load_checkpoint(resume)
+        if isinstance(history, list) and 'history' in state:
+            history.extend(state['history'].tolist())
+        result = (int(state['found_cycle']), restore_path(state, 'found_path'), float(state['found_distance']),
+                  str(state['found_phase']))
+        evaluations = int(state['evaluations'])
+    if checkpoint is not None:
+        checkpoint.history = history
+    with recording(instruments):
+        hive = initialize_hive(config.population_of_bee, data)
+        if state is None:
+            assign_roles(hive, role_percentage, vehicles, path_slice, route_moves)
+        else:
+            hive.restore(state, vehicles, path_slice)
+        number_of_scout = np.ceil(config.population_of_bee * config.percentage_of_scout)
+        termination = termination_policies(config)
+        records = iterate_cycles(
+            hive,
+            lambda best_distance: waggle(hive, best_distance, data, config.limit_of_employee, number_of_scout,
+                                         vehicles, path_slice, route_moves),
+            lambda best_distance, best_path: onlooker(hive, best_distance, best_path, data, vehicles, path_slice,
+                                                      route_moves),
+            config.maximal_of_iteration, max_evaluations, time_limit, restart_policy(config),
+            lambda: reseed(hive, vehicles, path_slice, route_moves), checkpoint, state, termination)
+        try:
+            result, history, evaluations = collect_progress(until(records, termination), history, result,
+                                                            evaluations)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+    the_best_cycle = result[0]
+    the_best_path = result[1]
+    the_best_distance = result[2]
+
+    if route_moves:
+        best_slice, best_sub_path = routes_to_sub_path(the_best_path)
+    else:
+        best_slice = path_slice(the_best_path, vehicles)
+        best_sub_path = sub_path(best_slice[0], the_best_path)
+
+    if config.verbose:
+        print(the_best_cycle)
+        print(best_slice[1])
+        print(best_sub_path)
+        print(the_best_distance)
+        print(evaluations)
+    return best_sub_path, the_best_distance, evaluations
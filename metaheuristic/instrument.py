@@ -0,0 +1,203 @@
+''' Instrumentation of the hot path: calls and cumulative time of the
+    phases, objective functions and split routines, accepted / proposed
+    moves of the ABC phases, scout bee triggers and the acceptance of the
+    Simulated Annealing per temperature band (decade of temperature)
+
+    instruments = Instruments()
+    result = tsp.main_type1(source, table, instruments=instruments)
+    print(instruments)
+
+    nothing is recorded while no Instruments is given: the timed
+    functions are only wrapped while recording, the counters are one
+    test of a module global per phase (per block of moves for the
+    Simulated Annealing), the forked processes of multi_start,
+    island_model and parallel_tempering are not recorded,
+    profiled and sampled wrap a run in cProfile or in a sampling
+    profiler (unix only) and dump the stats '''
+import cProfile, collections, contextlib, functools, os, pstats, signal, time
+import numpy as np
+
+
+# the functions timed while recording, by module, Class.method for methods, a function is
+# also timed where another module imported it, the path_slice functions are left alone as
+# SplitEvaluator tells them by identity
+TIMED = {'tsp': ['waggle', 'waggle_batch', 'employee', 'scout', 'onlooker', 'onlooker_batch', 'reseed',
+                 'local_search', 'swap_delta', 'get_total_distance_of_path'],
+         'cvrp': ['waggle', 'employee', 'scout', 'onlooker', 'reseed'],
+         'sa': ['anneal_split', 'anneal_routes'],
+         'vrp': ['path_to_distance', 'split_routes', 'SplitEvaluator.assign', 'SplitEvaluator.revert',
+                 'RouteState.propose', 'RouteState.apply']}
+
+
+class Instruments:
+    ''' Class as the measurements of the runs recorded with it,
+        the times of nested functions overlap (tsp.waggle
+        includes tsp.employee and tsp.scout) '''
+    def __init__(self):
+        ''' Method to initialize empty measurements '''
+        self.calls = collections.Counter()
+        self.seconds = collections.Counter()
+        self.proposed = collections.Counter()
+        self.accepted = collections.Counter()
+        self.scouts = collections.Counter()
+        self.band_proposed = collections.Counter()
+        self.band_accepted = collections.Counter()
+    def timed(self, name, function):
+        ''' Method to wrap function so its calls
+            and time are counted under name '''
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.seconds[name] += time.perf_counter() - start
+                self.calls[name] += 1
+        return wrapper
+    def moves(self, phase, accepted, proposed):
+        ''' Method to count the moves of a phase '''
+        self.accepted[phase] += int(accepted)
+        self.proposed[phase] += int(proposed)
+    def employee_phase(self, hive, employed, limit):
+        ''' Method to count the moves of the employee bees and
+            the scout bees they trigger, after the waggle phase:
+            a bee that accepted its move starts its cycle count
+            again, a bee at the limit scouts, the other scout
+            bees have the longest distance '''
+        limited = np.count_nonzero(hive.cycle[employed] >= limit)
+        self.moves('employee', np.count_nonzero(hive.cycle[employed] == 0), len(employed))
+        self.scouts['limit'] += int(limited)
+        self.scouts['ranking'] += int(np.count_nonzero(hive.role[employed] == 'S') - limited)
+    def anneal(self, temperatures, accepted):
+        ''' Method to count the moves of a block of
+            the Simulated Annealing by temperature band,
+            accepted holds the index of the accepted moves '''
+        bands = np.floor(np.log10(temperatures)).astype(int)
+        for band, count in zip(*np.unique(bands, return_counts=True)):
+            self.band_proposed[int(band)] += int(count)
+        for band, count in zip(*np.unique(bands[accepted], return_counts=True)):
+            self.band_accepted[int(band)] += int(count)
+    def report(self):
+        ''' Method to get the measurements as a dictionary
+            (the temperature bands keyed by 10 ** band) '''
+        return {'timers': {i: {'calls': self.calls[i], 'seconds': self.seconds[i]} for i in sorted(self.calls)},
+                'moves': {i: {'proposed': self.proposed[i], 'accepted': self.accepted[i],
+                              'ratio': self.accepted[i] / self.proposed[i] if self.proposed[i] else 0.0}
+                          for i in sorted(self.proposed)},
+                'scouts': dict(self.scouts),
+                'temperatures': {'1e%d' % i: {'proposed': self.band_proposed[i], 'accepted': self.band_accepted[i],
+                                              'ratio': self.band_accepted[i] / self.band_proposed[i]}
+                                 for i in sorted(self.band_proposed, reverse=True)}}
+    def __str__(self):
+        ''' Method to interpret
+            the measurements as a table '''
+        report = self.report()
+        lines = ['%-32s %10s %12s %12s' % ('timer', 'calls', 'seconds', 'per call')]
+        for name, timer in sorted(report['timers'].items(), key=lambda i: -i[1]['seconds']):
+            lines.append('%-32s %10d %12.6f %12.3e' % (name, timer['calls'], timer['seconds'],
+                                                      timer['seconds'] / timer['calls']))
+        for phase, moves in report['moves'].items():
+            lines.append('%-32s %10d / %10d accepted (%.1f%%)' % (phase + ' moves', moves['accepted'],
+                                                                 moves['proposed'], 100 * moves['ratio']))
+        if report['scouts']:
+            lines.append('%-32s ' % 'scout bees' + ', '.join('%s %d' % i for i in sorted(report['scouts'].items())))
+        for band, moves in report['temperatures'].items():
+            lines.append('%-32s %10d / %10d accepted (%.1f%%)' % ('temperature ' + band, moves['accepted'],
+                                                                 moves['proposed'], 100 * moves['ratio']))
+        return '\n'.join(lines)
+
+@contextlib.contextmanager
+def recording(instruments):
+    ''' Function as context manager to record the runs
+        of the block with instruments, nothing is
+        recorded (or wrapped) when it is None '''
+    if instruments is None:
+        yield instruments
+        return
+    from . import cvrp, sa, tsp, vrp
+    if tsp.instruments is instruments:
+        # already recording with them
+        yield instruments
+        return
+    modules = {'cvrp': cvrp, 'sa': sa, 'tsp': tsp, 'vrp': vrp}
+    patched = []
+    for module, names in TIMED.items():
+        for name in names:
+            owner = modules[module]
+            *classes, attribute = name.split('.')
+            for i in classes:
+                owner = getattr(owner, i)
+            function = vars(owner)[attribute]
+            wrapper = instruments.timed(module + '.' + name, function)
+            owners = [owner] if classes else [i for i in modules.values() if vars(i).get(attribute) is function]
+            for owner in owners:
+                patched.append((owner, attribute, function))
+                setattr(owner, attribute, wrapper)
+    previous = [(i, i.instruments) for i in (cvrp, sa, tsp)]
+    for module, _ in previous:
+        module.instruments = instruments
+    try:
+        yield instruments
+    finally:
+        for module, before in previous:
+            module.instruments = before
+        for owner, attribute, function in reversed(patched):
+            setattr(owner, attribute, function)
+
+@contextlib.contextmanager
+def profiled(file_name=None, sort='cumulative', limit=30):
+    ''' Function as context manager to run the block in
+        cProfile, the stats are dumped to file_name
+        (python -m pstats file_name) or the limit most
+        expensive functions by sort are printed '''
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        if file_name is not None:
+            profile.dump_stats(file_name)
+        else:
+            pstats.Stats(profile).sort_stats(sort).print_stats(limit)
+
+def frame_stack(frame):
+    ''' Function to get the stack of a frame
+        as 'module:function' from the outermost '''
+    stack = []
+    while frame is not None:
+        module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+        stack.append(module + ':' + frame.f_code.co_name)
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+@contextlib.contextmanager
+def sampled(file_name=None, interval=0.001):
+    ''' Function as context manager to sample the stack
+        of the main thread every interval seconds of CPU
+        time while the block runs, the samples are
+        counted by stack and dumped to file_name in the
+        collapsed format of flamegraph.pl / speedscope
+        ('a;b;c count' per line), or the functions
+        sampled most often are printed '''
+    stacks = collections.Counter()
+    def sample(signal_number, frame):
+        stacks[frame_stack(frame)] += 1
+    previous = signal.signal(signal.SIGPROF, sample)
+    signal.setitimer(signal.ITIMER_PROF, interval, interval)
+    try:
+        yield stacks
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, previous)
+        if file_name is not None:
+            with open(file_name, 'w') as f:
+                for stack, count in stacks.most_common():
+                    f.write(stack + ' ' + str(count) + '\n')
+        else:
+            leaves = collections.Counter()
+            for stack, count in stacks.items():
+                leaves[stack.rsplit(';', 1)[-1]] += count
+            total = max(sum(leaves.values()), 1)
+            for function, count in leaves.most_common(20):
+                print('%-48s %8d %6.1f%%' % (function, count, 100 * count / total))
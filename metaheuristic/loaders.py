@@ -0,0 +1,269 @@
+''' Instance loaders: nodes coordinate or distance table of the
+    TSP case (.csv, TSPLIB .tsp) and nodes, depot and fleet of
+    the CVRP case (excel, TSPLIB .vrp, compact .npz),
+    pandas and scipy are only imported when they are needed '''
+import hashlib, math, os
+import numpy as np
+
+
+# EDGE_WEIGHT_TYPE of the TSPLIB nodes coordinate make_distance_table knows
+EDGE_WEIGHT_TYPES = ('EUC_2D', 'CEIL_2D', 'ATT', 'GEO')
+
+def read_data_file(file_name):
+    ''' Function to read data from csv file
+        thus become an array of coordinate of cities
+        (or of the distance table) in one go '''
+    return np.loadtxt(file_name, delimiter=',', ndmin=2)
+
+def parse_tsplib(file_name):
+    ''' Function to read the header (KEY : VALUE) and the
+        sections of a TSPLIB file, every number of a
+        *_SECTION is parsed into one flat array '''
+    header, sections, section = {}, {}, None
+    with open(file_name) as f:
+        for line in f:
+            line = line.strip()
+            word = line.split(':')[0].strip()
+            if not line or line == 'EOF':
+                continue
+            if word.endswith('_SECTION'):
+                section = word
+                sections[section] = []
+            elif ':' in line:
+                header[word] = line.split(':', 1)[1].strip()
+                section = None
+            elif section is not None:
+                sections[section].append(line)
+    sections = {i: np.array(' '.join(j).split(), dtype=float)
+                for i, j in sections.items()}
+    return header, sections
+
+def check_edge_weight_type(header, supported, file_name):
+    ''' Function to raise ValueError when the nodes
+        coordinate of a TSPLIB file are of another
+        EDGE_WEIGHT_TYPE than the supported ones '''
+    weight_type = header.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+    if weight_type not in supported:
+        raise ValueError('EDGE_WEIGHT_TYPE ' + weight_type + ' of ' + file_name
+                         + ' is not supported (only ' + ', '.join(supported) + ')')
+    return weight_type
+
+def edge_weight_type(file_name):
+    ''' Function to get the EDGE_WEIGHT_TYPE of a TSPLIB
+        .tsp file (the header only is read), None for a
+        .csv file whose distance is the exact euclidean
+        one '''
+    if not file_name.endswith('.tsp'):
+        return None
+    with open(file_name) as f:
+        for line in f:
+            word = line.split(':')[0].strip()
+            if word == 'EDGE_WEIGHT_TYPE':
+                return line.split(':', 1)[1].strip()
+            if word.endswith('_SECTION'):
+                break
+    return 'EUC_2D'
+
+def read_tsplib(file_name):
+    ''' Function to read data from TSPLIB .tsp file,
+        the coordinate of cities as [index, x, y] rows
+        (index from 0) like read_data_file, or the
+        distance table of an EXPLICIT file, ValueError
+        for coordinate of an EDGE_WEIGHT_TYPE that
+        make_distance_table does not know (EUC_3D) '''
+    header, sections = parse_tsplib(file_name)
+    if 'NODE_COORD_SECTION' in sections:
+        check_edge_weight_type(header, EDGE_WEIGHT_TYPES, file_name)
+        data = sections['NODE_COORD_SECTION'].reshape(-1, 3)
+        data = data[np.argsort(data[:, 0], kind='stable')]
+        data[:, 0] = np.arange(len(data))
+        return data
+    return tsplib_table(sections['EDGE_WEIGHT_SECTION'],
+                        int(header['DIMENSION']),
+                        header.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX'))
+
+def tsplib_table(weights, dimension, weight_format):
+    ''' Function to make the distance table from the
+        EDGE_WEIGHT_SECTION numbers of a TSPLIB file,
+        a column-wise triangle is the row-wise one
+        of the other side '''
+    if weight_format == 'FULL_MATRIX':
+        return weights.reshape(dimension, dimension)
+    if weight_format.endswith('_COL'):
+        weight_format = {'UPPER': 'LOWER', 'LOWER': 'UPPER'}[
+            weight_format[:5]] + weight_format[5:]
+    shift = 0 if 'DIAG' in weight_format else 1
+    if weight_format.startswith('UPPER'):
+        rows, columns = np.triu_indices(dimension, shift)
+    else:
+        rows, columns = np.tril_indices(dimension, -shift)
+    table = np.zeros((dimension, dimension))
+    table[rows, columns] = weights
+    table[columns, rows] = weights
+    return table
+
+def read_instance(file_name):
+    ''' Function to read data from .csv or TSPLIB .tsp file '''
+    if file_name.endswith('.tsp'):
+        return read_tsplib(file_name)
+    return read_data_file(file_name)
+
+def is_distance_table(data):
+    ''' Function to tell a distance table (type 2 dataset)
+        from nodes coordinate (type 1 dataset): a square
+        table with only zeros on the diagonal '''
+    data = np.asarray(data)
+    return (data.shape[0] == data.shape[1]
+            and not np.any(np.diagonal(data)))
+
+def make_distance_table(list_of_data, weight_type=None):
+    ''' Function to make matrix / table
+        of distance between nodes (cities),
+        the exact euclidean distance when weight_type
+        is None, else the distance of that TSPLIB
+        EDGE_WEIGHT_TYPE (see edge_weight_type):
+        - EUC_2D  : euclidean rounded to the nearest
+        - CEIL_2D : euclidean rounded up
+        - ATT     : pseudo-euclidean of the att instances
+        - GEO     : geographical (kilometre) of the
+                    latitude / longitude in DDD.MM '''
+    from scipy.spatial import distance
+    coordinate = np.asarray(list_of_data, dtype=np.float64)[:, 1:3]
+    if weight_type == 'GEO':
+        return geo_distance_table(coordinate)
+    if weight_type == 'ATT':
+        # rij = sqrt((xd^2 + yd^2) / 10), rounded up unless it is whole
+        exact = np.sqrt(distance.cdist(coordinate, coordinate, 'sqeuclidean') / 10.0)
+        table = np.floor(exact + 0.5)
+        table = table + (table < exact)
+    elif weight_type is None:
+        table = distance.cdist(coordinate, coordinate)
+    elif weight_type == 'EUC_2D':
+        table = np.floor(distance.cdist(coordinate, coordinate) + 0.5)
+    elif weight_type == 'CEIL_2D':
+        table = np.ceil(distance.cdist(coordinate, coordinate))
+    else:
+        raise ValueError('EDGE_WEIGHT_TYPE ' + weight_type + ' is not supported (only '
+                         + ', '.join(EDGE_WEIGHT_TYPES) + ')')
+    return np.ascontiguousarray(table)
+
+def geo_distance_table(coordinate):
+    ''' Function to make the TSPLIB GEO distance table,
+        x is the latitude and y the longitude in degrees
+        and minutes (DDD.MM), on the earth of TSPLIB '''
+    degree = np.trunc(coordinate)
+    radian = 3.141592 * (degree + 5.0 * (coordinate - degree) / 3.0) / 180.0
+    latitude, longitude = radian[:, 0], radian[:, 1]
+    q1 = np.cos(longitude[:, np.newaxis] - longitude[np.newaxis, :])
+    q2 = np.cos(latitude[:, np.newaxis] - latitude[np.newaxis, :])
+    q3 = np.cos(latitude[:, np.newaxis] + latitude[np.newaxis, :])
+    cosine = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+    table = np.trunc(6378.388 * np.arccos(cosine) + 1.0)
+    np.fill_diagonal(table, 0.0)
+    return np.ascontiguousarray(table)
+
+def load_distance_table(file_name, coordinate=True, cache_dir=None):
+    ''' Function to load the distance table of an instance,
+        the table is built once and stored as .npy file
+        keyed by the hash of the instance file, later runs
+        memory-map the stored table instead of rebuilding it
+        - coordinate=True  : file contains nodes coordinate
+          (of the EDGE_WEIGHT_TYPE of a TSPLIB file)
+        - coordinate=False : file already is a distance table '''
+    with open(file_name, 'rb') as f:
+        key = hashlib.sha1(f.read()).hexdigest()
+    weight_type = edge_weight_type(file_name)
+    if not coordinate:
+        key = key + '-table'
+    elif weight_type is not None:
+        key = key + '-' + weight_type
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(file_name), '.cache')
+    cache_file = os.path.join(cache_dir, key + '.npy')
+    if not os.path.exists(cache_file):
+        data = read_instance(file_name)
+        if coordinate:
+            table = make_distance_table(data, weight_type)
+        else:
+            table = np.asarray(data, dtype=np.float64)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = cache_file + '.' + str(os.getpid()) + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            np.save(f, table)
+        os.replace(tmp_file, cache_file)
+    return np.load(cache_file, mmap_mode='r')
+
+def read_vrp(file_name):
+    ''' Function to read TSPLIB .vrp file (coordinates) as the
+        nodes (x, y, demand, the depot last) and the fleet
+        (vehicle, capacity) of the excel sheets, the number of
+        vehicles is VEHICLES, the k<number> part of the NAME
+        or the least number of vehicles the demand needs,
+        only EUC_2D coordinates are read (ValueError for
+        the other types) and vrp keeps their distance as
+        the exact euclidean one of the excel instances '''
+    header, sections = parse_tsplib(file_name)
+    check_edge_weight_type(header, ('EUC_2D',), file_name)
+    coordinate = sections['NODE_COORD_SECTION'].reshape(-1, 3)
+    demand = sections['DEMAND_SECTION'].reshape(-1, 2)
+    coordinate = coordinate[np.argsort(coordinate[:, 0], kind='stable')]
+    demand = demand[np.argsort(demand[:, 0], kind='stable')]
+    nodes = np.column_stack((coordinate[:, 1:3], demand[:, 1]))
+    is_depot = coordinate[:, 0] == sections['DEPOT_SECTION'][0]
+    nodes = np.vstack((nodes[~is_depot], nodes[is_depot]))
+    capacity = float(header['CAPACITY'])
+    count = [int(i[1:]) for i in header.get('NAME', '').split('-')
+             if i[:1] == 'k' and i[1:].isdigit()]
+    if 'VEHICLES' in header:
+        count = [int(header['VEHICLES'])]
+    if not count:
+        count = [math.ceil(demand[:, 1].sum() / capacity)]
+    fleet = np.column_stack((np.arange(1, count[0] + 1),
+                             np.full(count[0], capacity)))
+    return nodes, fleet
+
+def save_instance(file_name, nodes, depot, fleet):
+    ''' Function to store a compact .npz instance of the nodes
+        (x, y), demands, depot (x, y) and fleet (vehicle,
+        capacity), written to a temporary file first so a
+        reader never sees half a file '''
+    os.makedirs(os.path.dirname(file_name) or '.', exist_ok=True)
+    tmp_file = file_name + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        np.savez(f, nodes=nodes[:, :2], demand=nodes[:, 2],
+                 depot=depot[:2], fleet=fleet)
+    os.replace(tmp_file, file_name)
+
+def convert_excel(file_name, npz_file):
+    ''' Function to convert an excel instance to .npz,
+        Sheet1 holds the nodes (x, y, demand) with the
+        depot last, Sheet2 the fleet (vehicle, capacity) '''
+    import pandas
+    xls = pandas.ExcelFile(file_name)
+    matrix = pandas.read_excel(xls, 'Sheet1').values
+    fleet = pandas.read_excel(xls, 'Sheet2').values
+    save_instance(npz_file, matrix[:-1], matrix[-1], fleet)
+
+def load_instance(file_name, cache_dir=None):
+    ''' Function to load the nodes (x, y, demand), depot and
+        fleet (vehicle, capacity) of a .npz, TSPLIB .vrp or
+        excel instance, an excel file is converted once to a
+        .npz keyed by the hash of the file, later runs only
+        load the .npz '''
+    if file_name.endswith('.vrp'):
+        nodes, fleet = read_vrp(file_name)
+        return nodes[:-1], nodes[-1], fleet
+    if not file_name.endswith('.npz'):
+        with open(file_name, 'rb') as f:
+            key = hashlib.sha1(f.read()).hexdigest()
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(file_name), '.cache')
+        npz_file = os.path.join(cache_dir, key + '.npz')
+        if not os.path.exists(npz_file):
+            convert_excel(file_name, npz_file)
+        file_name = npz_file
+    with np.load(file_name) as instance:
+        nodes = np.column_stack((instance['nodes'], instance['demand']))
+        depot = np.append(instance['depot'], 0)
+        fleet = instance['fleet']
+    return nodes, depot, fleet
@@ -0,0 +1,29 @@
+''' Independent runs of a solver on a pool of processes '''
+import multiprocessing
+import numpy as np, random
+
+
+shared_arguments = ()
+
+def run_seeded(solver, seed):
+    ''' Function to run one optimization with its own seed '''
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    return solver(*shared_arguments)
+
+def multi_start(solver, arguments, runs, seed=None, processes=None):
+    ''' Function to run solver(*arguments) runs times independently
+        on a pool of processes (all cores by default), every run
+        gets its own seed spawned from one SeedSequence, so seed
+        reproduces the whole set of runs, the workers are forked
+        and inherit the arguments (distance table) instead of
+        receiving a pickled copy each,
+        returns the result of every run and the best result '''
+    global shared_arguments
+    shared_arguments = arguments
+    seeds = [int(i.generate_state(1, np.uint64)[0])
+             for i in np.random.SeedSequence(seed).spawn(runs)]
+    with multiprocessing.get_context('fork').Pool(processes) as pool:
+        results = pool.starmap(run_seeded, [(solver, i) for i in seeds])
+    best = min(results, key=lambda result: result[2])
+    return results, best
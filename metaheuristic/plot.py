@@ -0,0 +1,47 @@
+''' Plots of the TSP case, matplotlib is imported when a plot is drawn '''
+import numpy as np
+
+
+def use_style():
+    ''' Function to import matplotlib and use the seaborn
+        style (renamed seaborn-v0_8 by matplotlib 3.6) '''
+    import matplotlib.pyplot as plt
+    style = 'seaborn'
+    if style not in plt.style.available:
+        style = 'seaborn-v0_8'
+    plt.style.use(style)
+    return plt
+
+def visualize(instances, path, size, bestDistance):
+    ''' Function to visualize the best route '''
+    plt = use_style()
+    x = [instances[i][1] for i in range(len(instances))]
+    y = [instances[i][2] for i in range(len(instances))]
+    tmpA = [x[path[i]] for i in range(len(x))]
+    tmpB = [y[path[i]] for i in range(len(y))]
+    A, B = tmpA + [tmpA[0]], tmpB + [tmpB[0]]
+    plt.plot(A, B, 'xb-')
+    plt.scatter(A, B, c='r')
+    plt.title('Problem Size: ' +str(size)+
+              ' cities\nTotal Distance: '
+              + str(bestDistance), loc='left')
+    plt.xlabel('x-coordinate')
+    plt.ylabel('y-coordinate')
+    plt.show()
+
+def history(historyBest, MaxIter, size, computingTime):
+    ''' Function to visualize performance
+        of the algorithm every iteration, a bounded
+        history is drawn at the cycles it kept '''
+    plt = use_style()
+    yAxis = list(historyBest)
+    xAxis = np.linspace(0, MaxIter, len(yAxis))
+    if hasattr(historyBest, 'cycles'):
+        xAxis = historyBest.cycles()
+    plt.plot(xAxis, yAxis)
+    plt.title('Problem Size: ' + str(size)
+              + ' cities\nComputing Time: '
+              + str(computingTime), loc='left')
+    plt.xlabel('Iteration')
+    plt.ylabel('Total Distance')
+    plt.show()
@@ -0,0 +1,90 @@
+''' Progress of the ABC Algorithm: the record every cycle yields and
+    histories of the best distance that keep a bounded number of cycles '''
+import collections
+
+
+# one cycle of a run: the cycle (0 is the initial hive), the best distance,
+# the phase ('E' employee / 'O' onlooker) that improved the best path in the
+# cycle or '' when none did, the evaluations so far and the best path
+# (a reference to the best path of the run, not a copy)
+Progress = collections.namedtuple('Progress', 'cycle distance phase evaluations path')
+
+
+def collect_progress(records, history=None, result=None, evaluations=0):
+    ''' Function to run a generator of Progress records to the
+        end, the best distance of every cycle is appended to
+        history (a list by default, a RingHistory or
+        DecimatedHistory keeps the memory flat on long runs),
+        result and evaluations are those of the cycles before
+        the records (of a resumed run), returns the result
+        (cycle, path, distance, phase), the history and the
+        evaluations '''
+    if history is None:
+        history = []
+    for record in records:
+        if record.phase:
+            result = (record.cycle, record.path, record.distance, record.phase)
+        if record.cycle:
+            history.append(record.distance)
+        evaluations = record.evaluations
+    return result, history, evaluations
+
+class RingHistory(collections.deque):
+    ''' Class as history of the best distance of
+        the last size cycles only '''
+    def __init__(self, size=1000):
+        ''' Method to initialize an empty history '''
+        super().__init__(maxlen=size)
+        self.count = 0
+    def append(self, distance):
+        ''' Method to add the best distance of the next cycle '''
+        self.count = self.count + 1
+        super().append(distance)
+    def cycles(self):
+        ''' Method to get the cycle of every kept distance '''
+        return list(range(self.count - len(self) + 1, self.count + 1))
+
+class DecimatedHistory:
+    ''' Class as history of the best distance of at most size
+        cycles spread over the whole run: every stride-th cycle
+        is kept, when the history is full every other kept
+        cycle is dropped and the stride doubles, the first and
+        the last cycle are always kept '''
+    def __init__(self, size=1000):
+        ''' Method to initialize an empty history '''
+        self.size = max(size, 2)
+        self.stride = 1
+        self.count = 0
+        self.cycle = []
+        self.distance = []
+        self.last = None
+    def __len__(self):
+        ''' Method to get the number of kept cycles '''
+        return len(self.distance) + len(self.tail())
+    def __iter__(self):
+        ''' Method to iterate the kept best distances '''
+        return iter(self.distance + [distance for cycle, distance in self.tail()])
+    def append(self, distance):
+        ''' Method to add the best distance of the next cycle '''
+        self.count = self.count + 1
+        self.last = (self.count, distance)
+        if (self.count - 1) % self.stride:
+            return
+        # one place is left for the last cycle
+        if len(self.distance) == self.size - 1:
+            del self.cycle[1::2]
+            del self.distance[1::2]
+            self.stride = self.stride * 2
+            if (self.count - 1) % self.stride:
+                return
+        self.cycle.append(self.count)
+        self.distance.append(distance)
+    def tail(self):
+        ''' Method to get the last cycle and its distance
+            when it is not one of the stride-th cycles '''
+        if self.last is None or self.cycle[-1] == self.last[0]:
+            return []
+        return [self.last]
+    def cycles(self):
+        ''' Method to get the cycle of every kept distance '''
+        return self.cycle + [cycle for cycle, distance in self.tail()]
@@ -0,0 +1,321 @@
+''' Simulated Annealing for Vehicle Routing Problem on the instance of vrp.set_instance '''
+import math, multiprocessing, random
+import numpy as np
+from . import vrp
+from .checkpoint import (load_checkpoint, pack_routes, policies_state, restore_policies, set_random_state,
+                         unpack_routes)
+from .config import SAConfig
+from .instrument import recording
+from .parallel import multi_start
+from .progress import Progress
+from .termination import fired, termination_policies
+from .vrp import (RouteState, SplitEvaluator, optimal_path_slice, path_to_distance, routes_to_sub_path,
+                  split_routes, sub_path, sub_path_slice)
+
+instruments = None  # the Instruments of instrument.recording count the accepted moves by temperature band
+
+def two_swap(path, a, b):
+    path[a], path[b] = path[b], path[a]
+    return path
+
+def three_swap(path, a, b, c):
+    path[a], path[b], path[c] = path[c], path[a], path[b]
+    return path
+
+def move_size(move):
+    # number of positions a move takes after the path, 2 for two_swap and 3 for three_swap
+    return move.__code__.co_argcount - 1
+
+def logspace_schedule(high, low=0):
+    # cooling schedule from 10 ** high down to 10 ** low, geometric steps
+    def schedule(max_iteration):
+        return np.logspace(low, high, num=max_iteration)[::-1]
+    return schedule
+
+def draw_positions(count, length, size):
+    # count rows of size distinct positions of a path, sorted in every row
+    positions = np.empty((count, size), dtype=int)
+    for i in range(size):
+        position = np.random.randint(0, length - i, count)
+        taken = np.sort(positions[:, :i], axis=1)
+        for j in range(i):
+            position = position + (position >= taken[:, j])
+        positions[:, i] = position
+    return np.sort(positions, axis=1)
+
+def start_policies(termination, block):
+    # the termination policies are checked every 256 moves of a block (the random numbers are still drawn
+    # for the whole block, so a policy that never fires does not change the run), returns the moves between checks
+    for policy in termination:
+        policy.reset()
+    return min(block, 256) if termination else block
+
+def anneal_split(split, temperatures, move=two_swap, block=4096, termination=(), checkpoint=None, state=None):
+    # simulated annealing kernel on a SplitEvaluator: one move per temperature is applied, evaluated
+    # and undone in place if rejected, the move positions and the uniforms are drawn in blocks, the
+    # acceptance test exp((current - new) / T) > u is done in log space as new - current < -T log(u),
+    # the best path is only copied when the search leaves it, the annealing stops early when one of the
+    # termination policies fires, checkpoint (a Checkpointer) saves the annealing (and the termination policies)
+    # after a block of moves once a checkpoint is due, state (of load_checkpoint) goes on from that checkpoint with
+    # split on its path, returns the best path and distance and the moves evaluated (from the start of the schedule)
+    check = start_policies(termination, block)
+    size = move_size(move)
+    length = len(split.path)
+    best_distance = split.distance
+    best_path = None  # None while the current path is the best path
+    begin = 0
+    if state is not None:
+        # the split keeps its distance up to date move by move, so it is the one of the checkpoint
+        split.distance = float(state['distance'])
+        best_distance = float(state['best_distance'])
+        best_path = state['best_path'] if 'best_path' in state else None
+        begin, block = int(state['moves']), int(state['block'])
+        restore_policies(termination, state)
+        set_random_state(state)
+    if checkpoint is not None:
+        checkpoint.start(begin)
+    moves = begin
+    stop = False
+    for first in range(begin, len(temperatures), block):
+        temperature = np.asarray(temperatures[first:first + block], dtype=float)
+        positions = draw_positions(len(temperature), length, size).tolist()
+        limit = (-temperature * np.log(1.0 - np.random.random(len(temperature)))).tolist()
+        accepted = []
+        for part in range(0, len(limit), check):
+            for i in range(part, min(part + check, len(limit))):
+                current_distance = split.distance
+                new_distance = split.apply(move, *positions[i])
+                if new_distance - current_distance < limit[i]:
+                    accepted.append(i)
+                    if new_distance < best_distance:
+                        best_distance = new_distance
+                        best_path = None
+                    elif best_path is None:
+                        best_path = split.path.copy()
+                        best_path[split.undo[0]] = split.undo[1]
+                else:
+                    split.revert()
+            moves = first + min(part + check, len(limit))
+            if termination and fired(termination, Progress(moves, best_distance, '', moves, None)):
+                stop = True
+                break
+        if instruments is not None:
+            instruments.anneal(temperature[:moves - first], accepted)
+        if stop:
+            break
+        if checkpoint is not None and checkpoint.due(moves):
+            snapshot = {'path': split.path.copy(), 'distance': split.distance, 'best_distance': best_distance,
+                        'moves': moves, 'block': block, **policies_state(termination)}
+            if best_path is not None:
+                snapshot['best_path'] = best_path.copy()
+            checkpoint.save(moves, snapshot)
+    if best_path is None:
+        best_path = split.path.copy()
+    return best_path, best_distance, moves
+
+def anneal(path, vehicle, max_iteration, move=two_swap, schedule=logspace_schedule(10), path_slice=sub_path_slice,
+           termination=(), checkpoint=None, resume=None):
+    # resume is the checkpoint file of checkpoint to go on from (with the same path and parameters)
+    state = None if resume is None else load_checkpoint(resume)
+    split = SplitEvaluator(path if state is None else state['path'], vehicle, path_slice)
+    try:
+        best_path, best_distance, moves = anneal_split(split, schedule(max_iteration), move,
+                                                       termination=termination, checkpoint=checkpoint, state=state)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+    best_path = best_path.tolist()
+    best_slice = path_slice(best_path, vehicle)
+    best_sub_path = sub_path(best_slice[0], best_path)
+    return best_slice, best_sub_path, best_distance, moves
+
+def anneal_routes(state, temperatures, block=4096, termination=(), checkpoint=None, resume_state=None):
+    # simulated annealing kernel on a RouteState with the acceptance test of anneal_split, a random route
+    # move is costed first and only applied once accepted, the best routes are only copied when the search
+    # leaves them, the termination policies, checkpoint and resume_state (of load_checkpoint, with state on its
+    # routes) as in anneal_split, returns the best routes and distance and the moves evaluated
+    check = start_policies(termination, block)
+    best_distance = state.distance
+    best_routes = None  # None while the current routes are the best routes
+    begin = 0
+    if resume_state is not None:
+        state.distance = float(resume_state['distance'])
+        best_distance = float(resume_state['best_distance'])
+        if 'best_routes' in resume_state:
+            best_routes = unpack_routes(resume_state['best_routes'], resume_state['best_lengths'])
+        begin, block = int(resume_state['moves']), int(resume_state['block'])
+        restore_policies(termination, resume_state)
+        set_random_state(resume_state)
+    if checkpoint is not None:
+        checkpoint.start(begin)
+    moves = begin
+    stop = False
+    for first in range(begin, len(temperatures), block):
+        temperature = np.asarray(temperatures[first:first + block], dtype=float)
+        limit = (-temperature * np.log(1.0 - np.random.random(len(temperature)))).tolist()
+        accepted = []
+        for part in range(0, len(limit), check):
+            for i in range(part, min(part + check, len(limit))):
+                move, new_distance = state.propose()
+                if new_distance - state.distance < limit[i]:
+                    accepted.append(i)
+                    if new_distance < best_distance:
+                        best_distance = state.apply(move)
+                        best_routes = None
+                    else:
+                        if best_routes is None:
+                            best_routes = state.tolist()
+                        state.apply(move)
+            moves = first + min(part + check, len(limit))
+            if termination and fired(termination, Progress(moves, best_distance, '', moves, None)):
+                stop = True
+                break
+        if instruments is not None:
+            instruments.anneal(temperature[:moves - first], accepted)
+        if stop:
+            break
+        if checkpoint is not None and checkpoint.due(moves):
+            routes, lengths = pack_routes(state.routes)
+            snapshot = {'routes': routes, 'lengths': lengths, 'distance': state.distance,
+                        'best_distance': best_distance, 'moves': moves, 'block': block,
+                        **policies_state(termination)}
+            if best_routes is not None:
+                snapshot['best_routes'], snapshot['best_lengths'] = pack_routes(best_routes)
+            checkpoint.save(moves, snapshot)
+    if best_routes is None:
+        best_routes = state.tolist()
+    return best_routes, best_distance, moves
+
+def routeSA(path, vehicle, max_iteration, schedule=logspace_schedule(10), path_slice=sub_path_slice, termination=(),
+            checkpoint=None, resume=None):
+    # annealing over the routes of the split of path with relocate / exchange / 2-opt / 2-opt* moves, resume is
+    # the checkpoint file of checkpoint to go on from (with the same path and parameters)
+    resume_state = None if resume is None else load_checkpoint(resume)
+    if resume_state is None:
+        state = RouteState(split_routes(path, vehicle, path_slice), vehicle)
+    else:
+        state = RouteState(unpack_routes(resume_state['routes'], resume_state['lengths']), vehicle)
+    try:
+        best_routes, best_distance, moves = anneal_routes(state, schedule(max_iteration), termination=termination,
+                                                          checkpoint=checkpoint, resume_state=resume_state)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+    best_slice, best_sub_path = routes_to_sub_path(best_routes)
+    return best_slice, best_sub_path, best_distance, moves
+
+def swapSA2A(path, vehicle, max_iteration, path_slice=sub_path_slice):
+    return anneal(path, vehicle, max_iteration, two_swap, logspace_schedule(5), path_slice)
+
+def swapSA2B(path, vehicle, max_iteration, path_slice=sub_path_slice):
+    return anneal(path, vehicle, max_iteration, two_swap, logspace_schedule(10), path_slice)
+
+def swapSA3A(path, vehicle, max_iteration, path_slice=sub_path_slice):
+    return anneal(path, vehicle, max_iteration, three_swap, logspace_schedule(5), path_slice)
+
+def swapSA3B(path, vehicle, max_iteration, path_slice=sub_path_slice):
+    return anneal(path, vehicle, max_iteration, three_swap, logspace_schedule(10), path_slice)
+
+def replica(seed, temperature, vehicle, move, path_slice, connection):
+    # one chain of the replica exchange at a fixed temperature, every request (path, steps) runs steps
+    # metropolis moves from path and answers the last path and the best path of those steps
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    request = connection.recv()
+    while request is not None:
+        path, steps = request
+        split = SplitEvaluator(path, vehicle, path_slice)
+        best_path, best_distance = anneal_split(split, np.full(steps, temperature), move)[:2]
+        connection.send((split.path.tolist(), split.distance, best_path.tolist(), best_distance))
+        request = connection.recv()
+    connection.close()
+
+def parallel_tempering(path, vehicle, max_iteration, replicas=8, interval=100, temperatures=None,
+                       move=two_swap, path_slice=sub_path_slice, seed=None):
+    # replica exchange: one chain per temperature (by default spread over the 1e0 - 1e10 range of the
+    # swapSA variants) runs in its own forked process, after every interval moves the states of
+    # neighbouring temperatures are swapped with probability min(1, exp((1/Ti - 1/Tj) * (Ei - Ej)))
+    if temperatures is None:
+        temperatures = np.logspace(0, 10, num=replicas)
+    temperatures = np.sort(np.asarray(temperatures, dtype=float))
+    sequence = np.random.SeedSequence(seed)
+    seeds = [int(i.generate_state(1, np.uint64)[0]) for i in sequence.spawn(len(temperatures))]
+    exchange = random.Random(int(sequence.generate_state(1, np.uint64)[0]))
+    context = multiprocessing.get_context('fork')
+    connections, processes = [], []
+    try:
+        for i in range(len(temperatures)):
+            parent, child = context.Pipe()
+            process = context.Process(target=replica, daemon=True,
+                                      args=(seeds[i], temperatures[i], vehicle, move, path_slice, child))
+            process.start()
+            child.close()
+            connections.append(parent)
+            processes.append(process)
+
+        states = [list(path) for i in range(len(temperatures))]
+        distances = [path_to_distance(path, vehicle, path_slice)] * len(temperatures)
+        best_distance = distances[0]
+        best_path = list(path)
+        for block in range(0, max_iteration, interval):
+            steps = min(interval, max_iteration - block)
+            for i in range(len(temperatures)):
+                connections[i].send((states[i], steps))
+            for i in range(len(temperatures)):
+                # a replica that died ends the run with EOFError
+                states[i], distances[i], chain_path, chain_distance = connections[i].recv()
+                if chain_distance < best_distance:
+                    best_distance = chain_distance
+                    best_path = chain_path
+            # swap neighbouring temperatures, even and odd pairs in turn
+            for i in range((block // interval) % 2, len(temperatures) - 1, 2):
+                log_ratio = (1 / temperatures[i] - 1 / temperatures[i + 1]) * (distances[i] - distances[i + 1])
+                if log_ratio >= 0 or math.log(1.0 - exchange.random()) < log_ratio:
+                    states[i], states[i + 1] = states[i + 1], states[i]
+                    distances[i], distances[i + 1] = distances[i + 1], distances[i]
+        for connection in connections:
+            connection.send(None)
+        for process in processes:
+            process.join()
+    finally:
+        # an error or ctrl-c leaves no replica running
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        for connection in connections:
+            connection.close()
+
+    best_slice = path_slice(best_path, vehicle)
+    best_sub_path = sub_path(best_slice[0], best_path)
+    return best_slice, best_sub_path, best_distance, max_iteration * len(temperatures)
+
+def solve(config=SAConfig(), runs=1, seed=None, instruments=None, checkpoint=None, resume=None):
+    # one annealing of the identity path over the whole instance with the parameter setting of config (or the best
+    # of runs independent annealings on a pool of processes), the termination policies of config stop every
+    # annealing early, an Instruments (see instrument) records the calls, time and acceptance by temperature band
+    # of the annealing (not of the runs on the pool), a Checkpointer (see checkpoint) saves the annealing every so
+    # many moves and resume is the checkpoint file to go on from (one run only), returns the slice, sub paths and
+    # total distance of the best annealing and the moves evaluated by all the runs
+    if runs > 1 and (checkpoint is not None or resume is not None):
+        raise ValueError('checkpoints are of one run only')
+    path = [i for i in range(0, len(vrp.tables))]
+    path_slice = optimal_path_slice if config.path_slice == 'optimal' else sub_path_slice
+    schedule = logspace_schedule(config.high, config.low)
+    if config.move == 'routes':
+        arguments = (path, vrp.vehicles, config.max_iteration, schedule, path_slice, termination_policies(config),
+                     checkpoint, resume)
+        solver = routeSA
+    else:
+        move = two_swap if config.move == 'two_swap' else three_swap
+        arguments = (path, vrp.vehicles, config.max_iteration, move, schedule, path_slice,
+                     termination_policies(config), checkpoint, resume)
+        solver = anneal
+    if runs > 1:
+        results, best = multi_start(solver, arguments, runs, seed)
+        return best[:3] + (sum(i[3] for i in results),)
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed % 2 ** 32)
+    with recording(instruments):
+        return solver(*arguments)
@@ -0,0 +1,541 @@
+''' Solve service: a local asyncio server (unix socket, or TCP on
+    localhost) that runs solve jobs of the ABC Algorithm (TSP and CVRP
+    case) and of the Simulated Annealing, streams their progress and
+    cancels them on request
+
+    python -m metaheuristic.service serve --socket solve.sock --processes 4
+    python -m metaheuristic.service solve --socket solve.sock Simulated-Annealing/VRP101.xlsx \\
+        --parameter algorithm=sa --parameter iterations=100000
+
+    the requests and the answers are JSON objects, one per line:
+    {"op": "solve", "instance": "/path/VRP101.xlsx", "parameters": {"algorithm": "sa", "iterations": 100000}}
+    {"op": "solve", "tsp": [[node, x, y], ...]}  (or the rows of a distance table)
+    {"op": "solve", "cvrp": {"nodes": [[x, y, demand], ...], "depot": [x, y], "fleet": [[vehicle, capacity], ...]}}
+    {"op": "cancel", "job": 1}
+    {"op": "status"}
+    the parameters are the options of python -m metaheuristic (true /
+    false for the switches), a solve request is answered with the
+    accepted event of its job, a progress event every interval seconds
+    (0.5 by default, "interval" of the request) and the result,
+    cancelled or error event that ends the job (with the report of
+    the instruments of a job with instrument=true)
+
+    the instances and their distance matrices stay in an LRU cache keyed
+    by the hash of their content, so a repeated instance is neither read
+    nor built again, the files are hashed and the instances loaded on a
+    thread of their own, so the event loop goes on serving meanwhile
+    (no job is forked during a load), every job runs in a process forked from the service
+    (at most processes at once) that inherits the cached instance instead
+    of receiving a pickled copy, the progress is watched by a termination
+    policy (which does not change the run, a seeded job gives the result
+    of the same command line run), a cancelled job stops
+    after its cycle (block of moves) and answers with the best path so
+    far, it is killed when it does not stop within grace seconds, the
+    jobs of a client that disconnects are cancelled '''
+import argparse, asyncio, collections, concurrent.futures, contextlib, hashlib, io, itertools, json, math, multiprocessing, os, random, signal, sys, threading, time
+import numpy as np
+from .batch import EXCLUDED, job_arguments
+from .cli import ALGORITHMS, TSP_EXTENSIONS
+
+
+LIMIT = 2 ** 26  # longest line of a request (inline instances)
+ENDS = ('result', 'cancelled', 'error')  # the events that end a job
+
+
+def file_key(file_name):
+    ''' Function to get the cache key of an instance file:
+        its extension and the hash of its content '''
+    with open(file_name, 'rb') as f:
+        return os.path.splitext(file_name)[1] + '-' + hashlib.sha1(f.read()).hexdigest()
+
+def array_key(case, *arrays):
+    ''' Function to get the cache key of an instance
+        given inline: the hash of its arrays '''
+    digest = hashlib.sha1(case.encode())
+    for i in arrays:
+        i = np.ascontiguousarray(i, dtype=np.float64)
+        digest.update(str(i.shape).encode())
+        digest.update(i.tobytes())
+    return case + '-' + digest.hexdigest()
+
+def tsp_instance(source, weight_type=None):
+    ''' Function to get the (source, table) of a
+        nodes coordinate (distance of weight_type, see
+        loaders.make_distance_table) or distance table '''
+    from . import loaders
+    if loaders.is_distance_table(source):
+        return source, source.astype(float)
+    return source, loaders.make_distance_table(source, weight_type)
+
+def cvrp_instance(nodes, depot, fleet):
+    ''' Function to get the (nodes, depot, fleet,
+        distance matrix) of a CVRP instance '''
+    from . import vrp
+    return nodes, depot, fleet, vrp.make_distance_matrix(nodes, depot)
+
+def request_instance(request):
+    ''' Function to get the name, the case (True for the TSP
+        case), the cache key and the loader of the instance
+        of a solve request, raises ValueError '''
+    from . import loaders
+    if 'instance' in request:
+        name = str(request['instance'])
+        if not os.path.isfile(name):
+            raise ValueError('no such instance: ' + name)
+        if name.endswith(TSP_EXTENSIONS):
+            return name, True, file_key(name), lambda: tsp_instance(loaders.read_instance(name),
+                                                                     loaders.edge_weight_type(name))
+        return name, False, file_key(name), lambda: cvrp_instance(*loaders.load_instance(name))
+    if 'tsp' in request:
+        source = np.array(request['tsp'], dtype=float)
+        if source.ndim != 2 or len(source) < 2:
+            raise ValueError('tsp takes the rows (node, x, y) of the nodes or of a distance table')
+        return 'tsp', True, array_key('tsp', source), lambda: tsp_instance(source)
+    if 'cvrp' in request:
+        case = request['cvrp']
+        nodes = np.array(case['nodes'], dtype=float)
+        depot = np.append(np.array(case['depot'], dtype=float)[:2], 0)
+        fleet = np.array(case['fleet'])
+        if nodes.ndim != 2 or nodes.shape[1] != 3 or fleet.ndim != 2 or fleet.shape[1] != 2:
+            raise ValueError('cvrp takes nodes (x, y, demand), depot (x, y) and fleet (vehicle, capacity)')
+        return 'cvrp', False, array_key('cvrp', nodes, depot, fleet), lambda: cvrp_instance(nodes, depot, fleet)
+    raise ValueError('a solve request needs instance, tsp or cvrp')
+
+def job_argv(name, is_tsp, parameters):
+    ''' Function to get the command line of a job of the
+        parameters, checked by the parser of python -m
+        metaheuristic, raises ValueError '''
+    from .cli import make_parser
+    parameters = {str(i).lstrip('-').replace('_', '-'): str(j).lower() if isinstance(j, bool) else str(j)
+                  for i, j in dict(parameters).items()}
+    for key in parameters:
+        if key in EXCLUDED:
+            raise ValueError('--' + key + ' can not be a parameter of the jobs')
+    algorithm = parameters.setdefault('algorithm', 'abc' if is_tsp else 'cvrp-abc')
+    if algorithm in ALGORITHMS and (algorithm == 'abc') != is_tsp:
+        raise ValueError(algorithm + ' does not solve the ' + ('TSP' if is_tsp else 'CVRP') + ' case')
+    argv = job_arguments(name, parameters)
+    errors = io.StringIO()
+    try:
+        with contextlib.redirect_stderr(errors):
+            make_parser().parse_args(argv)
+    except SystemExit:
+        raise ValueError((errors.getvalue().strip().splitlines() or ['invalid parameters'])[-1])
+    return argv
+
+class InstanceCache:
+    ''' Class as bounded LRU cache of the loaded instances
+        keyed by the hash of their content: the (source,
+        table) of the TSP case, the (nodes, depot, fleet,
+        distance matrix) of the CVRP case, hits and misses
+        are counted, the store may be read by another thread
+        than the one that loads '''
+    def __init__(self, size=8):
+        ''' Method to initialize the store of at most size instances '''
+        self.size = size
+        self.store = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    def get(self, key, load):
+        ''' Method to get the instance of key and whether it
+            was stored, load() loads it when not, the least
+            recently used instance is dropped when the store
+            is full '''
+        with self.lock:
+            if key in self.store:
+                self.store.move_to_end(key)
+                self.hits = self.hits + 1
+                return self.store[key], True
+            self.misses = self.misses + 1
+        instance = load()
+        with self.lock:
+            self.store[key] = instance
+            if len(self.store) > self.size:
+                self.store.popitem(last=False)
+        return instance, False
+    def keys(self):
+        ''' Method to get the keys of the stored instances,
+            the least recently used first '''
+        with self.lock:
+            return list(self.store)
+
+class Watch:
+    ''' Class as termination policy of a job: the progress
+        goes to the service every interval seconds, the
+        policy fires once the service sent cancel '''
+    def __init__(self, connection, interval):
+        ''' Method to initialize the watch of connection '''
+        self.connection = connection
+        self.interval = interval
+        self.cancelled = False
+        self.last = -math.inf
+    def reset(self):
+        ''' Method to go on watching, a run resets
+            its policies when it starts '''
+    def __call__(self, record):
+        ''' Method to send the progress when due
+            and tell if the job is cancelled '''
+        if not self.cancelled and self.connection.poll():
+            self.cancelled = self.connection.recv() == 'cancel'
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.connection.send({'event': 'progress', 'cycle': int(record.cycle), 'distance': float(record.distance),
+                                  'evaluations': int(record.evaluations)})
+        return self.cancelled
+
+def solve_job(argv, instance, interval, connection):
+    ''' Function to solve a job in its forked process, the
+        progress and then the result (or the error) go to
+        connection, the errors of the job are sent, not
+        raised '''
+    from . import cli
+    # the jobs without a seed do not share the random state of the service
+    random.seed()
+    np.random.seed()
+    watch = Watch(connection, interval)
+    start = time.perf_counter()
+    errors = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errors), \
+                contextlib.ExitStack() as stack:
+            parser = cli.make_parser()
+            arguments = parser.parse_args(argv)
+            arguments.start = time.time()
+            instruments = cli.measured(arguments, stack)
+            distance, evaluations, path = cli.RUNS[arguments.algorithm](arguments, parser, instance, (watch,))
+        message = {'event': 'cancelled' if watch.cancelled else 'result', 'distance': float(distance),
+                   'evaluations': int(evaluations), 'path': json.loads(json.dumps(path, default=lambda i: i.tolist()))}
+        if instruments is not None:
+            message['instruments'] = instruments.report()
+    except SystemExit:
+        # parser.error of the run, the message went to stderr
+        message = {'event': 'error', 'error': (errors.getvalue().strip().splitlines() or ['exit'])[-1]}
+    except Exception as error:
+        message = {'event': 'error', 'error': type(error).__name__ + ': ' + str(error)}
+    message['seconds'] = time.perf_counter() - start
+    connection.send(message)
+    connection.close()
+
+async def receive(connection):
+    ''' Function to read the messages of a connection
+        to a process without blocking the event loop,
+        until the process closes it '''
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    def readable():
+        try:
+            queue.put_nowait(connection.recv())
+        except (EOFError, OSError):
+            loop.remove_reader(connection.fileno())
+            queue.put_nowait(None)
+    loop.add_reader(connection.fileno(), readable)
+    try:
+        while True:
+            message = await queue.get()
+            if message is None:
+                return
+            yield message
+    finally:
+        loop.remove_reader(connection.fileno())
+
+async def send(writer, message):
+    ''' Function to send a message (one JSON line), nothing
+        is sent once the other side has disconnected '''
+    if writer.is_closing():
+        return
+    writer.write((json.dumps(message) + '\n').encode())
+    try:
+        await writer.drain()
+    except ConnectionError:
+        pass
+
+def kill(process):
+    ''' Function to kill a process that is still running '''
+    if process.is_alive():
+        process.terminate()
+
+class Job:
+    ''' Class as a solve job of the service '''
+    def __init__(self, number, argv, key, interval, writer):
+        ''' Method to initialize a queued job '''
+        self.number = number
+        self.argv = argv
+        self.key = key
+        self.interval = interval
+        self.writer = writer
+        self.cancelling = False
+        self.task = None
+        self.process = None
+        self.connection = None
+    def state(self):
+        ''' Method to get the state of the job '''
+        if self.cancelling:
+            return 'cancelling'
+        return 'queued' if self.process is None else 'running'
+
+class SolveService:
+    ''' Class as the solve service: the instance cache, the
+        processes the jobs may run on at once and the jobs
+        not ended yet, handle serves a client '''
+    def __init__(self, processes=None, cache_size=8, interval=0.5, grace=5.0):
+        ''' Method to initialize the service '''
+        self.processes = processes or os.cpu_count() or 1
+        self.cache = InstanceCache(cache_size)
+        self.interval = interval
+        self.grace = grace
+        self.slots = asyncio.Semaphore(self.processes)
+        self.jobs = {}
+        self.numbers = itertools.count(1)
+        self.context = multiprocessing.get_context('fork')
+        # one thread hashes the files and loads the instances, one request after the other
+        self.loader = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix='loader')
+        self.loading = asyncio.Lock()
+    async def handle(self, reader, writer):
+        ''' Method to serve the requests of a client,
+            its jobs are cancelled when it disconnects '''
+        jobs = []
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError) as error:
+                    await send(writer, {'event': 'error', 'error': 'unreadable request: ' + str(error)})
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('a request is a JSON object')
+                    if request.get('op') == 'solve':
+                        jobs.append(await self.submit(request, writer))
+                    elif request.get('op') == 'cancel':
+                        job = self.jobs.get(request.get('job'))
+                        if job is None:
+                            raise ValueError('no such job: ' + repr(request.get('job')))
+                        self.cancel(job)
+                        await send(writer, {'event': 'cancelling', 'job': job.number})
+                    elif request.get('op') == 'status':
+                        await send(writer, self.status())
+                    else:
+                        raise ValueError('unknown op: ' + repr(request.get('op')))
+                except Exception as error:
+                    await send(writer, {'event': 'error', 'error': type(error).__name__ + ': ' + str(error)})
+        except asyncio.CancelledError:
+            # the service shuts down
+            pass
+        finally:
+            for job in jobs:
+                self.cancel(job)
+            writer.close()
+    async def submit(self, request, writer):
+        ''' Method to load the instance of a solve request
+            (from the cache when it is there) on the loader
+            thread and queue its job, raises the errors of
+            the request '''
+        loop = asyncio.get_running_loop()
+        async with self.loading:
+            name, is_tsp, key, load = await loop.run_in_executor(self.loader, request_instance, request)
+            argv = job_argv(name, is_tsp, request.get('parameters', {}))
+            interval = float(request.get('interval', self.interval))
+            instance, cached = await loop.run_in_executor(self.loader, self.cache.get, key, load)
+        job = Job(next(self.numbers), argv, key, interval, writer)
+        await send(writer, {'event': 'accepted', 'job': job.number, 'instance': key, 'cached': cached})
+        job.task = asyncio.create_task(self.run(job, instance))
+        self.jobs[job.number] = job
+        # the job waits for its slot before a later request can cancel it
+        await asyncio.sleep(0)
+        return job
+    async def run(self, job, instance):
+        ''' Method to run a job in a forked process once a
+            slot is free and send its events to its client '''
+        message = None
+        try:
+            async with self.slots:
+                # a process forked during a load would inherit the locks the loader thread holds
+                async with self.loading:
+                    job.connection, child = self.context.Pipe()
+                    job.process = self.context.Process(target=solve_job,
+                                                       args=(job.argv, instance, job.interval, child), daemon=True)
+                    job.process.start()
+                child.close()
+                async for i in receive(job.connection):
+                    if i['event'] == 'progress':
+                        await send(job.writer, dict(i, job=job.number))
+                    else:
+                        message = i
+                while job.process.is_alive():
+                    await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            if not job.cancelling:
+                raise
+        finally:
+            if job.process is not None:
+                kill(job.process)
+                job.process.join()
+                job.connection.close()
+            del self.jobs[job.number]
+        if message is None:
+            if job.cancelling:
+                message = {'event': 'cancelled'}
+            else:
+                message = {'event': 'error', 'error': 'the job exited with ' + str(job.process.exitcode)}
+        await send(job.writer, dict(message, job=job.number))
+    def cancel(self, job):
+        ''' Method to cancel a job: a queued job is dropped,
+            a running job stops after its cycle (block of
+            moves) or is killed after grace seconds '''
+        if job.cancelling or job.task.done():
+            return
+        job.cancelling = True
+        if job.process is None:
+            job.task.cancel()
+            return
+        try:
+            job.connection.send('cancel')
+        except OSError:
+            pass
+        asyncio.get_running_loop().call_later(self.grace, kill, job.process)
+    def status(self):
+        ''' Method to get the jobs and the cache of the service '''
+        return {'event': 'status', 'processes': self.processes,
+                'jobs': [{'job': i.number, 'state': i.state(), 'instance': i.key, 'arguments': i.argv[2:]}
+                         for i in self.jobs.values()],
+                'cache': {'size': self.cache.size, 'instances': self.cache.keys(),
+                          'hits': self.cache.hits, 'misses': self.cache.misses}}
+    def close(self):
+        ''' Method to kill the processes of the jobs
+            and stop the loader thread '''
+        for job in list(self.jobs.values()):
+            if job.process is not None:
+                kill(job.process)
+        self.loader.shutdown(wait=False, cancel_futures=True)
+
+async def serve(service, socket=None, host='127.0.0.1', port=None):
+    ''' Function to serve on the unix socket, or on
+        host:port when a port is given, until cancelled
+        (SIGINT, SIGTERM) '''
+    if port is None:
+        server = await asyncio.start_unix_server(service.handle, socket, limit=LIMIT)
+    else:
+        server = await asyncio.start_server(service.handle, host, port, limit=LIMIT)
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    print('serving on', socket if port is None else host + ':' + str(port), flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+        if port is None and os.path.exists(socket):
+            os.remove(socket)
+
+async def connect(socket=None, host='127.0.0.1', port=None):
+    ''' Function to open a connection to the service on
+        the unix socket, or on host:port when a port is
+        given, returns the reader and the writer '''
+    if port is None:
+        return await asyncio.open_unix_connection(socket, limit=LIMIT)
+    return await asyncio.open_connection(host, port, limit=LIMIT)
+
+async def events(reader):
+    ''' Function to read the events of the service '''
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        yield json.loads(line)
+
+async def request(message, socket=None, host='127.0.0.1', port=None, log=sys.stdout):
+    ''' Function to send one request to the service and
+        print its answers until the job (the request)
+        ends, returns the last event '''
+    reader, writer = await connect(socket, host, port)
+    event = None
+    try:
+        await send(writer, message)
+        async for event in events(reader):
+            if event['event'] == 'progress':
+                print('job %d cycle %d distance %.3f evaluations %d' % (event['job'], event['cycle'],
+                                                                       event['distance'], event['evaluations']),
+                      file=log, flush=True)
+            elif event['event'] == 'accepted':
+                print('job %d accepted, instance %s%s' % (event['job'], event['instance'],
+                                                          ' (cached)' if event['cached'] else ''),
+                      file=log, flush=True)
+            else:
+                print(json.dumps(event), file=log, flush=True)
+            if message['op'] != 'solve' or event['event'] in ENDS:
+                break
+    finally:
+        writer.close()
+    return event
+
+def parse_parameters(items):
+    ''' Function to get the parameters of KEY=VALUE items '''
+    parameters = {}
+    for item in items:
+        key, sign, value = item.partition('=')
+        if not sign or not key.strip():
+            raise ValueError('the parameters are KEY=VALUE items, not ' + repr(item))
+        parameters[key.strip()] = value.strip()
+    return parameters
+
+def make_parser():
+    ''' Function to make the argument parser '''
+    parser = argparse.ArgumentParser(prog='python -m metaheuristic.service',
+                                     description='local solve service of the algorithms')
+    address = argparse.ArgumentParser(add_help=False)
+    address.add_argument('--socket', default='metaheuristic.sock', help='unix socket (default metaheuristic.sock)')
+    address.add_argument('--port', type=int, help='TCP port on --host instead of the unix socket')
+    address.add_argument('--host', default='127.0.0.1')
+    command = parser.add_subparsers(dest='command', required=True)
+    run = command.add_parser('serve', parents=[address], help='run the service')
+    run.add_argument('--processes', type=int, help='jobs run at once (default every core)')
+    run.add_argument('--cache-size', type=int, default=8, help='instances kept in the cache (default 8)')
+    run.add_argument('--interval', type=float, default=0.5, help='seconds between progress events (default 0.5)')
+    run.add_argument('--grace', type=float, default=5.0,
+                     help='seconds a cancelled job has to stop before it is killed (default 5)')
+    solve = command.add_parser('solve', parents=[address], help='solve an instance file, ctrl-c cancels it')
+    solve.add_argument('instance')
+    solve.add_argument('--parameter', action='append', default=[], metavar='KEY=VALUE',
+                       help='option of python -m metaheuristic (repeat for more options)')
+    cancel = command.add_parser('cancel', parents=[address], help='cancel a job')
+    cancel.add_argument('job', type=int)
+    command.add_parser('status', parents=[address], help='print the jobs and the cached instances')
+    return parser
+
+def main(argv=None):
+    ''' Function to run the service or send it a request,
+        a request exits with status 1 when its answer is
+        an error '''
+    parser = make_parser()
+    arguments = parser.parse_args(argv)
+    address = {'socket': arguments.socket, 'host': arguments.host, 'port': arguments.port}
+    if arguments.command == 'serve':
+        service = SolveService(arguments.processes, arguments.cache_size, arguments.interval, arguments.grace)
+        with contextlib.suppress(KeyboardInterrupt, asyncio.CancelledError):
+            asyncio.run(serve(service, **address))
+        return 0
+    if arguments.command == 'solve':
+        try:
+            message = {'op': 'solve', 'instance': os.path.abspath(arguments.instance),
+                       'parameters': parse_parameters(arguments.parameter)}
+        except ValueError as error:
+            parser.error(str(error))
+    elif arguments.command == 'cancel':
+        message = {'op': 'cancel', 'job': arguments.job}
+    else:
+        message = {'op': 'status'}
+    try:
+        event = asyncio.run(request(message, **address))
+    except KeyboardInterrupt:
+        # the service cancels the jobs of a client that disconnects
+        return 1
+    return 1 if event is None or event['event'] == 'error' else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
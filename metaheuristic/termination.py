@@ -0,0 +1,127 @@
+''' Termination and restart policies: a policy looks at the Progress
+    record of every cycle (of every 256 moves for the Simulated
+    Annealing) and tells when the run has stagnated, its state()
+    goes to the checkpoints so a resumed run goes on counting '''
+import collections, math, time
+import numpy as np
+
+
+class NoImprovement:
+    ''' Class as policy that fires after cycles cycles
+        (moves for the Simulated Annealing) without
+        improvement of the best distance '''
+    def __init__(self, cycles):
+        ''' Method to initialize the policy '''
+        self.cycles = cycles
+        self.reset()
+    def reset(self):
+        ''' Method to start counting again '''
+        self.best = math.inf
+        self.since = None
+    def __call__(self, record):
+        ''' Method to tell if the run has stagnated '''
+        if record.distance < self.best:
+            self.best = record.distance
+            self.since = record.cycle
+        return record.cycle - self.since >= self.cycles
+    def state(self):
+        ''' Method to get the best distance and its
+            cycle as an array for a checkpoint '''
+        return np.array([self.best, math.nan if self.since is None else self.since])
+    def restore(self, state):
+        ''' Method to set the policy to a checkpoint '''
+        best, since = state.tolist()
+        self.best = best
+        self.since = None if math.isnan(since) else int(since)
+
+class RelativeImprovement:
+    ''' Class as policy that fires when the best distance
+        improved less than epsilon (relative) over the last
+        window cycles (moves for the Simulated Annealing) '''
+    def __init__(self, window, epsilon=0.001):
+        ''' Method to initialize the policy '''
+        self.window = window
+        self.epsilon = epsilon
+        self.reset()
+    def reset(self):
+        ''' Method to forget the cycles seen '''
+        self.seen = collections.deque()
+    def __call__(self, record):
+        ''' Method to tell if the run has stagnated '''
+        self.seen.append((record.cycle, record.distance))
+        # the oldest record kept is the last one at least window cycles ago
+        while len(self.seen) > 1 and self.seen[1][0] <= record.cycle - self.window:
+            self.seen.popleft()
+        cycle, distance = self.seen[0]
+        if record.cycle - cycle < self.window:
+            return False
+        return distance - record.distance <= self.epsilon * abs(distance)
+    def state(self):
+        ''' Method to get the (cycle, distance) records
+            of the window as an array for a checkpoint '''
+        return np.array(list(self.seen), dtype=float).reshape(-1, 2)
+    def restore(self, state):
+        ''' Method to set the policy to a checkpoint '''
+        self.seen = collections.deque((int(cycle), distance) for cycle, distance in state.tolist())
+
+class Deadline:
+    ''' Class as policy that fires seconds
+        of wall-clock time after the start '''
+    def __init__(self, seconds):
+        ''' Method to initialize the policy '''
+        self.seconds = seconds
+        self.reset()
+    def reset(self):
+        ''' Method to start the clock again '''
+        self.start = time.monotonic()
+    def __call__(self, record):
+        ''' Method to tell if the time is up '''
+        return time.monotonic() - self.start >= self.seconds
+    def state(self):
+        ''' Method to get the time spent as an
+            array for a checkpoint '''
+        return np.array(time.monotonic() - self.start)
+    def restore(self, state):
+        ''' Method to go on from the time spent
+            before the checkpoint '''
+        self.start = time.monotonic() - float(state)
+
+def fired(policies, record):
+    ''' Function to tell if any of the policies fires,
+        every policy sees every record '''
+    return any([policy(record) for policy in policies])
+
+def until(records, policies):
+    ''' Function to read a generator of Progress records
+        until one of the policies fires, the record that
+        fired is the last one, the generator is closed
+        so the run stops there '''
+    for policy in policies:
+        policy.reset()
+    try:
+        for record in records:
+            yield record
+            if fired(policies, record):
+                break
+    finally:
+        records.close()
+
+def termination_policies(config):
+    ''' Function to make the termination policies
+        of an ABCConfig or SAConfig, its watchers
+        included '''
+    policies = []
+    if config.stall_limit is not None:
+        policies.append(NoImprovement(config.stall_limit))
+    if config.improvement_window is not None:
+        policies.append(RelativeImprovement(config.improvement_window,
+                                            config.improvement_epsilon))
+    if config.deadline is not None:
+        policies.append(Deadline(config.deadline))
+    return policies + list(config.watchers)
+
+def restart_policy(config):
+    ''' Function to make the restart policy of an ABCConfig '''
+    if config.restart_limit is None:
+        return None
+    return NoImprovement(config.restart_limit)
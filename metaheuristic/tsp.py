@@ -0,0 +1,1047 @@
+''' Artificial Bee Colony Optimization ---------------------------------------
+    For Travelling Salesman Problem on nodes (cities) coordinate
+    or distance table, scipy is imported when it is needed '''
+import collections, math, multiprocessing, multiprocessing.connection, random, time
+import numpy as np
+from .checkpoint import (load_checkpoint, policies_state, restore_policies,
+                         set_random_state)
+from .config import ABCConfig
+from .instrument import recording
+from .loaders import make_distance_table
+from .progress import Progress, collect_progress
+from .termination import restart_policy, termination_policies, until
+
+
+instruments = None  # the Instruments of instrument.recording count the moves of every phase
+
+def print_details(cycle, path, distance, bee):
+    ''' Function to print out result of computation'''
+    print('Iteration: ', cycle,
+          '|| Path: ', path + [path[0]],
+          '\nTotal Distance: ', distance,
+          '|| Bee: ', bee, '\n')
+
+class Hive:
+    ''' Class as a hive of bees that contains employee,
+        onlooker, and scout bee, the bees are stored as
+        arrays with one row / element for every bee:
+        path (population x nodes), distance, cycle, role,
+        position[bee, node] is the position of node in the
+        path of bee (used by the neighbour moves),
+        optimum is the best path after the last local search,
+        symmetric tells the local search the distance table
+        is the same both ways, searched counts the nodes the
+        local search looked at since iterate_cycles last
+        added them to the evaluations '''
+    def __init__(self, population, node_set):
+        ''' Method to initialize the hive of bees '''
+        self.path = np.tile(np.asarray(node_set, dtype=np.int32),
+                            (population, 1))
+        self.position = np.tile(path_positions(node_set),
+                                (population, 1))
+        self.distance = np.zeros(population)
+        self.cycle = np.zeros(population, dtype=np.int32)
+        self.role = np.full(population, '', dtype='<U1')
+        self.optimum = None
+        self.symmetric = True
+        self.searched = 0
+    def __len__(self):
+        ''' Method to get the population of bees '''
+        return len(self.distance)
+    def __str__(self):
+        ''' Method to interpret
+            string representation of bees'''
+        return '\n'.join('(' + str(self.role[i]) + ', '
+                         + str(self.path[i].tolist()) + ', '
+                         + str(self.distance[i]) + ', '
+                         + str(self.cycle[i]) + ')'
+                         for i in range(len(self)))
+    def reindex(self, bee):
+        ''' Method to rebuild the position index
+            after the path of bee is replaced '''
+        self.position[bee] = path_positions(self.path[bee])
+    def state(self):
+        ''' Method to copy the bees for a checkpoint '''
+        state = {'path': self.path.copy(), 'distance': self.distance.copy(),
+                 'trial': self.cycle.copy(), 'role': self.role.copy()}
+        if self.optimum is not None:
+            state['optimum'] = np.array(self.optimum)
+        return state
+    def restore(self, state):
+        ''' Method to set the bees to a checkpoint '''
+        if state['path'].shape != self.path.shape:
+            raise ValueError('the checkpoint is not of this instance and population')
+        self.path[:] = state['path']
+        for bee in range(len(self)):
+            self.reindex(bee)
+        self.distance[:] = state['distance']
+        self.cycle[:] = state['trial']
+        self.role[:] = state['role']
+        if 'optimum' in state:
+            self.optimum = state['optimum'].tolist()
+
+def get_distance_between_nodes(node_1, node_2):
+    ''' Function to calculate the distance
+        between two nodes (cities) '''
+    from scipy.spatial import distance
+    return distance.euclidean(node_1, node_2)
+
+def path_positions(path):
+    ''' Function to index the position of every node
+        in the route (path), the inverse of the path '''
+    position = np.empty(len(path), dtype=np.int32)
+    position[np.asarray(path)] = np.arange(len(path), dtype=np.int32)
+    return position
+
+def make_candidate_lists(table, k, list_of_data=None):
+    ''' Function to make the candidate lists: row i holds
+        the k nearest nodes (cities) of node i, the nearest
+        first, queried from a KD-tree of the nodes coordinate
+        when list_of_data is given, else taken from the table '''
+    length = len(table)
+    k = min(k, length - 1)
+    if list_of_data is not None:
+        from scipy.spatial import cKDTree
+        coordinate = np.asarray(list_of_data, dtype=np.float64)[:, 1:3]
+        nearest = cKDTree(coordinate).query(coordinate, k + 1)[1]
+    else:
+        nearest = np.argsort(table, axis=1, kind='stable')[:, 0:k + 1]
+    nearest = nearest.reshape(length, k + 1)
+    # the node itself is dropped, duplicate coordinates can
+    # place it behind another node or out of the k + 1 nearest
+    itself = nearest == np.arange(length)[:, None]
+    order = np.argsort(itself, axis=1, kind='stable')
+    nearest = np.take_along_axis(nearest, order, axis=1)
+    return np.ascontiguousarray(nearest[:, 0:k], dtype=np.int32)
+
+def get_total_distance_of_path(path, table):
+    ''' Function to calculate
+        total distance of route (path) '''
+    path = np.asarray(path)
+    distance = table[path, np.roll(path, -1)].sum()
+    return round(float(distance), 3)
+
+def initialize_hive(population, data):
+    ''' Function to initialize population of bees '''
+    path = random.sample(range(len(data)), len(data))
+    hive = Hive(population, path)
+    return hive, path
+
+def assign_roles(hive, role_percentage, table):
+    ''' Function to assign role of each bee '''
+    population = len(hive)
+    onlooker_count = math.floor(population * role_percentage[0])
+    employee_count = math.floor(population * role_percentage[1])
+    hive.role[:onlooker_count] = 'O'
+    for i in range(onlooker_count, (onlooker_count + employee_count)):
+        hive.role[i] = 'E'
+        new_path = hive.path[i].tolist()
+        random.shuffle(new_path)
+        hive.path[i] = new_path
+        hive.reindex(i)
+        hive.distance[i] = get_total_distance_of_path(hive.path[i], table)
+    return hive
+
+def swap_delta(path, i, j, table):
+    ''' Function to calculate the change of total distance
+        when the nodes at position i and j are swapped,
+        only the edges around both positions are looked up '''
+    length = len(path)
+    node_i, node_j = path[i], path[j]
+    # start position of every edge touched by the swap, an edge
+    # shared by adjacent positions (also across the end of the
+    # route) is counted once
+    edges = {(i - 1) % length, i, (j - 1) % length, j}
+    delta = 0
+    for start in edges:
+        end = (start + 1) % length
+        old_start, old_end = path[start], path[end]
+        new_start = node_j if start == i else node_i if start == j else old_start
+        new_end = node_j if end == i else node_i if end == j else old_end
+        delta = delta + table[new_start, new_end] - table[old_start, old_end]
+    return delta
+
+def swap_nodes(path, i, j, position=None):
+    ''' Function to swap the nodes at position i and j in place,
+        the position index of the path is kept up to date '''
+    path[i], path[j] = path[j], path[i]
+    if position is not None:
+        position[path[i]], position[path[j]] = i, j
+
+def original_mutate(path, distance, table):
+    ''' Function to propose a swap of the route (path),
+        returns the positions and the distance after the swap,
+        the route itself is left unchanged '''
+    [i, j] = sorted(random.sample(range(len(path)), 2))
+    return i, j, distance + swap_delta(path, i, j, table)
+
+def sigmoid_mutate(path, distance, table):
+    ''' Function to propose a swap of the route (path),
+        the distance is kept when the sigmoid rejects the swap '''
+    [i, j] = sorted(random.sample(range(len(path)), 2))
+    new_distance = distance + swap_delta(path, i, j, table)
+    tmp = 1 + np.exp(-1*new_distance)
+    sigmoid = 1 / tmp
+    if sigmoid > random.random():
+        return i, j, new_distance
+    return i, j, distance
+
+def neighbour_mutate(path, position, distance, table, candidates):
+    ''' Function to propose a swap that moves a candidate
+        (near) node next to a random node of the route (path),
+        the node after it is swapped with the candidate node,
+        or the node before it when the candidate already follows,
+        a route of less than 3 nodes has no other node to move
+        next to the candidate, the swap is a random one '''
+    length = len(path)
+    if length < 3:
+        return original_mutate(path, distance, table)
+    i = random.randrange(length)
+    node = candidates[path[i]][random.randrange(len(candidates[0]))]
+    j = position[node]
+    k = (i + 1) % length
+    if k == j:
+        k = (i - 1) % length
+    [i, j] = sorted((k, j))
+    return i, j, distance + swap_delta(path, i, j, table)
+
+def is_symmetric(table):
+    ''' Function to tell if the distance table is the
+        same both ways (the local search of an asymmetric
+        table also costs the edges it turns around) '''
+    table = np.asarray(table)
+    return bool(np.array_equal(table, table.T))
+
+def reversal_delta(path, i, j, table):
+    ''' Function to calculate the change of distance when
+        the edges of the route (path) from position i forward
+        to position j are walked the other way round '''
+    length = len(path)
+    delta = 0
+    for k in range((j - i) % length):
+        a, b = path[(i + k) % length], path[(i + k + 1) % length]
+        delta = delta + table[b, a] - table[a, b]
+    return delta
+
+def reverse_segment(path, position, i, j, shorter=True):
+    ''' Function to reverse the route (path) from position i
+        forward to position j (across the end of the route
+        when j < i) in place, with shorter the shorter side
+        of the route is reversed, which gives the same tour
+        when the distance table is symmetric '''
+    length = len(path)
+    size = (j - i) % length + 1
+    if shorter and 2 * size > length:
+        i, j = (j + 1) % length, (i - 1) % length
+        size = length - size
+    for k in range(size // 2):
+        a, b = (i + k) % length, (j - k) % length
+        path[a], path[b] = path[b], path[a]
+        position[path[a]], position[path[b]] = a, b
+
+def two_opt_move(path, position, node, table, candidates, symmetric=True):
+    ''' Function to find and apply the first improving 2-opt
+        move that adds the edge between node and one of its
+        candidate nodes, returns the change of distance and
+        the nodes of the changed edges, or None, the edges
+        turned around are costed when not symmetric '''
+    length = len(path)
+    i = position[node]
+    for step in (1, -1):
+        # the edge node - other is replaced by node - near,
+        # walking forward: node -> near ... other -> after
+        # (step 1) or other -> after ... node -> near (step -1)
+        other = path[(i + step) % length]
+        removed = table[node, other] if step == 1 else table[other, node]
+        for near in candidates[node]:
+            added = table[node, near]
+            if added >= removed:
+                break
+            j = position[near]
+            after = path[(j + step) % length]
+            if near == other or after == node:
+                continue
+            if step == 1:
+                delta = added + table[other, after] - removed - table[near, after]
+                first, last = (i + 1) % length, j
+            else:
+                delta = added + table[other, after] - removed - table[after, near]
+                first, last = i, (j - 1) % length
+            if not symmetric:
+                delta = delta + reversal_delta(path, first, last, table)
+            if delta < -1e-9:
+                reverse_segment(path, position, first, last, symmetric)
+                return delta, (node, other, near, after)
+    return None
+
+def or_opt_move(path, position, node, table, candidates):
+    ''' Function to find and apply the first improving Or-opt
+        move: the segment of 1 to 3 nodes starting at node is
+        moved (and possibly reversed) between a candidate node
+        of one of its ends and the neighbour of that candidate,
+        returns the change of distance and the nodes of the
+        changed edges, or None, the edges are costed the way
+        they are walked, so an asymmetric table is exact '''
+    length = len(path)
+    i = position[node]
+    for size in (1, 2, 3):
+        if size > length - 4:
+            break
+        segment = [path[(i + k) % length] for k in range(size)]
+        first, last = segment[0], segment[-1]
+        before, after = path[(i - 1) % length], path[(i + size) % length]
+        gain = table[before, first] + table[last, after] - table[before, after]
+        for end, other in ((first, last), (last, first)):
+            for near in candidates[end]:
+                added = table[end, near]
+                if added >= gain:
+                    break
+                if near in segment:
+                    continue
+                j = position[near]
+                for beside in (path[(j + 1) % length], path[(j - 1) % length]):
+                    if beside in segment:
+                        continue
+                    # the segment goes between x -> y, its end next to near
+                    forward = beside == path[(j + 1) % length]
+                    x, y = (near, beside) if forward else (beside, near)
+                    turned = (end == first) != forward
+                    moved = segment[::-1] if turned else segment
+                    delta = (table[x, moved[0]] + table[moved[-1], y]
+                             - table[x, y] - gain)
+                    if turned:
+                        delta = delta + sum(table[moved[k - 1], moved[k]] - table[moved[k], moved[k - 1]]
+                                            for k in range(1, size))
+                    if delta < -1e-9:
+                        # the rest of the route starts after the
+                        # segment, x and y stay adjacent
+                        rest = [path[(i + size + k) % length]
+                                for k in range(length - size)]
+                        a = (position[x] - i - size) % length
+                        path[:] = rest[:a + 1] + moved + rest[a + 1:]
+                        position[:] = path_positions(path).tolist()
+                        return delta, (before, after, first, last, near, beside)
+    return None
+
+def local_search(path, distance, table, candidates, active=None, symmetric=None):
+    ''' Function as local search intensification with 2-opt and
+        Or-opt moves between candidate (near) nodes and don't-look
+        bits: only the nodes in active (all nodes by default) are
+        looked at, a node is looked at again when an edge of it
+        changes, so the search ends at a local optimum,
+        symmetric tells if the table is the same both ways
+        (checked when None), an asymmetric table also costs
+        the edges a 2-opt move turns around,
+        returns the path, the distance changed by every move
+        and the number of nodes looked at (every look costs
+        the candidate moves of the node) '''
+    if symmetric is None:
+        symmetric = is_symmetric(table)
+    path = [int(i) for i in path]
+    position = path_positions(path).tolist()
+    candidates = candidates.tolist()
+    queue = collections.deque(path if active is None else active)
+    looking = set(queue)
+    looked = 0
+    while queue:
+        node = queue.popleft()
+        looking.discard(node)
+        looked = looked + 1
+        move = two_opt_move(path, position, node, table, candidates, symmetric)
+        if move is None:
+            move = or_opt_move(path, position, node, table, candidates)
+        if move is not None:
+            distance = distance + move[0]
+            for i in move[1]:
+                if i not in looking:
+                    looking.add(i)
+                    queue.append(i)
+    return path, distance, looked
+
+def improve_bee(hive, bee, table, candidates):
+    ''' Function to replace the food source
+        of bee by its local optimum '''
+    path, distance, looked = local_search(hive.path[bee], hive.distance[bee],
+                                          table, candidates, symmetric=hive.symmetric)
+    hive.searched = hive.searched + looked
+    hive.path[bee] = path
+    hive.reindex(bee)
+    hive.distance[bee] = distance
+
+def employee(hive, bee, table, limit, candidates=None, sigmoid=False):
+    ''' Function to represent behavior of employee bee,
+        bee is the index of the bee in the hive,
+        with candidate lists the neighbour moves are used,
+        sigmoid=True uses the swaps of Sigmoid ABC '''
+    path = hive.path[bee]
+    if candidates is not None:
+        i, j, new_distance = neighbour_mutate(
+            path, hive.position[bee], hive.distance[bee], table, candidates)
+    elif sigmoid:
+        # using the propose algorithm (Sigmoid ABC)
+        i, j, new_distance = sigmoid_mutate(path, hive.distance[bee], table)
+    else:
+        # using original ABC algorithm
+        i, j, new_distance = original_mutate(path, hive.distance[bee], table)
+
+    if new_distance < hive.distance[bee]:
+        swap_nodes(path, i, j, hive.position[bee])
+        hive.distance[bee] = new_distance
+        hive.cycle[bee] = 0
+    else:
+        hive.cycle[bee] = hive.cycle[bee] + 1
+    if hive.cycle[bee] >= limit:
+        hive.role[bee] = 'S'
+    return hive.distance[bee]
+
+def scout(hive, bee, table):
+    ''' Function to represent behavior of scout bee '''
+    new_path = hive.path[bee].tolist()
+    random.shuffle(new_path)
+    hive.path[bee] = new_path
+    hive.reindex(bee)
+    hive.distance[bee] = get_total_distance_of_path(hive.path[bee], table)
+    hive.role[bee] = 'E'
+    hive.cycle[bee] = 0
+
+def waggle(hive, best_distance, table, employee_limit, scout_count,
+           candidates=None, improve=None, sigmoid=False):
+    ''' Function to represent behavior of employee bee
+        when doing waggle dance, improve='employee' moves
+        the new food sources of scout bees to local optima,
+        sigmoid=True uses the swaps of Sigmoid ABC '''
+    best_path = []
+    results = []
+    for i in range(0, len(hive)):
+        if hive.role[i] == 'E':
+            distance = employee(hive, i, table, employee_limit, candidates,
+                                sigmoid)
+            if distance < best_distance:
+                best_distance = distance
+                best_path = hive.path[i].tolist()
+            results.append(i)
+        elif hive.role[i] == 'S':
+            scout(hive, i, table)
+            if improve == 'employee':
+                improve_bee(hive, i, table, candidates)
+    # the employee bees with the longest distance become scout bees
+    results = np.array(results, dtype=int)
+    order = np.argsort(-hive.distance[results], kind='stable')
+    hive.role[results[order[0:int(scout_count)]]] = 'S'
+    if instruments is not None:
+        instruments.employee_phase(hive, results, employee_limit)
+    return best_distance, best_path
+
+def onlooker(hive, best_distance, best_path, table, candidates=None,
+             improve=None, sigmoid=False):
+    ''' Function to represent behavior of onlooker bee,
+        with improve the best path is moved to a local optimum
+        after the swaps, looking only at the swapped nodes
+        when the path was left by the last local search,
+        sigmoid=True uses the swaps of Sigmoid ABC '''
+    best_path = list(best_path)
+    position = path_positions(best_path)
+    length = len(best_path)
+    searched = best_path == hive.optimum
+    moved = []
+    for i in np.flatnonzero(hive.role == 'O'):
+        if candidates is not None:
+            a, b, new_distance = neighbour_mutate(
+                best_path, position, best_distance, table, candidates)
+        elif sigmoid:
+            # using the propose algorithm (Sigmoid ABC)
+            a, b, new_distance = sigmoid_mutate(best_path, best_distance, table)
+        else:
+            # using using original ABC algorithm
+            a, b, new_distance = original_mutate(best_path, best_distance, table)
+
+        if new_distance < best_distance:
+            best_distance = new_distance
+            swap_nodes(best_path, a, b, position)
+            moved.extend(best_path[k % length]
+                         for k in (a - 1, a, a + 1, b - 1, b, b + 1))
+    if instruments is not None:
+        # six nodes are moved by every accepted swap
+        instruments.moves('onlooker', len(moved) // 6,
+                          np.count_nonzero(hive.role == 'O'))
+    if improve is not None and (moved or not searched):
+        best_path, best_distance, looked = local_search(
+            best_path, best_distance, table, candidates,
+            moved if searched else None, hive.symmetric)
+        hive.searched = hive.searched + looked
+        hive.optimum = best_path
+    return best_distance, best_path
+
+def draw_swaps(count, length):
+    ''' Function to draw count pairs of distinct
+        positions i < j of a route at once '''
+    i = np.random.randint(0, length, count)
+    j = np.random.randint(0, length - 1, count)
+    j = j + (j >= i)
+    return np.minimum(i, j), np.maximum(i, j)
+
+def draw_neighbour_swaps(paths, positions, bees, candidates):
+    ''' Function to draw neighbour_mutate swaps of paths[bees]
+        at once, positions holds the position index of paths '''
+    length = paths.shape[1]
+    if length < 3:
+        return draw_swaps(len(bees), length)
+    i = np.random.randint(0, length, len(bees))
+    nth = np.random.randint(0, candidates.shape[1], len(bees))
+    j = positions[bees, candidates[paths[bees, i], nth]]
+    k = (i + 1) % length
+    k = np.where(k == j, (i - 1) % length, k)
+    return np.minimum(k, j), np.maximum(k, j)
+
+def swap_delta_batch(paths, bees, i, j, table):
+    ''' Function to calculate swap_delta of many swaps at once,
+        swap k exchanges position i[k] and j[k] of paths[bees[k]],
+        all edges are gathered from the table in one go '''
+    length = paths.shape[1]
+    node_i, node_j = paths[bees, i], paths[bees, j]
+    starts = np.stack(((i - 1) % length, i, (j - 1) % length, j))
+    ends = (starts + 1) % length
+    # an edge shared by adjacent positions is counted once
+    counted = np.ones(starts.shape, dtype=bool)
+    counted[2] = starts[2] != starts[1]
+    counted[3] = starts[3] != starts[0]
+    old_start, old_end = paths[bees, starts], paths[bees, ends]
+    new_start = np.where(starts == i, node_j,
+                         np.where(starts == j, node_i, old_start))
+    new_end = np.where(ends == i, node_j,
+                       np.where(ends == j, node_i, old_end))
+    change = table[new_start, new_end] - table[old_start, old_end]
+    return np.where(counted, change, 0).sum(axis=0)
+
+def waggle_batch(hive, best_distance, table, employee_limit, scout_count,
+                 candidates=None, improve=None, sigmoid=False):
+    ''' Function to represent behavior of all employee bees
+        in one phase, the same as waggle but every swap is
+        drawn, evaluated and accepted at once with masks '''
+    best_path = []
+    scouts = np.flatnonzero(hive.role == 'S')
+    for i in scouts:
+        hive.path[i] = np.random.permutation(hive.path[i])
+        hive.reindex(i)
+    paths = hive.path[scouts]
+    distance = table[paths, np.roll(paths, -1, axis=1)].sum(axis=1)
+    hive.distance[scouts] = np.round(distance, 3)
+    hive.role[scouts] = 'E'
+    hive.cycle[scouts] = 0
+    if improve == 'employee':
+        for i in scouts:
+            improve_bee(hive, i, table, candidates)
+    employed = np.flatnonzero(hive.role == 'E')
+    employed = employed[~np.isin(employed, scouts)]
+    if candidates is None:
+        i, j = draw_swaps(len(employed), hive.path.shape[1])
+    else:
+        i, j = draw_neighbour_swaps(hive.path, hive.position,
+                                    employed, candidates)
+    delta = swap_delta_batch(hive.path, employed, i, j, table)
+    new_distance = hive.distance[employed] + delta
+    # using original ABC algorithm
+    accept = new_distance < hive.distance[employed]
+    if sigmoid:
+        # using the propose algorithm (Sigmoid ABC)
+        accept = accept & (1 / (1 + np.exp(-1*new_distance))
+                           > np.random.random(len(employed)))
+
+    bees, i, j = employed[accept], i[accept], j[accept]
+    hive.path[bees, i], hive.path[bees, j] = hive.path[bees, j], hive.path[bees, i]
+    hive.position[bees, hive.path[bees, i]] = i
+    hive.position[bees, hive.path[bees, j]] = j
+    hive.distance[bees] = new_distance[accept]
+    hive.cycle[bees] = 0
+    hive.cycle[employed[~accept]] += 1
+    hive.role[employed[hive.cycle[employed] >= employee_limit]] = 'S'
+    if len(employed) > 0:
+        best = employed[np.argmin(hive.distance[employed])]
+        if hive.distance[best] < best_distance:
+            best_distance = hive.distance[best]
+            best_path = hive.path[best].tolist()
+    # the employee bees with the longest distance become scout bees
+    order = np.argsort(-hive.distance[employed], kind='stable')
+    hive.role[employed[order[0:int(scout_count)]]] = 'S'
+    if instruments is not None:
+        instruments.employee_phase(hive, employed, employee_limit)
+    return best_distance, best_path
+
+def onlooker_batch(hive, best_distance, best_path, table, candidates=None,
+                   improve=None, sigmoid=False):
+    ''' Function to represent behavior of all onlooker bees
+        in one phase, every onlooker proposes a swap of the
+        best path, the improving swaps are applied from the
+        largest gain on as long as they touch other edges
+        than the swaps already applied, so the gains add up,
+        improve and sigmoid work the same as in onlooker '''
+    searched = list(best_path) == hive.optimum
+    path = np.array([best_path], dtype=np.int32)
+    length = path.shape[1]
+    count = np.count_nonzero(hive.role == 'O')
+    bees = np.zeros(count, dtype=int)
+    if candidates is None:
+        i, j = draw_swaps(count, length)
+    else:
+        position = path_positions(path[0])[None, :]
+        i, j = draw_neighbour_swaps(path, position, bees, candidates)
+    delta = swap_delta_batch(path, bees, i, j, table)
+    accept = delta < 0
+    if sigmoid:
+        accept = accept & (1 / (1 + np.exp(-1*(best_distance + delta)))
+                           > np.random.random(count))
+    improving = np.flatnonzero(accept)
+    touched = set()
+    applied = 0
+    for k in improving[np.argsort(delta[improving], kind='stable')]:
+        around = {(i[k] - 1) % length, i[k], (i[k] + 1) % length,
+                  (j[k] - 1) % length, j[k], (j[k] + 1) % length}
+        if around.isdisjoint(touched):
+            swap_nodes(path[0], i[k], j[k])
+            best_distance = best_distance + delta[k]
+            touched = touched | around
+            applied = applied + 1
+    if instruments is not None:
+        instruments.moves('onlooker', applied, count)
+    best_path = path[0].tolist()
+    if improve is not None and (touched or not searched):
+        best_path, best_distance, looked = local_search(
+            best_path, best_distance, table, candidates,
+            [best_path[k] for k in touched] if searched else None,
+            hive.symmetric)
+        hive.searched = hive.searched + looked
+        hive.optimum = best_path
+    return best_distance, best_path
+
+def reseed(hive, table, candidates=None, improve=None):
+    ''' Function to seed the hive again when the search
+        stagnates: every employee and scout bee finds a new
+        food source (moved to a local optimum with
+        improve='employee'), returns the best of them '''
+    employed = np.flatnonzero(np.isin(hive.role, ['E', 'S']))
+    if instruments is not None:
+        instruments.scouts['restart'] += len(employed)
+    for bee in employed:
+        scout(hive, bee, table)
+        if improve == 'employee':
+            improve_bee(hive, bee, table, candidates)
+    best = employed[np.argmin(hive.distance[employed])]
+    return hive.distance[best], hive.path[best].tolist()
+
+def iterate_cycles(hive, waggle_phase, onlooker_phase, max_iteration,
+                   max_evaluations=None, time_limit=None, evaluations=None,
+                   restart=None, reseed_phase=None, checkpoint=None,
+                   state=None, termination=()):
+    ''' Function as the cycle engine of ABC Algorithm, every
+        cycle runs the employee phase and the onlooker phase
+        exactly once and counts every objective evaluation
+        (a node the local search looks at counts as one,
+        see Hive.searched),
+        it stops after max_iteration cycles, max_evaluations
+        evaluations or time_limit seconds, whichever is first
+        - waggle_phase(best_distance) -> distance, path
+        - onlooker_phase(best_distance, best_path) -> distance, path
+        - reseed_phase() -> distance, path
+        evaluations continues the count of an earlier run,
+        when the restart policy fires the hive is seeded
+        again and the search goes on from the best of the
+        new food sources, the records keep the best path
+        of the whole run, yields a Progress record of the
+        initial hive (cycle 0) and of every cycle, closing
+        the generator stops the run, checkpoint (a
+        Checkpointer) saves the state of the run every so
+        many cycles, state (of load_checkpoint) goes on from
+        that checkpoint on the hive restored from it, without
+        the records of the cycles before, the termination
+        policies (that read the records) go to the checkpoint
+        and are restored from it too '''
+    if state is None:
+        employed = np.flatnonzero(hive.role == 'E')
+        if evaluations is None:
+            # the employee bees are evaluated once by assign_roles
+            evaluations = len(employed)
+        # and improved by make_hive with improve='employee'
+        evaluations, hive.searched = evaluations + hive.searched, 0
+        best = employed[np.argmin(hive.distance[employed])]
+        best_distance = hive.distance[best]
+        best_path = hive.path[best].tolist()
+        # best of the whole run, the search may go on from a worse path after a restart
+        found_distance, found_path = best_distance, best_path
+        found_cycle, found_phase = 0, 'E'
+        yield Progress(0, found_distance, 'E', int(evaluations), found_path)
+        if restart is not None:
+            restart.reset()
+        start = time.time()
+        cycle = 1
+    else:
+        evaluations = int(state['evaluations'])
+        best_distance = float(state['best_distance'])
+        best_path = state['best_path'].tolist()
+        found_distance = float(state['found_distance'])
+        found_path = state['found_path'].tolist()
+        found_cycle, found_phase = int(state['found_cycle']), str(state['found_phase'])
+        if restart is not None:
+            restart.restore(state['restart'])
+        restore_policies(termination, state)
+        start = time.time() - float(state['elapsed'])
+        cycle = int(state['cycle']) + 1
+        set_random_state(state)
+    if checkpoint is not None:
+        checkpoint.start(cycle - 1)
+
+    while cycle <= max_iteration:
+        if max_evaluations is not None and evaluations >= max_evaluations:
+            break
+        if time_limit is not None and time.time() - start >= time_limit:
+            break
+        phase = ''
+
+        # every employee and scout bee evaluates one path
+        evaluations = evaluations + np.count_nonzero(np.isin(hive.role, ['E', 'S']))
+        waggle_distance, waggle_path = waggle_phase(best_distance)
+        evaluations, hive.searched = evaluations + hive.searched, 0
+        if waggle_distance < best_distance:
+            best_distance = waggle_distance
+            best_path = list(waggle_path)
+            if best_distance < found_distance:
+                found_distance, found_path = best_distance, best_path
+                # print_details(cycle, best_path, best_distance, 'E')
+                phase = 'E'
+                found_cycle, found_phase = cycle, phase
+
+        # every onlooker bee evaluates one path
+        evaluations = evaluations + np.count_nonzero(hive.role == 'O')
+        onlooker_distance, onlooker_path = onlooker_phase(best_distance, best_path)
+        evaluations, hive.searched = evaluations + hive.searched, 0
+        if onlooker_distance < best_distance:
+            best_distance = onlooker_distance
+            best_path = list(onlooker_path)
+            if best_distance < found_distance:
+                found_distance, found_path = best_distance, best_path
+                # print_details(cycle, best_path, best_distance, 'O')
+                phase = 'O'
+                found_cycle, found_phase = cycle, phase
+
+        record = Progress(cycle, found_distance, phase, int(evaluations), found_path)
+        yield record
+        if restart is not None and restart(record):
+            # every employee and scout bee evaluates a new food source
+            evaluations = evaluations + np.count_nonzero(np.isin(hive.role, ['E', 'S']))
+            best_distance, best_path = reseed_phase()
+            evaluations, hive.searched = evaluations + hive.searched, 0
+            restart.reset()
+        if checkpoint is not None and checkpoint.due(cycle):
+            snapshot = dict(hive.state(), cycle=cycle, evaluations=evaluations,
+                            best_distance=best_distance, best_path=np.array(best_path),
+                            found_distance=found_distance, found_path=np.array(found_path),
+                            found_cycle=found_cycle, found_phase=found_phase,
+                            elapsed=time.time() - start, **policies_state(termination))
+            if restart is not None:
+                snapshot['restart'] = restart.state()
+            checkpoint.save(cycle, snapshot)
+        cycle = cycle + 1
+
+def run_cycles(hive, waggle_phase, onlooker_phase, max_iteration,
+               max_evaluations=None, time_limit=None, evaluations=None,
+               history=None):
+    ''' Function to run the cycle engine (see iterate_cycles)
+        to the end, the best distance of every cycle is
+        appended to history (a list by default),
+        returns the result (cycle, path, distance, bee),
+        the history and the evaluations '''
+    return collect_progress(iterate_cycles(
+        hive, waggle_phase, onlooker_phase, max_iteration,
+        max_evaluations, time_limit, evaluations), history)
+
+def make_hive(source, table, config, candidates=None, improve=None):
+    ''' Function to make the hive of a run: the food
+        sources are seeded and the roles assigned,
+        improve='employee' improves every employee bee '''
+    hive = initialize_hive(config.population_of_bee, source)[0]
+    assign_roles(hive, [config.percentage_of_onlooker,
+                        config.percentage_of_employee], table)
+    if improve is not None:
+        hive.symmetric = is_symmetric(table)
+    if improve == 'employee':
+        for bee in np.flatnonzero(hive.role == 'E'):
+            improve_bee(hive, bee, table, candidates)
+    return hive
+
+def abc_iterate(source, table, batched=False, max_evaluations=None,
+                time_limit=None, candidates=None, improve=None,
+                config=None, checkpoint=None, state=None, hive=None):
+    ''' Function to start optimization with ABC Algorithm
+        on a distance table (see main_type1 for the
+        parameters), returns the generator of the Progress
+        record of every cycle: the run advances one cycle
+        per record and stops when the caller stops reading
+        for record in abc_iterate(src, table, config=config):
+            if record.distance < target:
+                break
+        record.path is the best path of the run so far,
+        the termination and restart policies of config
+        apply (see termination), checkpoint and state
+        as in iterate_cycles, hive (of make_hive) is
+        searched instead of a new hive, so the caller
+        can change its food sources between records '''
+    if config is None:
+        config = ABCConfig()
+    if improve is not None and candidates is None:
+        raise ValueError('local search needs the candidate lists')
+    waggle_phase, onlooker_phase = waggle, onlooker
+    if batched:
+        waggle_phase, onlooker_phase = waggle_batch, onlooker_batch
+    if state is not None:
+        hive = Hive(config.population_of_bee, range(len(source)))
+        hive.restore(state)
+        if improve is not None:
+            hive.symmetric = is_symmetric(table)
+    elif hive is None:
+        hive = make_hive(source, table, config, candidates, improve)
+    number_of_scout = np.ceil(config.population_of_bee
+                              * config.percentage_of_scout)
+    termination = termination_policies(config)
+
+    return until(iterate_cycles(
+        hive,
+        lambda best_distance: waggle_phase(
+            hive, best_distance, table, config.limit_of_employee,
+            number_of_scout, candidates, improve, config.sigmoid),
+        lambda best_distance, best_path: onlooker_phase(
+            hive, best_distance, best_path, table, candidates, improve,
+            config.sigmoid),
+        config.maximal_of_iteration, max_evaluations, time_limit,
+        restart=restart_policy(config),
+        reseed_phase=lambda: reseed(hive, table, candidates, improve),
+        checkpoint=checkpoint, state=state, termination=termination),
+        termination)
+
+def abc_optimize(source, table, batched=False, max_evaluations=None,
+                 time_limit=None, candidates=None, improve=None,
+                 config=None, history=None, instruments=None,
+                 checkpoint=None, resume=None):
+    ''' Function to doing optimization with ABC Algorithm
+        on a distance table, see main_type1 and main_type2 '''
+    if config is None:
+        config = ABCConfig()
+    if history is None:
+        history = []
+    state, result, evaluations = None, None, 0
+    if resume is not None:
+        state = load_checkpoint(resume)
+        if isinstance(history, list) and 'history' in state:
+            history.extend(state['history'].tolist())
+        result = (int(state['found_cycle']), state['found_path'].tolist(),
+                  float(state['found_distance']), str(state['found_phase']))
+        evaluations = int(state['evaluations'])
+    if checkpoint is not None:
+        checkpoint.history = history
+    with recording(instruments):
+        try:
+            result, listBest, evaluations = collect_progress(abc_iterate(
+                source, table, batched, max_evaluations, time_limit,
+                candidates, improve, config, checkpoint, state),
+                history, result, evaluations)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+    if config.verbose:
+        print('\nFINAL RESULT:',
+              '\nBest Route has found at iteration: ', result[0],
+              '\nBest Path: ', result[1] + [result[1][0]],
+              '\nBest Distance: ', result[2],
+              '\nBee: ', result[3],
+              '\nEvaluations: ', evaluations)
+    return result[1], listBest, result[2], evaluations
+
+def main_type1(source, table=None, batched=False, max_evaluations=None,
+               time_limit=None, neighbours=None, improve=None, config=None,
+               history=None, instruments=None, checkpoint=None, resume=None):
+    ''' Function to doing optimization with ABC Algorithm
+        using type 1 dataset: nodes (cities) coordinate,
+        table can be given from load_distance_table,
+        batched=True evaluates every phase at once,
+        max_evaluations / time_limit (second) stop the
+        optimization before maximal_of_iteration cycles,
+        neighbours=k swaps nodes with their k nearest nodes,
+        improve runs 2-opt / Or-opt local search on them:
+        - improve='best'     : on the best path every cycle
+        - improve='employee' : also on every new food source
+        config is the ABCConfig of the parameter setting
+        (the default parameter setting when None),
+        the best distance of every cycle is appended to
+        history, a list by default, a RingHistory (last
+        cycles) or DecimatedHistory (spread over the run)
+        keeps the memory flat on long runs, an Instruments
+        (see instrument) records the calls, time and moves
+        of every phase of the run, a Checkpointer (see
+        checkpoint) saves the run every so many cycles and
+        resume is the checkpoint file to go on from (with
+        the same source, table and parameters) '''
+    if table is None:
+        table = make_distance_table(source)
+    candidates = None
+    if neighbours is not None:
+        candidates = make_candidate_lists(table, neighbours, source)
+    return abc_optimize(source, table, batched, max_evaluations,
+                        time_limit, candidates, improve, config, history,
+                        instruments, checkpoint, resume)
+
+def main_type2(source, batched=False, max_evaluations=None,
+               time_limit=None, neighbours=None, improve=None, config=None,
+               history=None, instruments=None, checkpoint=None, resume=None):
+    ''' Function to doing optimization with ABC Algorithm
+        using type 2 dataset: distance table,
+        batched=True evaluates every phase at once,
+        max_evaluations / time_limit (second) stop the
+        optimization before maximal_of_iteration cycles,
+        neighbours=k swaps nodes with their k nearest nodes,
+        improve runs 2-opt / Or-opt local search on them:
+        - improve='best'     : on the best path every cycle
+        - improve='employee' : also on every new food source
+        config, history, instruments, checkpoint and
+        resume as in main_type1 '''
+    table = np.asarray(source, dtype=np.float64)
+    candidates = None
+    if neighbours is not None:
+        candidates = make_candidate_lists(table, neighbours)
+    return abc_optimize(source, table, batched, max_evaluations,
+                        time_limit, candidates, improve, config, history,
+                        instruments, checkpoint, resume)
+
+def migrating(records, index, interval, last_cycle, inbox, outboxes,
+              senders, hive):
+    ''' Function to pass the Progress records of an island
+        on, after every interval cycles the best path is sent
+        to the neighbour islands as (index, distance, path),
+        one path of every sender still running is waited for
+        (an island that ended is sent as (index, None, None))
+        and the paths received replace the worst employee
+        bees of the hive '''
+    for record in records:
+        yield record
+        if not record.cycle or record.cycle % interval or record.cycle >= last_cycle:
+            continue
+        for outbox in outboxes:
+            outbox.put((index, record.distance, list(record.path)))
+        # the own best path also returns to the hive
+        # so the next cycles continue from it
+        immigrants = [(record.distance, list(record.path))]
+        received = 0
+        while received < senders:
+            sender, distance, path = inbox.get()
+            if path is None:
+                senders = senders - 1
+            else:
+                immigrants.append((distance, path))
+                received = received + 1
+        employed = np.flatnonzero(hive.role == 'E')
+        worst = employed[np.argsort(-hive.distance[employed], kind='stable')]
+        for bee, (distance, path) in zip(worst, sorted(immigrants)):
+            if distance < hive.distance[bee]:
+                hive.path[bee] = path
+                hive.reindex(bee)
+                hive.distance[bee] = distance
+                hive.cycle[bee] = 0
+
+def island(index, seed, source, table, batched, interval, inbox, outboxes,
+           senders, output, candidates=None, improve=None, config=None,
+           max_evaluations=None, time_limit=None):
+    ''' Function to represent one island: a hive evolving in its
+        own process through abc_iterate (the budgets, termination
+        and restart policies apply to every island), migrating
+        every interval cycles (see migrating) with the senders
+        islands that send to it, the result goes to output '''
+    if config is None:
+        config = ABCConfig()
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    for outbox in outboxes:
+        # a neighbour that ended no longer reads its inbox
+        outbox.cancel_join_thread()
+    hive = make_hive(source, table, config, candidates, improve)
+    records = abc_iterate(source, table, batched, max_evaluations, time_limit,
+                          candidates, improve, config, hive=hive)
+    result, listBest, evaluations = collect_progress(migrating(
+        records, index, interval, config.maximal_of_iteration, inbox,
+        outboxes, senders, hive))
+    output.send((result[1], listBest, result[2], evaluations))
+    output.close()
+
+def island_model(source, table, islands, interval, topology='ring',
+                 batched=False, seed=None, candidates=None, improve=None,
+                 config=None, max_evaluations=None, time_limit=None):
+    ''' Function to doing optimization with ABC Algorithm as
+        island model: islands hives evolve in parallel processes
+        and exchange their best path every interval cycles
+        - topology='ring' : island i sends to island i + 1
+        - topology='full' : every island sends to all others
+        every island gets its own seed spawned from seed,
+        candidates from make_candidate_lists enable the
+        neighbour moves and improve the local search
+        (see main_type1) on every island, config is the
+        ABCConfig of every island, max_evaluations and
+        time_limit the budget of every island, an island
+        that ends (or dies) is no longer waited for by its
+        neighbours, raises RuntimeError when an island dies,
+        returns the result of every island and the best result '''
+    if topology == 'ring':
+        neighbours = [[(i + 1) % islands] for i in range(islands)]
+    elif topology == 'full':
+        neighbours = [[j for j in range(islands) if j != i]
+                      for i in range(islands)]
+    else:
+        raise ValueError('unknown topology: ' + str(topology))
+    if improve is not None and candidates is None:
+        raise ValueError('local search needs the candidate lists')
+    if islands == 1:
+        neighbours = [[]]
+    seeds = [int(i.generate_state(1, np.uint64)[0])
+             for i in np.random.SeedSequence(seed).spawn(islands)]
+    senders = [sum(i in j for j in neighbours) for i in range(islands)]
+    context = multiprocessing.get_context('fork')
+    inboxes = [context.Queue() for i in range(islands)]
+    outputs = [context.Pipe(duplex=False) for i in range(islands)]
+    processes = [context.Process(
+        target=island,
+        args=(i, seeds[i], source, table, batched, interval, inboxes[i],
+              [inboxes[j] for j in neighbours[i]], senders[i],
+              outputs[i][1], candidates, improve, config, max_evaluations,
+              time_limit), daemon=True)
+        for i in range(islands)]
+    for process in processes:
+        process.start()
+    for output in outputs:
+        output[1].close()
+    results = [None] * islands
+    # the result is read as soon as it is sent, an island has ended
+    # (or died, without a result) once its process exits
+    readers = {outputs[i][0]: i for i in range(islands)}
+    running = {processes[i].sentinel: i for i in range(islands)}
+    while running:
+        for ready in multiprocessing.connection.wait(list(readers) + list(running)):
+            if ready in readers:
+                i = readers.pop(ready)
+                try:
+                    results[i] = ready.recv()
+                except EOFError:
+                    pass
+                continue
+            i = running.pop(ready)
+            if outputs[i][0] in readers and outputs[i][0].poll():
+                results[readers.pop(outputs[i][0])] = outputs[i][0].recv()
+            readers.pop(outputs[i][0], None)
+            # the neighbours of an island that ended stop waiting for it
+            for j in neighbours[i]:
+                inboxes[j].put((i, None, None))
+    for process in processes:
+        process.join()
+    for inbox in inboxes:
+        inbox.cancel_join_thread()
+    dead = [i for i in range(islands) if results[i] is None]
+    if dead:
+        raise RuntimeError('island ' + str(dead[0]) + ' exited with '
+                           + str(processes[dead[0]].exitcode))
+    best = min(results, key=lambda result: result[2])
+    return results, best
@@ -0,0 +1,407 @@
+''' Vehicle Routing Problem of the CVRP case of the ABC Algorithm and of
+    the Simulated Annealing: the instance, the split of a path (giant tour) into the
+    routes of the fleet and the capacity-aware route moves, set_instance loads the
+    instance every function works on (forked workers inherit it) '''
+import math, random
+import numpy as np
+
+
+tables = None  # nodes (x, y, demand), the depot excluded # cities
+depot = None  # depot (x, y, demand)
+vehicles = None  # fleet (vehicle, capacity)
+depot_index = None
+distance_matrix = None
+demand = None
+evaluation_cache = None  # an EvaluationCache makes path_to_distance look up the paths it has seen (optimal split only)
+
+def make_distance_matrix(nodes, depot):
+    # euclidean distance between every pair of nodes, the depot is the last row / column
+    points = np.vstack((nodes[:, :2], depot[:2])).astype(float)
+    difference = points[:, np.newaxis, :] - points[np.newaxis, :, :]
+    return np.sqrt((difference ** 2).sum(axis=-1))
+
+def set_instance(nodes, depot_node, fleet, matrix=None):
+    # nodes (x, y, demand), depot and fleet (vehicle, capacity) as returned by load_instance, the depot is
+    # node len(nodes) of the paths and of the distance matrix, matrix is the make_distance_matrix of an earlier load
+    global tables, depot, vehicles, depot_index, distance_matrix, demand
+    tables, depot, vehicles = nodes, depot_node, fleet
+    depot_index = len(tables)
+    distance_matrix = make_distance_matrix(tables, depot) if matrix is None else matrix
+    demand = tables[:, 2].astype(float)
+
+def total_distance_of_VRP(path):
+    route = [depot_index] + list(path) + [depot_index]
+    return distance_matrix[route[:-1], route[1:]].sum()
+
+def average_demand(path, vehicle):
+    total_demand = 0
+    for i in range(len(path)):
+        total_demand = total_demand + tables[i][2]
+    average_demand = total_demand / len(vehicle)
+    return average_demand
+
+def sub_path_slice(path, vehicle):
+    capacity_used = np.zeros(len(vehicle))
+    node = 0
+    stopping = []
+    mass = []
+    # epsilon = average_demand(path, vehicle)
+    for i in range(len(vehicle)):
+        # while capacity_used[i] <= epsilon and node <= (len(path)-1):
+        while capacity_used[i] <= vehicle[i][1] and node <= (len(path) - 1):
+            capacity_used[i] = capacity_used[i] + tables[path[node]][2]
+            # if capacity_used[i] > epsilon:    # error:list index out of range
+            if capacity_used[i] > vehicle[i][1]:
+                capacity_used[i] = capacity_used[i] - tables[path[node]][2]
+                node = node - 1
+                stopping.append(node)
+                node = node + 1
+                break
+            node = node + 1
+        mass.append(capacity_used[i])
+    stopping.append(node - 1)
+    return stopping, mass
+
+def sub_path(slice, path):
+    sub = []
+    sub.append(path[:(slice[0] + 1)])
+    for i in range(0, len(slice) - 1):
+        sub.append(path[(slice[i] + 1):(slice[i + 1] + 1)])
+    return sub
+
+def optimal_path_slice(path, vehicle):
+    # optimal split of the giant tour into capacity feasible routes (Prins split), shortest
+    # path over the positions of the path with one layer per vehicle in the order of the
+    # fleet, a vehicle either serves the next segment of the path or stays unused
+    path = np.asarray(path)
+    capacity = np.asarray(vehicle, dtype=float)[:, 1]
+    length = len(path)
+    prefix = np.concatenate(([0.0], np.cumsum(demand[path])))
+    leave = distance_matrix[depot_index, path]
+    back = distance_matrix[path, depot_index]
+    inner = np.concatenate(([0.0], np.cumsum(distance_matrix[path[:-1], path[1:]])))
+    # cost and load of the route serving position i to i + size - 1, for every route size
+    longest = int(np.max(np.searchsorted(prefix, prefix + capacity.max(), side='right') - 1 - np.arange(length + 1)))
+    segments = []
+    for size in range(1, min(longest, length) + 1):
+        i = np.arange(length - size + 1)
+        segments.append((leave[i] + inner[i + size - 1] - inner[i] + back[i + size - 1],
+                         prefix[i + size] - prefix[i]))
+    best = np.full(length + 1, np.inf)
+    best[0] = 0.0
+    previous = []
+    for k in range(len(capacity)):
+        layer = best.copy()
+        before = np.full(length + 1, -1)
+        for size, (cost, load) in enumerate(segments, 1):
+            candidate = np.where(load <= capacity[k], best[:length - size + 1] + cost, np.inf)
+            better = candidate < layer[size:]
+            layer[size:][better] = candidate[better]
+            before[size:][better] = np.nonzero(better)[0]
+        previous.append(before)
+        unchanged = np.array_equal(layer, best)
+        best = layer
+        # a vehicle that did not improve any layer means no vehicle that is not larger can
+        if unchanged and (k == len(capacity) - 1 or capacity[k + 1:].max() <= capacity[k]):
+            break
+    if not np.isfinite(best[length]):
+        # the fleet can not serve this order of nodes, keep the greedy split
+        return sub_path_slice(path, vehicle)
+
+    stopping = []
+    capacity_used = np.zeros(len(vehicle))
+    node = length
+    for k in range(len(previous) - 1, -1, -1):
+        if previous[k][node] >= 0:
+            start = previous[k][node]
+            capacity_used[k] = prefix[node] - prefix[start]
+            stopping.append(node - 1)
+            node = start
+    stopping.reverse()
+    return stopping, list(capacity_used)
+
+def all_vehicle_distance(sub):
+    # every sub path leaves from and returns to the depot, so the whole fleet is one gather
+    route = [depot_index]
+    for i in sub:
+        route.extend(i)
+        route.append(depot_index)
+    return distance_matrix[route[:-1], route[1:]].sum()
+
+def path_to_distance(path, vehicle, path_slice=sub_path_slice, key=None):
+    # key is the hash of path when the caller keeps it up to date, the fleet is the one of the module, the
+    # evaluation_cache only serves the optimal split: hashing a path costs as much as its greedy split
+    cached = evaluation_cache is not None and path_slice is not sub_path_slice
+    if cached:
+        key = ((evaluation_cache.hash(path) if key is None else key), path_slice.__name__)
+        TotalDistance = evaluation_cache.get(key)
+        if TotalDistance is not None:
+            return TotalDistance
+    Slice = path_slice(path, vehicle)
+    SubPath = sub_path(Slice[0], path)
+    TotalDistance = all_vehicle_distance(SubPath)
+    if cached:
+        evaluation_cache.put(key, TotalDistance)
+    return TotalDistance
+
+class SplitEvaluator:
+    # greedy split of a path into vehicle routes (same routes as sub_path_slice) that keeps
+    # the prefix demand of the path and the cost of every route, so a move only re-splits
+    # and re-costs the routes it touches and reuses the cached cost of all other routes,
+    # any other path_slice (optimal_path_slice) is evaluated again in full after a move, through the
+    # evaluation_cache when there is one, with the hash of the path kept up to date by every move
+    def __init__(self, path, vehicle, path_slice=sub_path_slice):
+        self.path = np.asarray(path)
+        self.vehicle = vehicle
+        self.path_slice = path_slice
+        self.undo = None
+        if path_slice is not sub_path_slice:
+            self.key = None if evaluation_cache is None else evaluation_cache.hash(self.path)
+            self.distance = path_to_distance(self.path, vehicle, path_slice, self.key)
+            return
+        self.capacity = np.asarray(vehicle, dtype=float)[:, 1]
+        self.prefix = np.concatenate(([0.0], np.cumsum(demand[self.path])))
+        self.start, self.end, self.cost = [], [], []
+        node = 0
+        for i in range(len(self.capacity)):
+            route_end = self.route_end(node, i)
+            self.start.append(node)
+            self.end.append(route_end)
+            self.cost.append(self.route_cost(node, route_end))
+            node = route_end
+        self.distance = sum(self.cost)
+
+    def route_end(self, node, i):
+        # vehicle i takes nodes from position node while its capacity allows
+        limit = self.prefix[node] + self.capacity[i]
+        return max(node, int(np.searchsorted(self.prefix, limit, side='right')) - 1)
+
+    def route_cost(self, start, end):
+        if start == end:
+            return 0.0
+        route = np.concatenate(([depot_index], self.path[start:end], [depot_index]))
+        return distance_matrix[route[:-1], route[1:]].sum()
+
+    def swap(self, i, j):
+        return self.assign([i, j], [self.path[j], self.path[i]])
+
+    def apply(self, move, *positions):
+        # move changes self.path in place by permuting the nodes at the given positions
+        positions = list(positions)
+        old_nodes = self.path[positions].copy()
+        move(self.path, *positions)
+        new_nodes = self.path[positions].copy()
+        self.path[positions] = old_nodes
+        return self.assign(positions, new_nodes)
+
+    def assign(self, positions, nodes):
+        # nodes must be a permutation of the nodes already at positions, so the prefix
+        # demand only changes between the first and the last changed position
+        old_nodes = self.path[positions].copy()
+        if self.path_slice is not sub_path_slice:
+            key = self.key
+            if evaluation_cache is not None and key is not None:
+                key = evaluation_cache.moved(key, self.path, positions, nodes)
+            self.path[positions] = nodes
+            self.undo = (positions, old_nodes, self.distance, self.key)
+            self.key = key
+            self.distance = path_to_distance(self.path, self.vehicle, self.path_slice, self.key)
+            return self.distance
+
+        changed = sorted(positions)
+        low, high = changed[0], changed[-1]
+        old_prefix = self.prefix[low + 1:high + 1].copy()
+        self.path[positions] = nodes
+        self.prefix[low + 1:high + 1] = self.prefix[low] + np.cumsum(demand[self.path[low:high]])
+
+        first = 0
+        while first < len(self.end) - 1 and self.end[first] < low:
+            first = first + 1
+        start, end, cost = [], [], []
+        node = self.start[first]
+        last = len(self.capacity)
+        for i in range(first, len(self.capacity)):
+            if node > high and node == self.start[i]:
+                last = i
+                break
+            route_end = self.route_end(node, i)
+            touched = any(node <= p < route_end for p in changed)
+            if node == self.start[i] and route_end == self.end[i] and not touched:
+                route_cost = self.cost[i]
+            else:
+                route_cost = self.route_cost(node, route_end)
+            start.append(node)
+            end.append(route_end)
+            cost.append(route_cost)
+            node = route_end
+
+        self.undo = (positions, old_nodes, low, old_prefix, first, last, self.start[first:last],
+                     self.end[first:last], self.cost[first:last], self.distance)
+        self.distance = self.distance - sum(self.cost[first:last]) + sum(cost)
+        self.start[first:last], self.end[first:last], self.cost[first:last] = start, end, cost
+        return self.distance
+
+    def revert(self):
+        # undo the last move
+        if self.path_slice is not sub_path_slice:
+            positions, old_nodes, self.distance, self.key = self.undo
+            self.path[positions] = old_nodes
+            self.undo = None
+            return
+        positions, old_nodes, low, old_prefix, first, last, start, end, cost, distance = self.undo
+        self.path[positions] = old_nodes
+        self.prefix[low + 1:low + 1 + len(old_prefix)] = old_prefix
+        self.start[first:last], self.end[first:last], self.cost[first:last] = start, end, cost
+        self.distance = distance
+        self.undo = None
+
+def split_routes(path, vehicle, path_slice=sub_path_slice):
+    # one route per vehicle of the fleet (empty for an unused vehicle) from the split of the path, the
+    # nodes the greedy split leaves unserved (a fleet too small for the path) go to the last vehicle
+    stopping, mass = path_slice(path, vehicle)
+    sub = [[int(j) for j in i] for i in sub_path(stopping, list(path)) if len(i) > 0]
+    used = [k for k in range(len(vehicle)) if mass[k] > 0]
+    if len(used) != len(sub):
+        used = list(range(len(sub)))
+    routes = [[] for i in range(len(vehicle))]
+    for k, route in zip(used, sub):
+        routes[k] = route
+    routes[-1].extend(int(i) for i in list(path)[sum(len(i) for i in sub):])
+    return routes
+
+def routes_to_sub_path(routes):
+    # the (stopping, mass) slice and the sub paths of the used routes, as path_slice and sub_path give them
+    sub = [list(i) for i in routes if len(i) > 0]
+    stopping = (np.cumsum([len(i) for i in sub], dtype=int) - 1).tolist()
+    mass = [float(demand[list(i)].sum()) for i in routes]
+    return (stopping, mass), sub
+
+class RouteState:
+    # one route per vehicle (an empty route is an unused vehicle) with the load, the prefix load and the
+    # cost of every route, relocate, exchange and 2-opt moves within or between routes and 2-opt* moves
+    # between routes are checked against the vehicle capacity and costed in constant time, a move only
+    # rebuilds the routes it changes once it is applied, an overloaded route may only lose load
+    moves = ('relocate', 'exchange', '2-opt', '2-opt*')
+
+    def __init__(self, routes, vehicle):
+        self.capacity = np.asarray(vehicle, dtype=float)[:, 1].tolist()
+        self.routes = [[int(j) for j in i] for i in routes]
+        self.load = [0.0] * len(self.routes)
+        self.prefix = [[0.0]] * len(self.routes)
+        self.cost = [0.0] * len(self.routes)
+        for k in range(len(self.routes)):
+            self.update(k)
+        self.distance = sum(self.cost)
+
+    def update(self, k):
+        # prefix load (load of the first i nodes), load and cost of route k
+        route = self.routes[k]
+        self.prefix[k] = [0.0] + np.cumsum(demand[route]).tolist()
+        self.load[k] = self.prefix[k][-1]
+        self.cost[k] = total_distance_of_VRP(route)
+
+    def node(self, k, i):
+        # node at position i of route k, the depot before the first and after the last position
+        route = self.routes[k]
+        return route[i] if 0 <= i < len(route) else depot_index
+
+    def fits(self, k, load):
+        return load <= self.capacity[k] or load <= self.load[k]
+
+    def delta(self, move):
+        # change of the total distance by move = (kind, r, p, s, q), None if it overloads a vehicle
+        # - relocate : node at position p of route r to position q of route s (after its removal)
+        # - exchange : node at position p of route r with node at position q of route s
+        # - 2-opt    : reverse route r from position p to q (s = r, p <= q)
+        # - 2-opt*   : route r after position p and route s after position q trade their tails (r != s)
+        kind, r, p, s, q = move
+        d, node = distance_matrix, self.node
+        if kind == 'relocate':
+            u = self.routes[r][p]
+            a, b = node(r, p - 1), node(r, p + 1)
+            removed = d[a, b] - d[a, u] - d[u, b]
+            if r == s:
+                # neighbours of position q in route r without the relocated node
+                x = node(r, q - 1 if q - 1 < p else q)
+                y = node(r, q if q < p else q + 1)
+            elif self.fits(s, self.load[s] + demand[u]):
+                x, y = node(s, q - 1), node(s, q)
+            else:
+                return None
+            return removed + d[x, u] + d[u, y] - d[x, y]
+        if kind == 'exchange':
+            if r == s and p == q:
+                return 0.0
+            if r == s and p > q:
+                p, q = q, p
+            u, v = self.routes[r][p], self.routes[s][q]
+            a, b = node(r, p - 1), node(r, p + 1)
+            x, y = node(s, q - 1), node(s, q + 1)
+            if r == s and q == p + 1:
+                return d[a, v] + d[u, y] - d[a, u] - d[v, y]
+            if r != s and not (self.fits(r, self.load[r] - demand[u] + demand[v])
+                               and self.fits(s, self.load[s] - demand[v] + demand[u])):
+                return None
+            return d[a, v] + d[v, b] + d[x, u] + d[u, y] - d[a, u] - d[u, b] - d[x, v] - d[v, y]
+        if kind == '2-opt':
+            a, b = node(r, p - 1), node(r, q + 1)
+            u, v = self.routes[r][p], self.routes[r][q]
+            return d[a, v] + d[u, b] - d[a, u] - d[v, b]
+        head_r, head_s = self.prefix[r][p + 1], self.prefix[s][q + 1]
+        if not (self.fits(r, head_r + self.load[s] - head_s) and self.fits(s, head_s + self.load[r] - head_r)):
+            return None
+        a, b = node(r, p), node(r, p + 1)
+        x, y = node(s, q), node(s, q + 1)
+        return d[a, y] + d[x, b] - d[a, b] - d[x, y]
+
+    def propose(self):
+        # a random move and the total distance after it, inf when it overloads a vehicle
+        kind = random.choice(self.moves)
+        used = [k for k in range(len(self.routes)) if len(self.routes[k]) > 0]
+        r = random.choice(used)
+        p = random.randrange(len(self.routes[r]))
+        if kind == '2-opt*' and len(self.routes) == 1:
+            kind = '2-opt'
+        if kind == 'relocate':
+            s = random.randrange(len(self.routes))
+            q = random.randrange(len(self.routes[s]) + (s != r))
+        elif kind == 'exchange':
+            s = random.choice(used)
+            q = random.randrange(len(self.routes[s]))
+        elif kind == '2-opt':
+            s = r
+            q = random.randrange(len(self.routes[r]))
+            p, q = min(p, q), max(p, q)
+        else:
+            s = random.randrange(len(self.routes) - 1)
+            s = s + (s >= r)
+            p = random.randrange(-1, len(self.routes[r]))
+            q = random.randrange(-1, len(self.routes[s]))
+        move = (kind, r, p, s, q)
+        delta = self.delta(move)
+        return move, (math.inf if delta is None else self.distance + delta)
+
+    def apply(self, move):
+        kind, r, p, s, q = move
+        routes = self.routes
+        if kind == 'relocate':
+            routes[s].insert(q, routes[r].pop(p))
+        elif kind == 'exchange':
+            routes[r][p], routes[s][q] = routes[s][q], routes[r][p]
+        elif kind == '2-opt':
+            routes[r][p:q + 1] = routes[r][p:q + 1][::-1]
+        else:
+            routes[r], routes[s] = routes[r][:p + 1] + routes[s][q + 1:], routes[s][:q + 1] + routes[r][p + 1:]
+        changed = [r] if r == s else [r, s]
+        old_cost = sum(self.cost[k] for k in changed)
+        for k in changed:
+            self.update(k)
+        self.distance = self.distance - old_cost + sum(self.cost[k] for k in changed)
+        return self.distance
+
+    def tour(self):
+        # the routes one after another as one path, in the order of the fleet
+        return [i for route in self.routes for i in route]
+
+    def tolist(self):
+        return [list(i) for i in self.routes]
@@ -0,0 +1,3 @@
+''' the tests import the metaheuristic package of the repository '''
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
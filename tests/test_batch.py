@@ -0,0 +1,87 @@
+''' Tests of the jobs and the result store of the batch runner '''
+import csv, json, os
+import pytest
+from metaheuristic import batch
+
+
+def record(seed, status='ok'):
+    ''' Function to make the record of the job of seed '''
+    return {'key': batch.job_key('a.csv', {'seed': seed}), 'instance': 'a.csv', 'parameters': {'seed': seed},
+            'status': status, 'distance': 1.5, 'evaluations': 10, 'seconds': 0.25, 'path': [0, 2, 1]}
+
+def keys(*seeds):
+    ''' Function to get the keys of the jobs of seeds '''
+    return set(batch.job_key('a.csv', {'seed': i}) for i in seeds)
+
+def test_make_jobs_drop_the_options_of_other_algorithms():
+    grid = {'algorithm': ['cvrp-abc', 'sa'], 'move': ['two_swap', 'routes'], 'seed': ['1']}
+    jobs = batch.make_jobs(['a.csv', 'b.xlsx'], grid)
+    assert jobs == [('b.xlsx', {'algorithm': 'cvrp-abc', 'seed': '1'}),
+                    ('b.xlsx', {'algorithm': 'sa', 'move': 'two_swap', 'seed': '1'}),
+                    ('b.xlsx', {'algorithm': 'sa', 'move': 'routes', 'seed': '1'})]
+
+def test_make_jobs_reject_a_key_no_job_takes():
+    with pytest.raises(ValueError):
+        batch.make_jobs(['b.xlsx'], {'neighbours': ['5']})
+
+@pytest.mark.parametrize('name', ['results.jsonl', 'results.csv'])
+def test_store_skip_the_jobs_done(tmp_path, name):
+    store = batch.ResultStore(str(tmp_path / name))
+    assert store.done() == set()
+    store.append(record('1'))
+    store.append(record('2', 'error'))
+    store.append(record('3'))
+    # the failed job is run again
+    assert store.done() == keys('1', '3')
+    jobs = [('a.csv', {'seed': i}) for i in ('1', '3')]
+    assert batch.run_batch(jobs, store, log=None) == (0, 0)
+
+@pytest.mark.parametrize('name', ['results.jsonl', 'results.csv'])
+def test_store_recover_from_a_line_cut_short(tmp_path, name):
+    file_name = str(tmp_path / name)
+    store = batch.ResultStore(file_name)
+    store.append(record('1'))
+    store.append(record('2'))
+    with open(file_name, 'rb') as f:
+        data = f.read()
+    # interrupted in the middle of the last line
+    with open(file_name, 'wb') as f:
+        f.write(data[:-20])
+    assert store.done() == keys('1')
+    store.append(record('3'))
+    assert store.done() == keys('1', '3')
+    with open(file_name) as f:
+        assert f.read().endswith('\n')
+
+def test_store_csv_round_trip(tmp_path):
+    file_name = str(tmp_path / 'results.csv')
+    store = batch.ResultStore(file_name)
+    store.append(record('1'))
+    store.append(dict(record('2', 'error'), error='ValueError: a, "b"'))
+    with open(file_name, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert set(i['key'] for i in rows) == keys('1', '2')
+    assert json.loads(rows[0]['parameters']) == {'seed': '1'}
+    assert json.loads(rows[0]['path']) == [0, 2, 1]
+    assert float(rows[0]['distance']) == 1.5 and int(rows[0]['evaluations']) == 10
+    assert rows[1]['error'] == 'ValueError: a, "b"'
+    assert store.done() == keys('1')
+
+def test_run_job_with_the_instruments():
+    instance = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'Modified-Artificial-Bee-Colony', 'case', 'low', 'tsp20.csv')
+    plain = batch.run_job((instance, {'iterations': '10', 'seed': '1'}))
+    measured = batch.run_job((instance, {'iterations': '10', 'seed': '1', 'instrument': 'true'}))
+    assert measured['status'] == 'ok' and 'instruments' not in plain
+    assert measured['distance'] == plain['distance']
+    assert measured['instruments']['timers']['tsp.waggle']['calls'] == 10
+    # the record goes to both stores as it is
+    json.dumps(measured)
+
+def test_store_csv_instruments(tmp_path):
+    file_name = str(tmp_path / 'results.csv')
+    report = {'timers': {'tsp.waggle': {'calls': 10, 'seconds': 0.5}}, 'moves': {}, 'scouts': {}, 'temperatures': {}}
+    batch.ResultStore(file_name).append(dict(record('1'), instruments=report))
+    with open(file_name, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert json.loads(rows[0]['instruments']) == report
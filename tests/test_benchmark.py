@@ -0,0 +1,47 @@
+''' Tests of the benchmark suite on the 8 node CVRP case '''
+import json, os
+import pytest
+from metaheuristic import benchmark, vrp
+
+
+INSTANCE = os.path.join(benchmark.ROOT, benchmark.VRP_INSTANCES[0])
+
+
+@pytest.fixture
+def report(monkeypatch):
+    ''' Fixture to benchmark two variants of the Simulated
+        Annealing on the 8 node instance, the instance it
+        loads into vrp is dropped after the test '''
+    for name in ('tables', 'depot', 'vehicles', 'depot_index', 'distance_matrix', 'demand', 'evaluation_cache'):
+        monkeypatch.setattr(vrp, name, getattr(vrp, name))
+    records = benchmark.benchmark_sa(INSTANCE, ['swapSA2A', 'swapSA3A'], [1, 2], iterations=50)
+    return {'environment': {}, 'seed': 2020, 'repetitions': 2, 'iterations': 50, 'records': records}
+
+def test_benchmark_records(report):
+    assert [i['algorithm'] for i in report['records']] == ['swapSA2A', 'swapSA3A']
+    for record in report['records']:
+        assert record['instance'] == benchmark.VRP_INSTANCES[0]
+        assert [i['seed'] for i in record['runs']] == [1, 2]
+        assert record['best'] == min(i['distance'] for i in record['runs']) > 0
+        assert record['evaluations_per_second'] > 0
+        # the growth is over the memory the benchmark process had already used
+        assert all(isinstance(i['rss_growth_kib'], int) and i['rss_growth_kib'] >= 0 for i in record['runs'])
+        assert record['rss_growth_kib'] == max(i['rss_growth_kib'] for i in record['runs'])
+
+def test_compare_flags_the_regressions(report, tmp_path, capsys):
+    baseline, current = str(tmp_path / 'baseline.json'), str(tmp_path / 'current.json')
+    benchmark.save_report(baseline, report)
+    benchmark.save_report(current, report)
+    assert benchmark.main(['compare', baseline, current]) == 0
+    assert '2 records compared, 0 regressions' in capsys.readouterr().out
+    with open(current) as f:
+        slower = json.load(f)
+    slower['records'][0]['evaluations_per_second'] *= 0.5
+    slower['records'][1]['mean'] *= 1.5
+    benchmark.save_report(current, slower)
+    assert benchmark.main(['compare', baseline, current]) == 1
+    output = capsys.readouterr().out
+    assert 'THROUGHPUT' in output and 'QUALITY' in output
+    assert '2 records compared, 2 regressions' in output
+    # no temporary file of save_report is left
+    assert sorted(os.listdir(tmp_path)) == ['baseline.json', 'current.json']
@@ -0,0 +1,51 @@
+''' Tests of the evaluation cache of the CVRP solvers '''
+import numpy as np
+from metaheuristic.cache import EvaluationCache
+
+
+def test_least_recently_used_is_dropped():
+    cache = EvaluationCache(4, size=3, seed=1)
+    for key, value in zip('abc', (1.0, 2.0, 3.0)):
+        cache.put(key, value)
+    # a look-up and a new value make a path the most recently used
+    assert cache.get('a') == 1.0
+    cache.put('b', 2.5)
+    cache.put('d', 4.0)
+    assert list(cache.store) == ['a', 'b', 'd']
+    cache.put('e', 5.0)
+    assert list(cache.store) == ['b', 'd', 'e']
+    assert cache.get('a') is None and cache.get('b') == 2.5
+
+def test_size_bound():
+    cache = EvaluationCache(4, size=10, seed=1)
+    for key in range(100):
+        cache.put(key, float(key))
+        assert len(cache.store) == min(key + 1, 10)
+    assert list(cache.store) == list(range(90, 100))
+
+def test_hit_and_miss_counters():
+    cache = EvaluationCache(4, size=2, seed=1)
+    assert cache.get('a') is None
+    cache.put('a', 1.0)
+    assert cache.get('a') == 1.0 and cache.get('a') == 1.0
+    cache.put('b', 2.0)
+    cache.put('c', 3.0)
+    assert cache.get('a') is None
+    assert (cache.hits, cache.misses) == (2, 2)
+    # a stored value of 0 is a hit too
+    cache.put('d', 0.0)
+    assert cache.get('d') == 0.0 and cache.hits == 3
+
+def test_moved_hash():
+    cache = EvaluationCache(6, seed=2)
+    rng = np.random.default_rng(3)
+    path = rng.permutation(6)
+    key = cache.hash(path)
+    for i in range(50):
+        positions = rng.choice(6, 3, replace=False)
+        nodes = path[np.roll(positions, 1)]
+        moved = cache.moved(key, path, positions, nodes)
+        path[positions] = nodes
+        key = cache.hash(path)
+        assert moved == key
+    assert cache.hash(np.roll(path, 1)) != key
@@ -0,0 +1,172 @@
+''' Tests of the checkpoints: a run interrupted and resumed from its
+    last checkpoint ends as the run that was not interrupted '''
+import math, os, random
+import numpy as np
+import pytest
+from metaheuristic import loaders, termination, vrp
+from metaheuristic.checkpoint import Checkpointer
+from metaheuristic.config import ABCConfig, CVRP_ABC, SAConfig
+from metaheuristic.progress import Progress
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TSP_INSTANCE = os.path.join(ROOT, 'Modified-Artificial-Bee-Colony', 'case', 'low', 'tsp48.csv')
+CVRP_INSTANCE = os.path.join(ROOT, 'Simulated-Annealing', 'VRP101.xlsx')
+
+
+class Interrupt:
+    ''' Class as termination policy that interrupts the
+        run (as ctrl-c does) once it reaches cycle '''
+    def __init__(self, cycle):
+        ''' Method to initialize the interrupt of cycle '''
+        self.cycle = cycle
+    def reset(self):
+        ''' Method to go on watching '''
+    def __call__(self, record):
+        ''' Method to interrupt the run at its cycle '''
+        if record.cycle >= self.cycle:
+            raise KeyboardInterrupt
+        return False
+
+def interrupted(run, tmp_path, cycle, every):
+    ''' Function to get the result of run(checkpoint,
+        resume, watchers) without interruption and of the
+        same run interrupted at cycle and resumed from its
+        last checkpoint, the checkpoints are taken every
+        every cycles (moves) '''
+    file_name = str(tmp_path / 'run.npz')
+    # the policies are checked as often in both runs
+    expected = run(None, None, (Interrupt(math.inf),))
+    with pytest.raises(KeyboardInterrupt):
+        run(Checkpointer(file_name, cycles=every), None, (Interrupt(cycle),))
+    assert os.path.exists(file_name)
+    return expected, run(Checkpointer(file_name, cycles=every), file_name, (Interrupt(math.inf),))
+
+class WrittenCheckpointer(Checkpointer):
+    ''' Class as checkpoints written before the run goes
+        on, so the last checkpoint is the last one due '''
+    def save(self, cycle, state):
+        ''' Method to write the snapshot of cycle '''
+        super().save(cycle, state)
+        self.writer.join()
+
+def seeded(seed):
+    ''' Function to seed both random generators '''
+    random.seed(seed)
+    np.random.seed(seed)
+
+@pytest.fixture
+def cvrp_instance(monkeypatch):
+    ''' Fixture to load the CVRP instance into vrp for one test '''
+    for name in ('tables', 'depot', 'vehicles', 'depot_index', 'distance_matrix', 'demand', 'evaluation_cache'):
+        monkeypatch.setattr(vrp, name, getattr(vrp, name))
+    vrp.set_instance(*loaders.load_instance(CVRP_INSTANCE))
+    vrp.evaluation_cache = None
+
+@pytest.mark.parametrize('batched', [False, True])
+def test_resume_abc(tmp_path, batched):
+    from metaheuristic import tsp
+    source = loaders.read_instance(TSP_INSTANCE)
+    table = loaders.make_distance_table(source)
+    config = ABCConfig(maximal_of_iteration=60, verbose=False)
+    def run(checkpoint, resume, watchers):
+        seeded(1)
+        history = []
+        result = tsp.main_type1(source, table, batched, config=config.replace(watchers=watchers), history=history,
+                                checkpoint=checkpoint, resume=resume)
+        return result[1], result[2], history
+    expected, resumed = interrupted(run, tmp_path, 37, 5)
+    assert resumed == expected
+
+@pytest.mark.parametrize('route_moves', [False, True])
+def test_resume_cvrp_abc(tmp_path, cvrp_instance, route_moves):
+    from metaheuristic import cvrp
+    config = CVRP_ABC.replace(maximal_of_iteration=30, verbose=False)
+    def run(checkpoint, resume, watchers):
+        seeded(2)
+        history = []
+        result = cvrp.solve(route_moves=route_moves, config=config.replace(watchers=watchers), history=history,
+                            checkpoint=checkpoint, resume=resume)
+        return result, history
+    expected, resumed = interrupted(run, tmp_path, 19, 4)
+    assert resumed == expected
+
+@pytest.mark.parametrize('move', ['two_swap', 'routes'])
+def test_resume_sa(tmp_path, cvrp_instance, move):
+    from metaheuristic import sa
+    # cold enough to improve until the end, so a resume that went astray shows
+    config = SAConfig(max_iteration=20000, move=move, high=1)
+    def run(checkpoint, resume, watchers):
+        seeded(3)
+        return sa.solve(config.replace(watchers=watchers), checkpoint=checkpoint, resume=resume)
+    expected, resumed = interrupted(run, tmp_path, 12000, 2000)
+    assert resumed == expected
+
+def stall_run(case, changes):
+    ''' Function to get run(checkpoint, resume, watchers)
+        of case with the termination policies of changes,
+        the cycle (move) the uninterrupted run ends at and
+        the last cycle (move) of the run '''
+    from metaheuristic import cvrp, sa, tsp
+    if case == 'abc':
+        source = loaders.read_instance(TSP_INSTANCE)
+        table = loaders.make_distance_table(source)
+        config = ABCConfig(maximal_of_iteration=60, verbose=False, **changes)
+        def run(checkpoint, resume, watchers):
+            seeded(1)
+            history = []
+            result = tsp.main_type1(source, table, config=config.replace(watchers=watchers), history=history,
+                                    checkpoint=checkpoint, resume=resume)
+            return result[1], result[2], history
+        return run, len(run(None, None, ())[2]) - 1, 60
+    if case == 'cvrp-abc':
+        config = CVRP_ABC.replace(maximal_of_iteration=30, verbose=False, **changes)
+        def run(checkpoint, resume, watchers):
+            seeded(2)
+            history = []
+            result = cvrp.solve(config=config.replace(watchers=watchers), history=history, checkpoint=checkpoint,
+                                resume=resume)
+            return result, history
+        return run, len(run(None, None, ())[1]), 30
+    config = SAConfig(max_iteration=20000, move='routes', high=1, **changes)
+    def run(checkpoint, resume, watchers):
+        seeded(3)
+        return sa.solve(config.replace(watchers=watchers), checkpoint=checkpoint, resume=resume)
+    return run, run(None, None, ())[3], 20000
+
+@pytest.mark.parametrize('case, changes', [
+    ('abc', {'stall_limit': 4}),
+    ('abc', {'improvement_window': 8, 'improvement_epsilon': 0.02}),
+    ('cvrp-abc', {'stall_limit': 2}),
+    ('sa', {'stall_limit': 5000}),
+], ids=['abc-stall', 'abc-window', 'cvrp-abc-stall', 'sa-stall'])
+def test_resume_with_termination_policies(tmp_path, cvrp_instance, case, changes):
+    # the run is interrupted just before its policy fires, after the last improvement it counts from
+    run, end, last = stall_run(case, changes)
+    assert end < last
+    before = 256 if case == 'sa' else 1
+    file_name = str(tmp_path / 'run.npz')
+    expected = run(None, None, (Interrupt(math.inf),))
+    with pytest.raises(KeyboardInterrupt):
+        run(WrittenCheckpointer(file_name, cycles=1), None, (Interrupt(end - before),))
+    assert run(WrittenCheckpointer(file_name, cycles=1), file_name, (Interrupt(math.inf),)) == expected
+
+def test_policy_state():
+    records = [Progress(cycle, distance, '', cycle, None) for cycle, distance in
+               enumerate([9.0, 8.0, 8.0, 7.9, 7.9, 7.9, 7.9, 7.0, 7.0, 7.0, 7.0, 7.0])]
+    for make in (lambda: termination.NoImprovement(3), lambda: termination.RelativeImprovement(3, 0.05)):
+        policy = make()
+        for record in records[:5]:
+            policy(record)
+        resumed, fresh = make(), make()
+        resumed.restore(policy.state())
+        expected = [policy(record) for record in records[5:]]
+        assert [resumed(record) for record in records[5:]] == expected
+        # a policy that starts counting again at the resume point decides otherwise
+        assert [fresh(record) for record in records[5:]] != expected
+    deadline = termination.Deadline(10)
+    deadline.restore(np.array(9.5))
+    assert not deadline(records[0])
+    deadline.restore(np.array(10.5))
+    assert deadline(records[0])
+    assert float(deadline.state()) >= 10.5
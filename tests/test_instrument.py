@@ -0,0 +1,120 @@
+''' Tests of the instrumentation: the measurements of a run and
+    the functions wrapped while recording put back afterwards '''
+import os, pstats, random, signal, sys, time
+import numpy as np
+import pytest
+from metaheuristic import cvrp, instrument, loaders, sa, tsp, vrp
+from metaheuristic.config import ABCConfig, SAConfig
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TSP_INSTANCE = os.path.join(ROOT, 'Modified-Artificial-Bee-Colony', 'case', 'low', 'tsp20.csv')
+CVRP_INSTANCE = os.path.join(ROOT, 'Modified-Artificial-Bee-Colony', 'CVRP-case', 'VRP_node_8.xlsx')
+
+
+def timed_functions():
+    ''' Function to get every function of TIMED, by module and
+        by every module that imported it, as it is now '''
+    modules = {'cvrp': cvrp, 'sa': sa, 'tsp': tsp, 'vrp': vrp}
+    functions = {}
+    for module, names in instrument.TIMED.items():
+        for name in names:
+            *classes, attribute = name.split('.')
+            owner = modules[module]
+            for i in classes:
+                owner = getattr(owner, i)
+            functions[module + '.' + name] = vars(owner)[attribute]
+            for other, i in modules.items():
+                if not classes and attribute in vars(i):
+                    functions[other + ':' + attribute] = vars(i)[attribute]
+    return functions
+
+def tsp_run(instruments):
+    ''' Function to run the ABC Algorithm on the TSP case '''
+    random.seed(1)
+    np.random.seed(1)
+    source = loaders.read_instance(TSP_INSTANCE)
+    return tsp.main_type1(source, config=ABCConfig(maximal_of_iteration=20, verbose=False),
+                          instruments=instruments)
+
+def busy(seconds):
+    ''' Function to spend seconds of CPU time '''
+    start = time.process_time()
+    total = 0
+    while time.process_time() - start < seconds:
+        total = total + sum(range(1000))
+    return total
+
+def test_recording_tsp():
+    before = timed_functions()
+    instruments = instrument.Instruments()
+    with instrument.recording(instruments):
+        # wrapped while recording, a second recording with the same instruments wraps nothing more
+        assert tsp.waggle is not before['tsp.waggle'] and tsp.instruments is instruments
+        wrapped = timed_functions()
+        with instrument.recording(instruments):
+            assert timed_functions() == wrapped
+    assert timed_functions() == before and tsp.instruments is None
+    result = tsp_run(instruments)
+    assert timed_functions() == before and tsp.instruments is None
+    report = instruments.report()
+    assert report['timers']['tsp.waggle']['calls'] == 20
+    assert report['timers']['tsp.onlooker']['calls'] == 20
+    assert report['timers']['tsp.employee']['calls'] > 0
+    employee = report['moves']['employee']
+    assert 0 < employee['accepted'] <= employee['proposed']
+    assert employee['ratio'] == pytest.approx(employee['accepted'] / employee['proposed'])
+    assert sum(report['scouts'].values()) > 0
+    assert report['temperatures'] == {}
+    # the measurements do not change the run
+    assert tsp_run(None)[2] == result[2]
+    assert 'tsp.waggle' in str(instruments)
+
+def test_recording_restores_on_error():
+    before = timed_functions()
+    with pytest.raises(RuntimeError):
+        with instrument.recording(instrument.Instruments()):
+            raise RuntimeError('run failed')
+    assert timed_functions() == before and sa.instruments is None
+
+def test_recording_sa(monkeypatch):
+    for name in ('tables', 'depot', 'vehicles', 'depot_index', 'distance_matrix', 'demand', 'evaluation_cache'):
+        monkeypatch.setattr(vrp, name, getattr(vrp, name))
+    vrp.set_instance(*loaders.load_instance(CVRP_INSTANCE))
+    vrp.evaluation_cache = None
+    instruments = instrument.Instruments()
+    moves = sa.solve(SAConfig(max_iteration=5000), seed=1, instruments=instruments)[3]
+    report = instruments.report()
+    assert report['timers']['sa.anneal_split']['calls'] == 1
+    # the bands of the 1e10 - 1e0 schedule hold every move
+    assert sum(i['proposed'] for i in report['temperatures'].values()) == moves
+    assert list(report['temperatures'])[0] == '1e10'
+    assert all(i['accepted'] <= i['proposed'] for i in report['temperatures'].values())
+
+def test_profiled(tmp_path, capsys):
+    file_name = str(tmp_path / 'run.prof')
+    with instrument.profiled(file_name):
+        busy(0.05)
+    assert sys.getprofile() is None
+    stats = pstats.Stats(file_name)
+    assert any(function[2] == 'busy' for function in stats.stats)
+    with instrument.profiled(sort='calls', limit=5):
+        busy(0.01)
+    assert 'busy' in capsys.readouterr().out
+
+@pytest.mark.skipif(not hasattr(signal, 'setitimer'), reason='the sampling profiler is unix only')
+def test_sampled(tmp_path, capsys):
+    previous = signal.getsignal(signal.SIGPROF)
+    file_name = str(tmp_path / 'run.stacks')
+    with instrument.sampled(file_name, interval=0.001):
+        busy(0.2)
+    # the handler and the timer of before
+    assert signal.getsignal(signal.SIGPROF) == previous
+    assert signal.getitimer(signal.ITIMER_PROF) == (0.0, 0.0)
+    with open(file_name) as f:
+        lines = [line.rsplit(' ', 1) for line in f.read().splitlines()]
+    assert lines and all(int(count) > 0 for stack, count in lines)
+    assert any(stack.endswith('test_instrument:busy') for stack, count in lines)
+    with instrument.sampled(interval=0.001):
+        busy(0.1)
+    assert 'test_instrument:busy' in capsys.readouterr().out
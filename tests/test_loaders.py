@@ -0,0 +1,110 @@
+''' Tests of the TSPLIB loaders: the distance of every
+    EDGE_WEIGHT_TYPE, the EDGE_WEIGHT_FORMAT of the
+    explicit tables and the .vrp instances '''
+import numpy as np
+import pytest
+from metaheuristic import loaders
+
+
+def write(tmp_path, file_name, lines):
+    ''' Function to write the lines of a TSPLIB file '''
+    path = tmp_path / file_name
+    path.write_text('\n'.join(lines + ['EOF']) + '\n')
+    return str(path)
+
+def coordinate_file(tmp_path, weight_type, points):
+    ''' Function to write a .tsp file of the points
+        (x, y) numbered from 1 '''
+    return write(tmp_path, 'points.tsp', ['NAME : points', 'TYPE : TSP', 'DIMENSION : ' + str(len(points)),
+                                          'EDGE_WEIGHT_TYPE : ' + weight_type, 'NODE_COORD_SECTION']
+                 + [' '.join(map(str, (i + 1,) + tuple(point))) for i, point in enumerate(points)])
+
+def weights(table, weight_format):
+    ''' Function to list the EDGE_WEIGHT_SECTION numbers
+        of a symmetric table in weight_format '''
+    size = len(table)
+    diagonal = 'DIAG' in weight_format
+    if weight_format == 'FULL_MATRIX':
+        return table.ravel()
+    if weight_format.endswith('_ROW'):
+        pairs = [(i, j) for i in range(size) for j in range(size)]
+    else:
+        pairs = [(i, j) for j in range(size) for i in range(size)]
+    if weight_format.startswith('UPPER'):
+        pairs = [(i, j) for i, j in pairs if j > i or (diagonal and j == i)]
+    else:
+        pairs = [(i, j) for i, j in pairs if j < i or (diagonal and j == i)]
+    return np.array([table[i, j] for i, j in pairs])
+
+FORMATS = ['FULL_MATRIX', 'UPPER_ROW', 'LOWER_ROW', 'UPPER_DIAG_ROW', 'LOWER_DIAG_ROW',
+           'UPPER_COL', 'LOWER_COL', 'UPPER_DIAG_COL', 'LOWER_DIAG_COL']
+
+@pytest.mark.parametrize('weight_format', FORMATS)
+def test_tsplib_table(tmp_path, weight_format):
+    rng = np.random.default_rng(1)
+    table = rng.integers(1, 100, (6, 6)).astype(float)
+    table = table + table.T
+    np.fill_diagonal(table, 0)
+    assert np.array_equal(loaders.tsplib_table(weights(table, weight_format), 6, weight_format), table)
+    # the same table read from an explicit file, ten numbers a line
+    numbers = [str(int(i)) for i in weights(table, weight_format)]
+    file_name = write(tmp_path, 'table.tsp', ['NAME : table', 'TYPE : TSP', 'DIMENSION : 6',
+                                              'EDGE_WEIGHT_TYPE : EXPLICIT', 'EDGE_WEIGHT_FORMAT : ' + weight_format,
+                                              'EDGE_WEIGHT_SECTION']
+                      + [' '.join(numbers[i:i + 10]) for i in range(0, len(numbers), 10)])
+    source = loaders.read_instance(file_name)
+    assert loaders.is_distance_table(source)
+    assert np.array_equal(source, table)
+
+@pytest.mark.parametrize('weight_type, points, expected', [
+    ('EUC_2D', [(0, 0), (3, 4), (1, 1), (1.5, 0)], [[0, 5, 1, 2], [5, 0, 4, 4], [1, 4, 0, 1], [2, 4, 1, 0]]),
+    ('CEIL_2D', [(0, 0), (3, 4), (1, 1)], [[0, 5, 2], [5, 0, 4], [2, 4, 0]]),
+    # sqrt(100 / 10) = 3.16 and sqrt(900 / 10) = 9.49 are rounded up, sqrt(1000 / 10) = 10 is not
+    ('ATT', [(0, 0), (10, 0), (10, 30)], [[0, 4, 10], [4, 0, 10], [10, 10, 0]]),
+    # a degree of the equator and from the pole to the equator (in kilometres)
+    ('GEO', [(0, 0), (0, 1), (90, 0)], [[0, 112, 10020], [112, 0, 10020], [10020, 10020, 0]]),
+])
+def test_edge_weight_types(tmp_path, weight_type, points, expected):
+    file_name = coordinate_file(tmp_path, weight_type, points)
+    assert loaders.edge_weight_type(file_name) == weight_type
+    source = loaders.read_instance(file_name)
+    assert np.array_equal(source[:, 1:], np.array(points, dtype=float))
+    table = loaders.load_distance_table(file_name, cache_dir=str(tmp_path / 'cache'))
+    assert np.array_equal(table, np.array(expected, dtype=float))
+    assert np.array_equal(loaders.make_distance_table(source, weight_type), table)
+
+def test_unsupported_edge_weight_type(tmp_path):
+    file_name = write(tmp_path, 'cube.tsp', ['NAME : cube', 'DIMENSION : 2', 'EDGE_WEIGHT_TYPE : EUC_3D',
+                                             'NODE_COORD_SECTION', '1 0 0 0', '2 1 1 1'])
+    with pytest.raises(ValueError, match='EUC_3D'):
+        loaders.read_instance(file_name)
+    with pytest.raises(ValueError, match='MAN_2D'):
+        loaders.make_distance_table(np.zeros((2, 3)), 'MAN_2D')
+
+def vrp_file(tmp_path, header):
+    ''' Function to write a .vrp file of 4 nodes, the depot
+        is node 2 and the nodes are not in order '''
+    return write(tmp_path, 'small.vrp', header + ['CAPACITY : 10', 'NODE_COORD_SECTION',
+                                                  '3 5 6', '1 1 2', '2 0 0', '4 7 8',
+                                                  'DEMAND_SECTION', '1 4', '2 0', '4 9', '3 6',
+                                                  'DEPOT_SECTION', '2', '-1'])
+
+@pytest.mark.parametrize('header, count', [
+    (['NAME : A-n4-k3', 'EDGE_WEIGHT_TYPE : EUC_2D'], 3),
+    (['NAME : A-n4-k3', 'VEHICLES : 4'], 4),
+    # 19 of demand needs 2 vehicles of 10
+    (['NAME : small'], 2),
+])
+def test_read_vrp(tmp_path, header, count):
+    file_name = vrp_file(tmp_path, header)
+    nodes, fleet = loaders.read_vrp(file_name)
+    assert np.array_equal(nodes, [[1, 2, 4], [5, 6, 6], [7, 8, 9], [0, 0, 0]])
+    assert np.array_equal(fleet, [[k + 1, 10] for k in range(count)])
+    nodes, depot, fleet = loaders.load_instance(file_name)
+    assert np.array_equal(depot, [0, 0, 0])
+    assert len(nodes) == 3 and len(fleet) == count
+
+def test_read_vrp_of_another_edge_weight_type(tmp_path):
+    file_name = vrp_file(tmp_path, ['NAME : small', 'EDGE_WEIGHT_TYPE : GEO'])
+    with pytest.raises(ValueError, match='GEO'):
+        loaders.read_vrp(file_name)
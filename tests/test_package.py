@@ -0,0 +1,38 @@
+''' Tests of the lazy import of the submodules of the package '''
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('numpy', 'scipy', 'pandas', 'matplotlib')
+
+
+def imported_after(code):
+    ''' Function to run code after importing the package in a fresh
+        interpreter, returns the modules it imported '''
+    script = ('import json, sys\n'
+              'import metaheuristic\n'
+              + code +
+              'print(json.dumps(sorted(sys.modules)))\n')
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+def test_import_is_lazy():
+    modules = imported_after('')
+    assert not [name for name in modules if name.split('.')[0] in HEAVY]
+    assert not [name for name in modules
+                if name.startswith('metaheuristic.') and name != 'metaheuristic.config']
+
+def test_attribute_imports_the_submodule():
+    modules = imported_after('assert metaheuristic.tsp.__name__ == "metaheuristic.tsp"\n')
+    assert 'metaheuristic.tsp' in modules and 'numpy' in modules
+    assert 'metaheuristic.sa' not in modules
+
+def test_unknown_attribute():
+    import metaheuristic
+    with pytest.raises(AttributeError, match='nonexistent'):
+        metaheuristic.nonexistent
+    assert not hasattr(metaheuristic, 'nonexistent')
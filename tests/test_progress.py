@@ -0,0 +1,45 @@
+''' Tests of the bounded histories of the best distance '''
+import pytest
+from metaheuristic.progress import DecimatedHistory, Progress, RingHistory, collect_progress
+
+
+def test_ring_history_wraps_around():
+    history = RingHistory(size=5)
+    for cycle in range(1, 4):
+        history.append(float(cycle))
+    assert list(history) == [1.0, 2.0, 3.0]
+    assert history.cycles() == [1, 2, 3]
+    for cycle in range(4, 13):
+        history.append(float(cycle))
+        assert len(history) == min(cycle, 5)
+    assert list(history) == [8.0, 9.0, 10.0, 11.0, 12.0]
+    assert history.cycles() == [8, 9, 10, 11, 12]
+
+@pytest.mark.parametrize('size', [2, 3, 5, 8])
+def test_decimated_history_keeps_the_first_and_last_cycles(size):
+    history = DecimatedHistory(size=size)
+    for count in range(1, 200):
+        history.append(float(count))
+        cycles = history.cycles()
+        assert len(history) == len(cycles) <= size
+        assert cycles[0] == 1 and cycles[-1] == count
+        assert all(a < b for a, b in zip(cycles, cycles[1:]))
+        # the distance of every kept cycle is the appended one
+        assert list(history) == [float(cycle) for cycle in cycles]
+
+def test_decimated_history_spread():
+    history = DecimatedHistory(size=5)
+    for count in range(1, 17):
+        history.append(float(count))
+    assert history.cycles() == [1, 5, 9, 13, 16]
+    # the 17th cycle is on the stride of a full history
+    history.append(17.0)
+    assert history.cycles() == [1, 9, 17]
+    history.append(18.0)
+    assert history.cycles() == [1, 9, 17, 18]
+
+def test_collect_progress_into_a_history():
+    records = [Progress(cycle, 10.0 - cycle, 'E', cycle, [0]) for cycle in range(8)]
+    result, history, evaluations = collect_progress(records, RingHistory(size=3))
+    assert result == (7, [0], 3.0, 'E') and evaluations == 7
+    assert list(history) == [5.0, 4.0, 3.0] and history.cycles() == [5, 6, 7]
@@ -0,0 +1,54 @@
+''' Tests of the Simulated Annealing on the CVRP case '''
+import multiprocessing, os
+import pytest
+from metaheuristic import loaders, sa, vrp
+from metaheuristic.config import SAConfig
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INSTANCE = os.path.join(ROOT, 'Modified-Artificial-Bee-Colony', 'CVRP-case', 'VRP_node_8.xlsx')
+
+
+@pytest.fixture(autouse=True)
+def instance(monkeypatch):
+    ''' Fixture to load the 8 node instance into vrp for one test '''
+    for name in ('tables', 'depot', 'vehicles', 'depot_index', 'distance_matrix', 'demand', 'evaluation_cache'):
+        monkeypatch.setattr(vrp, name, getattr(vrp, name))
+    vrp.set_instance(*loaders.load_instance(INSTANCE))
+    vrp.evaluation_cache = None
+
+@pytest.mark.parametrize('move', ['two_swap', 'three_swap', 'routes'])
+def test_policy_that_never_fires_keeps_the_run(move):
+    # the policies are checked every 256 moves, the random numbers are still drawn 4096 moves at a time
+    config = SAConfig(max_iteration=20000, move=move)
+    expected = sa.solve(config, seed=7)
+    assert sa.solve(config.replace(stall_limit=10 ** 9), seed=7) == expected
+    assert sa.solve(config.replace(improvement_window=10 ** 9), seed=7) == expected
+
+def test_policy_stops_between_blocks():
+    result = sa.solve(SAConfig(max_iteration=20000, stall_limit=3000), seed=7)
+    assert result[3] % 256 == 0 and result[3] < 20000
+
+def test_parallel_tempering():
+    path = list(range(len(vrp.tables)))
+    result = sa.parallel_tempering(path, vrp.vehicles, 1000, replicas=3, interval=100, seed=5)
+    best_slice, best_sub_path, best_distance, moves = result
+    best_path = [i for route in best_sub_path for i in route]
+    assert sorted(best_path) == path
+    assert best_sub_path == vrp.sub_path(best_slice[0], best_path)
+    assert best_distance == pytest.approx(vrp.path_to_distance(best_path, vrp.vehicles))
+    assert best_distance <= vrp.path_to_distance(path, vrp.vehicles)
+    assert moves == 3000
+    # the seed reproduces the run
+    again = sa.parallel_tempering(path, vrp.vehicles, 1000, replicas=3, interval=100, seed=5)
+    assert again[2] == best_distance and again[1] == best_sub_path
+
+def failing_move(path, *positions):
+    ''' Function as a move of a replica that fails '''
+    raise RuntimeError('move failed')
+
+def test_parallel_tempering_leaves_no_replica():
+    path = list(range(len(vrp.tables)))
+    with pytest.raises(EOFError):
+        sa.parallel_tempering(path, vrp.vehicles, 1000, replicas=3, move=failing_move, seed=5)
+    assert multiprocessing.active_children() == []
@@ -0,0 +1,84 @@
+''' Tests of the request / response protocol of the solve service '''
+import asyncio, os
+from metaheuristic import service
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INSTANCE = os.path.join(ROOT, 'Modified-Artificial-Bee-Colony', 'CVRP-case', 'VRP_node_8.xlsx')
+
+
+async def exchange(socket, messages):
+    ''' Function to send the messages on one connection
+        and read the events until every job ended '''
+    reader, writer = await service.connect(socket)
+    answers = []
+    try:
+        for message in messages:
+            await service.send(writer, message)
+            async for event in service.events(reader):
+                answers.append(event)
+                if event['event'] == 'accepted' and message.get('cancel'):
+                    await service.send(writer, {'op': 'cancel', 'job': event['job']})
+                if event['event'] in service.ENDS or event['event'] == 'status':
+                    break
+    finally:
+        writer.close()
+    return answers
+
+def talk(tmp_path, messages):
+    ''' Function to serve on a socket of tmp_path and
+        get the events of the messages '''
+    socket = str(tmp_path / 'solve.sock')
+    async def main():
+        solve_service = service.SolveService(processes=2, interval=0.05, grace=5.0)
+        server = await asyncio.start_unix_server(solve_service.handle, socket, limit=service.LIMIT)
+        try:
+            async with server:
+                return await exchange(socket, messages)
+        finally:
+            solve_service.close()
+    return asyncio.run(main())
+
+def visits(path):
+    ''' Function to get the nodes of the routes of a path '''
+    return sorted(j for i in path for j in i)
+
+def solve(**parameters):
+    ''' Function to make the solve request of the instance '''
+    return {'op': 'solve', 'instance': INSTANCE, 'parameters': dict(algorithm='sa', seed=1, **parameters)}
+
+def test_solve_and_cache_hit(tmp_path):
+    answers = talk(tmp_path, [solve(iterations=2000), solve(iterations=2000), {'op': 'status'}])
+    accepted = [i for i in answers if i['event'] == 'accepted']
+    results = [i for i in answers if i['event'] == 'result']
+    assert [i['cached'] for i in accepted] == [False, True]
+    assert [i['job'] for i in results] == [i['job'] for i in accepted]
+    # the same seed solves the cached instance as the loaded one
+    assert results[0]['distance'] == results[1]['distance']
+    assert results[0]['evaluations'] == 2000
+    assert visits(results[0]['path']) == list(range(len(visits(results[0]['path']))))
+    status = answers[-1]
+    assert status['jobs'] == []
+    assert status['cache']['hits'] == 1 and status['cache']['misses'] == 1
+
+def test_solve_with_the_instruments(tmp_path):
+    answers = talk(tmp_path, [solve(iterations=2000, instrument=True)])
+    result = answers[-1]
+    assert result['event'] == 'result'
+    assert sum(i['proposed'] for i in result['instruments']['temperatures'].values()) == 2000
+
+def test_cancel(tmp_path):
+    request = dict(solve(iterations=10 ** 7, move='routes'), cancel=True)
+    answers = talk(tmp_path, [request])
+    events = [i['event'] for i in answers]
+    assert events[0] == 'accepted' and 'cancelling' in events
+    assert events[-1] == 'cancelled'
+    # the job answers with the best path so far and the moves it made
+    assert 0 < answers[-1]['evaluations'] < 10 ** 7
+    assert visits(answers[-1]['path']) == list(range(len(visits(answers[-1]['path']))))
+
+def test_error(tmp_path):
+    answers = talk(tmp_path, [{'op': 'solve', 'instance': INSTANCE, 'parameters': {'algorithm': 'abc'}},
+                              {'op': 'cancel', 'job': 7}, {'op': 'status'}])
+    assert [i['event'] for i in answers[:2]] == ['error', 'error']
+    assert 'does not solve' in answers[0]['error']
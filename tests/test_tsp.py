@@ -0,0 +1,202 @@
+''' Tests of the swap evaluation of the ABC Algorithm on the TSP case '''
+import itertools, random
+import numpy as np
+import pytest
+from metaheuristic import tsp
+
+
+def total(path, table):
+    ''' Function to sum every edge of the route (path) '''
+    return sum(table[path[i], path[(i + 1) % len(path)]] for i in range(len(path)))
+
+def swapped(path, i, j):
+    ''' Function to get a copy of path with i and j swapped '''
+    path = list(path)
+    path[i], path[j] = path[j], path[i]
+    return path
+
+def make_table(length, seed=0):
+    ''' Function to make a random asymmetric distance table '''
+    table = np.random.default_rng(seed).uniform(1, 100, (length, length))
+    np.fill_diagonal(table, 0)
+    return table
+
+@pytest.mark.parametrize('length', [2, 3, 4, 5, 9])
+def test_swap_delta_of_every_swap(length):
+    # every pair of positions, adjacent and across the end of the route included
+    table = make_table(length, length)
+    path = list(np.random.default_rng(length).permutation(length))
+    for i, j in itertools.combinations(range(length), 2):
+        expected = total(swapped(path, i, j), table) - total(path, table)
+        assert tsp.swap_delta(path, i, j, table) == pytest.approx(expected)
+        assert tsp.swap_delta(path, j, i, table) == pytest.approx(expected)
+
+@pytest.mark.parametrize('i, j', [(3, 4), (0, 1), (0, 11), (11, 0), (5, 9)])
+def test_swap_delta_adjacent_and_wrap_around(i, j):
+    table = make_table(12)
+    path = list(range(12))
+    assert tsp.swap_delta(path, i, j, table) == pytest.approx(total(swapped(path, i, j), table) - total(path, table))
+
+@pytest.mark.parametrize('length', [3, 4, 7])
+def test_swap_delta_batch(length):
+    table = make_table(length)
+    paths = np.array([np.random.default_rng(i).permutation(length) for i in range(3)])
+    pairs = np.array(list(itertools.combinations(range(length), 2)))
+    bees = np.arange(len(pairs)) % len(paths)
+    deltas = tsp.swap_delta_batch(paths, bees, pairs[:, 0], pairs[:, 1], table)
+    for k, (i, j) in enumerate(pairs):
+        assert deltas[k] == pytest.approx(tsp.swap_delta(list(paths[bees[k]]), i, j, table))
+
+@pytest.mark.parametrize('length', [2, 3, 4, 9])
+def test_neighbour_mutate_swaps_two_positions(length):
+    table = make_table(length)
+    candidates = tsp.make_candidate_lists(table, 8)
+    random.seed(length)
+    np.random.seed(length)
+    for path in (list(np.random.default_rng(i).permutation(length)) for i in range(20)):
+        distance = total(path, table)
+        i, j, new_distance = tsp.neighbour_mutate(path, tsp.path_positions(path), distance, table, candidates)
+        assert 0 <= i < j < length
+        assert new_distance == pytest.approx(total(swapped(path, i, j), table))
+    paths = np.array([np.random.default_rng(i).permutation(length) for i in range(20)])
+    positions = np.array([tsp.path_positions(path) for path in paths])
+    i, j = tsp.draw_neighbour_swaps(paths, positions, np.arange(len(paths)), candidates)
+    assert np.all((0 <= i) & (i < j) & (j < length))
+
+@pytest.mark.parametrize('symmetric', [True, False])
+def test_local_search(symmetric):
+    for seed in range(20):
+        rng = np.random.default_rng(seed)
+        length = int(rng.integers(5, 40))
+        table = make_table(length, seed)
+        if symmetric:
+            table = (table + table.T) / 2
+        candidates = tsp.make_candidate_lists(table, 8)
+        path = [int(i) for i in rng.permutation(length)]
+        distance = total(path, table)
+        # an asymmetric table used to refill the don't-look queue forever
+        result, result_distance, looked = tsp.local_search(path, distance, table, candidates)
+        assert sorted(result) == list(range(length))
+        assert looked >= length
+        assert result_distance == pytest.approx(total(result, table))
+        assert result_distance <= distance + 1e-9
+
+def test_local_search_of_the_swapped_nodes():
+    table = make_table(30, 3)
+    table = (table + table.T) / 2
+    candidates = tsp.make_candidate_lists(table, 8)
+    path, distance, looked = tsp.local_search(list(range(30)), total(list(range(30)), table), table, candidates)
+    moved = swapped(path, 4, 17)
+    result, result_distance, looked = tsp.local_search(moved, total(moved, table), table, candidates,
+                                                       [moved[4], moved[17]], True)
+    assert sorted(result) == list(range(30))
+    assert result_distance == pytest.approx(total(result, table))
+
+@pytest.mark.parametrize('improve', ['best', 'employee'])
+def test_local_search_in_the_evaluations(improve):
+    from metaheuristic import loaders
+    from metaheuristic.config import ABCConfig
+    rng = np.random.default_rng(4)
+    source = np.column_stack((np.arange(40), rng.uniform(0, 100, (40, 2))))
+    table = loaders.make_distance_table(source)
+    candidates = tsp.make_candidate_lists(table, 6)
+    config = ABCConfig(maximal_of_iteration=10, verbose=False)
+    random.seed(4)
+    np.random.seed(4)
+    hive = tsp.make_hive(source, table, config, candidates, improve)
+    employed = np.count_nonzero(hive.role == 'E')
+    searched = hive.searched
+    records = list(tsp.abc_iterate(source, table, candidates=candidates, improve=improve, config=config, hive=hive))
+    # every node is looked at by the local search of every employee bee
+    assert records[0].evaluations == employed + searched
+    assert searched >= (employed * 40 if improve == 'employee' else 0)
+    # the first local search of the best path looks at every node too
+    assert records[1].evaluations >= records[0].evaluations + len(hive) + 40
+    assert hive.searched == 0
+    # the local search spends the budget of evaluations
+    budget = records[1].evaluations
+    random.seed(4)
+    np.random.seed(4)
+    hive = tsp.make_hive(source, table, config, candidates, improve)
+    records = list(tsp.abc_iterate(source, table, max_evaluations=budget, candidates=candidates,
+                                   improve=improve, config=config, hive=hive))
+    assert records[-1].cycle == 1
+
+def seeded_hive(seed, population=20, length=15):
+    ''' Function to make the hive and the table of a
+        seeded instance of length random nodes '''
+    from metaheuristic import loaders
+    from metaheuristic.config import ABCConfig
+    random.seed(seed)
+    np.random.seed(seed)
+    source = np.column_stack((np.arange(length), np.random.uniform(0, 100, (length, 2))))
+    table = loaders.make_distance_table(source)
+    hive = tsp.make_hive(source, table, ABCConfig(population_of_bee=population))
+    return hive, table
+
+def check_hive(hive, table):
+    ''' Function to check the distance and the position
+        index of every bee against its path '''
+    for bee in range(len(hive)):
+        assert sorted(hive.path[bee]) == list(range(hive.path.shape[1]))
+        assert list(hive.position[bee][hive.path[bee]]) == list(range(hive.path.shape[1]))
+        if hive.role[bee] != 'O':
+            assert hive.distance[bee] == pytest.approx(total(list(hive.path[bee]), table), abs=1e-3)
+
+@pytest.mark.parametrize('phase', [tsp.waggle, tsp.waggle_batch])
+def test_waggle_keeps_the_sequential_semantics(phase):
+    # the same rules for the one bee at a time and the batched phase, every cycle of a seeded hive
+    hive, table = seeded_hive(5)
+    limit, scout_count = 3, 2
+    best_distance = np.inf
+    limited = 0
+    for cycle in range(30):
+        before = {'path': hive.path.copy(), 'distance': hive.distance.copy(), 'cycle': hive.cycle.copy(),
+                  'role': hive.role.copy()}
+        distance, path = phase(hive, best_distance, table, limit, scout_count)
+        check_hive(hive, table)
+        employed = np.flatnonzero(before['role'] == 'E')
+        for bee in np.flatnonzero(before['role'] == 'S'):
+            # a scout bee finds a new food source and is employed again
+            assert hive.role[bee] == 'E' and hive.cycle[bee] == 0
+        for bee in employed:
+            changed = np.flatnonzero(hive.path[bee] != before['path'][bee])
+            if hive.distance[bee] < before['distance'][bee]:
+                # one improving swap, the limit counter starts again
+                assert len(changed) == 2 and hive.cycle[bee] == 0
+            else:
+                assert len(changed) == 0 and hive.distance[bee] == before['distance'][bee]
+                assert hive.cycle[bee] == before['cycle'][bee] + 1
+        # the bees at the limit and the longest ones scout next
+        ranked = employed[np.argsort(-hive.distance[employed], kind='stable')[:scout_count]]
+        scouting = set(employed[hive.cycle[employed] >= limit]) | set(ranked)
+        limited = limited + np.count_nonzero(hive.cycle[employed] >= limit)
+        assert [bee for bee in employed if hive.role[bee] == 'S'] == sorted(scouting)
+        assert list(hive.role[before['role'] == 'O']) == list(before['role'][before['role'] == 'O'])
+        # the best of the employed bees only when it beats the best so far
+        best = employed[np.argmin(hive.distance[employed])]
+        if hive.distance[best] < best_distance:
+            assert distance == hive.distance[best] and path == list(hive.path[best])
+            best_distance = distance
+        else:
+            assert distance == best_distance and path == []
+    assert limited > 0
+
+@pytest.mark.parametrize('phase', [tsp.onlooker, tsp.onlooker_batch])
+def test_onlooker_keeps_the_sequential_semantics(phase):
+    hive, table = seeded_hive(6)
+    employed = np.flatnonzero(hive.role == 'E')
+    best = employed[np.argmin(hive.distance[employed])]
+    best_distance, best_path = hive.distance[best], list(hive.path[best])
+    for cycle in range(30):
+        before = hive.state()
+        distance, path = phase(hive, best_distance, best_path, table)
+        # the onlooker bees improve the best path, the hive is left alone
+        assert sorted(path) == list(range(len(path)))
+        assert distance == pytest.approx(total(path, table))
+        assert distance <= best_distance
+        if distance == best_distance:
+            assert path == best_path
+        for key, value in hive.state().items():
+            assert np.array_equal(value, before[key])
+        best_distance, best_path = distance, path
@@ -0,0 +1,218 @@
+''' Tests of the incremental evaluation of the CVRP case '''
+import os, random
+import numpy as np
+import pytest
+from metaheuristic import loaders, sa, vrp
+from metaheuristic.cache import EvaluationCache
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INSTANCES = [os.path.join(ROOT, 'Modified-Artificial-Bee-Colony', 'CVRP-case', 'VRP_node_8.xlsx'),
+             os.path.join(ROOT, 'Simulated-Annealing', 'VRP101.xlsx')]
+
+
+@pytest.fixture(params=INSTANCES, ids=os.path.basename)
+def instance(request, monkeypatch):
+    ''' Fixture to load a CVRP instance into vrp for one test '''
+    for name in ('tables', 'depot', 'vehicles', 'depot_index', 'distance_matrix', 'demand', 'evaluation_cache'):
+        monkeypatch.setattr(vrp, name, getattr(vrp, name))
+    vrp.set_instance(*loaders.load_instance(request.param))
+    vrp.evaluation_cache = None
+    return request.param
+
+def moves(length, count, seed):
+    ''' Function to draw count two / three swaps of a path of length nodes '''
+    rng = random.Random(seed)
+    for i in range(count):
+        if rng.random() < 0.5:
+            yield sa.two_swap, rng.sample(range(length), 2), rng.random() < 0.5
+        else:
+            yield sa.three_swap, rng.sample(range(length), 3), rng.random() < 0.5
+
+@pytest.mark.parametrize('path_slice', [vrp.sub_path_slice, vrp.optimal_path_slice])
+def test_split_evaluator_apply_and_revert(instance, path_slice):
+    length = len(vrp.tables)
+    path = np.random.default_rng(1).permutation(length)
+    split = vrp.SplitEvaluator(path, vrp.vehicles, path_slice)
+    assert split.distance == pytest.approx(vrp.path_to_distance(path, vrp.vehicles, path_slice))
+    for move, positions, keep in moves(length, 300, 2):
+        before, distance = split.path.copy(), split.distance
+        new_distance = split.apply(move, *positions)
+        expected = before.copy()
+        move(expected, *positions)
+        assert list(split.path) == list(expected)
+        assert new_distance == pytest.approx(vrp.path_to_distance(expected, vrp.vehicles, path_slice))
+        if not keep:
+            split.revert()
+            assert list(split.path) == list(before)
+            assert split.distance == distance
+    if path_slice is vrp.sub_path_slice:
+        # the routes kept move by move are the ones of a new split
+        fresh = vrp.SplitEvaluator(split.path, vrp.vehicles)
+        assert (split.start, split.end) == (fresh.start, fresh.end)
+        assert split.cost == pytest.approx(fresh.cost)
+
+def test_split_evaluator_with_the_evaluation_cache(instance):
+    length = len(vrp.tables)
+    path = np.random.default_rng(3).permutation(length)
+    vrp.evaluation_cache = EvaluationCache(length, seed=1)
+    split = vrp.SplitEvaluator(path, vrp.vehicles, vrp.optimal_path_slice)
+    for move, positions, keep in moves(length, 200, 4):
+        distance = split.apply(move, *positions)
+        # the hash kept up to date by the moves is the one of the path
+        assert split.key == vrp.evaluation_cache.hash(split.path)
+        assert distance == pytest.approx(vrp.all_vehicle_distance(
+            vrp.sub_path(vrp.optimal_path_slice(split.path, vrp.vehicles)[0], split.path)))
+        if not keep:
+            split.revert()
+            assert split.key == vrp.evaluation_cache.hash(split.path)
+    # a path seen before is looked up
+    distance = split.apply(sa.two_swap, 0, length - 1)
+    split.revert()
+    hits = vrp.evaluation_cache.hits
+    assert split.apply(sa.two_swap, 0, length - 1) == distance
+    assert vrp.evaluation_cache.hits == hits + 1
+
+def exhaustive_split(path, vehicle):
+    ''' Function to get the shortest distance of every split
+        of path into routes of the fleet in its order, a
+        vehicle serves the next nodes of the path or none '''
+    best = np.inf
+    def split(node, k, sub):
+        nonlocal best
+        if node == len(path):
+            best = min(best, vrp.all_vehicle_distance(sub))
+            return
+        if k == len(vehicle):
+            return
+        split(node, k + 1, sub)
+        for end in range(node + 1, len(path) + 1):
+            if vrp.demand[path[node:end]].sum() > vehicle[k][1]:
+                break
+            split(end, k + 1, sub + [path[node:end]])
+    split(0, 0, [])
+    return best
+
+def check_split(path, vehicle, stopping, capacity_used):
+    ''' Function to check that the split serves every node
+        of path once within the capacity of its vehicles '''
+    sub = vrp.sub_path(stopping, path)
+    assert [i for route in sub for i in route] == list(path)
+    capacity = np.asarray(vehicle, dtype=float)[:, 1]
+    assert all(used <= capacity[k] for k, used in enumerate(capacity_used))
+    loads = [vrp.demand[route].sum() for route in sub]
+    assert loads == pytest.approx([used for used in capacity_used if used > 0])
+    return sub
+
+@pytest.mark.parametrize('seed', range(6))
+def test_optimal_path_slice_against_exhaustive_splits(instance, seed):
+    rng = np.random.default_rng(seed)
+    path = rng.permutation(len(vrp.tables))[:7]
+    # a small fleet of uneven capacities, most orders of the path fit it and a few do not
+    total = vrp.demand[path].sum()
+    vehicle = [(k + 1, capacity) for k, capacity in enumerate(np.round(total * rng.uniform(0.2, 0.7, 3)))]
+    expected = exhaustive_split(path, vehicle)
+    stopping, capacity_used = vrp.optimal_path_slice(path, vehicle)
+    if expected == np.inf:
+        # the fleet can not serve the path, the greedy split is kept
+        assert (stopping, capacity_used) == vrp.sub_path_slice(path, vehicle)
+        return
+    sub = check_split(path, vehicle, stopping, capacity_used)
+    assert vrp.all_vehicle_distance(sub) == pytest.approx(expected)
+
+def test_optimal_path_slice_against_the_greedy_one(instance):
+    rng = np.random.default_rng(8)
+    for i in range(20):
+        path = rng.permutation(len(vrp.tables))
+        sub = check_split(path, vrp.vehicles, *vrp.optimal_path_slice(path, vrp.vehicles))
+        greedy = vrp.path_to_distance(path, vrp.vehicles)
+        assert vrp.all_vehicle_distance(sub) <= greedy + 1e-9
+        assert vrp.all_vehicle_distance(sub) == pytest.approx(
+            vrp.path_to_distance(path, vrp.vehicles, vrp.optimal_path_slice))
+
+def route_moves(state, seed):
+    ''' Function to list every move of the routes of state
+        (moves of random routes when there are many) '''
+    rng = random.Random(seed)
+    count = len(state.routes)
+    used = [k for k in range(count) if len(state.routes[k]) > 0]
+    pairs = [(r, s) for r in used for s in range(count)]
+    if count > 4:
+        pairs = rng.sample(pairs, 12) + [(r, r) for r in rng.sample(used, 3)] + [(0, 1), (1, 0)]
+    for r, s in pairs:
+        length_r, length_s = len(state.routes[r]), len(state.routes[s])
+        for p in range(length_r):
+            for q in range(length_s + (s != r)):
+                yield 'relocate', r, p, s, q
+            for q in range(length_s):
+                yield 'exchange', r, p, s, q
+                if r == s and p <= q:
+                    yield '2-opt', r, p, s, q
+        if r != s:
+            for p in range(-1, length_r):
+                for q in range(-1, length_s):
+                    yield '2-opt*', r, p, s, q
+
+def moved_routes(state, move):
+    ''' Function to get the routes of state after move,
+        state itself is left unchanged '''
+    copy = vrp.RouteState(state.tolist(), vrp.vehicles)
+    copy.apply(move)
+    return copy.routes
+
+@pytest.mark.parametrize('overloaded', [False, True])
+def test_route_state_delta_and_capacity(instance, overloaded):
+    length = len(vrp.tables)
+    path = list(np.random.default_rng(5).permutation(length))
+    routes = vrp.split_routes(path, vrp.vehicles)
+    if overloaded:
+        # the first route takes the first nodes of the second one, over its capacity
+        routes[0], routes[1] = routes[0] + routes[1][:3], routes[1][3:]
+    state = vrp.RouteState(routes, vrp.vehicles)
+    capacity = np.asarray(vrp.vehicles, dtype=float)[:, 1]
+    checked = 0
+    for move in route_moves(state, 6):
+        routes = moved_routes(state, move)
+        assert sorted(i for route in routes for i in route) == sorted(path)
+        loads = [vrp.demand[route].sum() for route in routes]
+        # a route may go over its capacity only by losing load
+        feasible = all(loads[k] <= capacity[k] or loads[k] <= state.load[k] + 1e-9 for k in range(len(routes)))
+        delta = state.delta(move)
+        assert (delta is not None) == feasible, move
+        if delta is not None:
+            expected = sum(vrp.total_distance_of_VRP(route) for route in routes) - state.distance
+            assert delta == pytest.approx(expected, abs=1e-6), move
+            checked = checked + 1
+    assert checked > 0
+
+def test_route_state_apply(instance):
+    random.seed(7)
+    length = len(vrp.tables)
+    state = vrp.RouteState(vrp.split_routes(list(range(length)), vrp.vehicles), vrp.vehicles)
+    for i in range(500):
+        move, distance = state.propose()
+        if distance < np.inf:
+            assert state.apply(move) == pytest.approx(distance)
+    # the loads, prefix loads and costs kept move by move are the ones of the routes
+    fresh = vrp.RouteState(state.tolist(), vrp.vehicles)
+    assert state.load == pytest.approx(fresh.load)
+    assert state.cost == pytest.approx(fresh.cost)
+    assert state.distance == pytest.approx(fresh.distance)
+    assert sorted(state.tour()) == list(range(length))
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_solve_with_route_moves(instance, seed):
+    from metaheuristic import cvrp
+    from metaheuristic.config import CVRP_ABC
+    random.seed(seed)
+    np.random.seed(seed)
+    config = CVRP_ABC.replace(maximal_of_iteration=20, verbose=False)
+    history = []
+    sub, distance, evaluations = cvrp.solve(route_moves=True, config=config, history=history)
+    assert sorted(i for route in sub for i in route) == list(range(len(vrp.tables)))
+    assert distance == pytest.approx(vrp.all_vehicle_distance(sub))
+    assert evaluations > 0
+    # the best distance of the cycles never gets worse and ends at the one returned
+    assert len(history) == 20
+    assert all(i >= j for i, j in zip(history, history[1:]))
+    assert history[-1] == pytest.approx(distance)